@@ -0,0 +1,70 @@
+"""
+Benchmark of the returns kernels against the per-path Python implementations
+they replaced (Agent.sum_of_rewards here, Agent.compute_advantage in hw5/meta).
+
+    python benchmark_returns.py --n_paths 10 --path_length 1000
+"""
+import argparse
+import time
+import numpy as np
+
+from returns import path_masks, reward_to_go, gae
+
+
+def reward_to_go_loop(re_n, gamma):
+    q_m = [[np.sum([gamma**j * r for j, r in enumerate(re[i:])])
+            for i in range(len(re))] for re in re_n]
+    return np.concatenate(q_m)
+
+def gae_loop(rewards, values, gamma, tau, masks):
+    bsize = len(rewards)
+    returns = np.empty((bsize,))
+    deltas = np.empty((bsize,))
+    advantages = np.empty((bsize,))
+
+    prev_return = 0
+    prev_value = 0
+    prev_advantage = 0
+    for i in reversed(range(bsize)):
+        returns[i] = rewards[i] + gamma * prev_return * masks[i]
+        deltas[i] = rewards[i] + gamma * prev_value * masks[i] - values[i]
+        advantages[i] = deltas[i] + gamma * tau * prev_advantage * masks[i]
+
+        prev_return = returns[i]
+        prev_value = values[i]
+        prev_advantage = advantages[i]
+    return advantages, returns
+
+def timeit(fn, n_iters):
+    start = time.time()
+    for _ in range(n_iters):
+        result = fn()
+    return (time.time() - start) / n_iters, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_paths', type=int, default=10)
+    parser.add_argument('--path_length', type=int, default=1000)
+    parser.add_argument('--gamma', type=float, default=0.99)
+    parser.add_argument('--tau', type=float, default=0.95)
+    args = parser.parse_args()
+
+    re_n = [np.random.randn(args.path_length) for _ in range(args.n_paths)]
+    masks = path_masks([len(re) for re in re_n])
+    rewards = np.concatenate(re_n)
+    values = np.random.randn(len(rewards))
+
+    loop_t, loop_q = timeit(lambda: reward_to_go_loop(re_n, args.gamma), 1)
+    vec_t, vec_q = timeit(lambda: reward_to_go(rewards, args.gamma, masks), 100)
+    assert np.allclose(loop_q, vec_q)
+    print('reward to go: loop %.1f ms, vectorized %.3f ms, speedup %.0fx'
+          % (loop_t * 1e3, vec_t * 1e3, loop_t / vec_t))
+
+    loop_t, (loop_adv, loop_ret) = timeit(lambda: gae_loop(rewards, values, args.gamma, args.tau, masks), 10)
+    vec_t, (vec_adv, vec_ret) = timeit(lambda: gae(rewards, values, args.gamma, args.tau, masks), 100)
+    assert np.allclose(loop_adv, vec_adv) and np.allclose(loop_ret, vec_ret)
+    print('GAE:          loop %.1f ms, vectorized %.3f ms, speedup %.0fx'
+          % (loop_t * 1e3, vec_t * 1e3, loop_t / vec_t))
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ import os
 import time
 import inspect
 from multiprocessing import Process
+from vec_env import VecEnv, SubprocVecEnv
+from returns import path_masks, reward_to_go, trajectory_returns
 
 #============================================================================================#
 # Utilities
@@ -287,6 +289,8 @@ class Agent(object):
             self.baseline_update_op = tf.train.AdamOptimizer(self.learning_rate).minimize(self.baseline_loss)
 
     def sample_trajectories(self, itr, env):
+        if isinstance(env, VecEnv):
+            return self.sample_trajectories_vec(env)
         # Collect paths until we have enough timesteps
         timesteps_this_batch = 0
         paths = []
@@ -324,6 +328,57 @@ class Agent(object):
                 "action" : np.array(acs, dtype=np.float32)}
         return path
 
+    def sample_trajectories_vec(self, vec_env):
+        """
+            Collects paths from all environments of vec_env in lockstep, with one
+            batched policy forward pass per step over the environments that are
+            still running.
+
+            New episodes stop being started once more than min_timesteps_per_batch
+            steps have been taken; episodes that are already running are always
+            finished, so no partial paths are returned or thrown away.
+
+            arguments:
+                vec_env: a VecEnv or SubprocVecEnv
+
+            returns:
+                paths, timesteps_this_batch: same as Agent.sample_trajectories
+        """
+        n_envs = vec_env.n_envs
+        ob_ne = vec_env.reset()
+        obs, acs, rewards = [[[] for _ in range(n_envs)] for _ in range(3)]
+        live = np.arange(n_envs)
+        paths = []
+        timesteps_this_batch = 0
+        total_steps = 0
+        while len(live) > 0:
+            ac_na = self.sess.run(self.sy_sampled_ac, feed_dict={self.sy_ob_no: ob_ne})
+            next_ob_ne, rew_n, done_n = vec_env.step(ac_na, live)
+            total_steps += len(live)
+            finished = []
+            for j, i in enumerate(live):
+                obs[i].append(ob_ne[j])
+                acs[i].append(ac_na[j])
+                rewards[i].append(rew_n[j])
+                # same cutoff as Agent.sample_trajectory
+                if done_n[j] or len(rewards[i]) > self.max_path_length:
+                    paths.append({"observation" : np.array(obs[i], dtype=np.float32),
+                                  "reward" : np.array(rewards[i], dtype=np.float32),
+                                  "action" : np.array(acs[i], dtype=np.float32)})
+                    timesteps_this_batch += len(rewards[i])
+                    obs[i], acs[i], rewards[i] = [], [], []
+                    finished.append(j)
+            if finished:
+                keep = np.ones(len(live), dtype=bool)
+                keep[finished] = False
+                if total_steps > self.min_timesteps_per_batch:
+                    # enough data: let the finished environments idle
+                    live, next_ob_ne = live[keep], next_ob_ne[keep]
+                else:
+                    next_ob_ne[finished] = vec_env.reset(live[finished])
+            ob_ne = next_ob_ne
+        return paths, timesteps_this_batch
+
     #====================================================================================#
     #                           ----------PROBLEM 3----------
     #====================================================================================#
@@ -394,12 +449,12 @@ class Agent(object):
             like the 'ob_no' and 'ac_na' above. 
         """
         # YOUR CODE HERE
+        masks = path_masks([len(re) for re in re_n])
+        re_n = np.concatenate(re_n)
         if self.reward_to_go:
-            q_m = [[np.sum([self.gamma**j * r for j, r in enumerate(re[i:])]) 
-                    for i in range(len(re))] for re in re_n]
+            q_n = reward_to_go(re_n, self.gamma, masks)
         else:
-            q_m = [[np.sum([self.gamma**i * r for i, r in enumerate(re)])] * len(re) for re in re_n]
-        q_n = np.concatenate(q_m)
+            q_n = trajectory_returns(re_n, self.gamma, masks)
         return q_n
 
     def compute_advantage(self, ob_no, q_n):
@@ -549,7 +604,9 @@ def train_PG(
         nn_baseline, 
         seed,
         n_layers,
-        size):
+        size,
+        n_envs=1,
+        parallel_envs=False):
 
     start = time.time()
 
@@ -613,6 +670,12 @@ def train_PG(
     # tensorflow: config, session, variable initialization
     agent.init_tf_sess()
 
+    if n_envs > 1:
+        # the single env above was only needed for the spaces
+        vec_env_cls = SubprocVecEnv if parallel_envs else VecEnv
+        env.close()
+        env = vec_env_cls(env_name, n_envs, seed)
+
     #========================================================================================#
     # Training Loop
     #========================================================================================#
@@ -667,6 +730,8 @@ def main():
     parser.add_argument('--n_experiments', '-e', type=int, default=1)
     parser.add_argument('--n_layers', '-l', type=int, default=2)
     parser.add_argument('--size', '-s', type=int, default=64)
+    parser.add_argument('--n_envs', '-ne', type=int, default=1)
+    parser.add_argument('--parallel_envs', '-pe', action='store_true')
     args = parser.parse_args()
 
     if not(os.path.exists('data')):
@@ -700,7 +765,9 @@ def main():
                 nn_baseline=args.nn_baseline, 
                 seed=seed,
                 n_layers=args.n_layers,
-                size=args.size
+                size=args.size,
+                n_envs=args.n_envs,
+                parallel_envs=args.parallel_envs
                 )
         # # Awkward hacky process runs, because Tensorflow does not like
         # # repeatedly calling train_PG in the same thread.
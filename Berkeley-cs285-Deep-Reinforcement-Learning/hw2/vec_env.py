@@ -0,0 +1,103 @@
+"""
+Vectorized environments for batched rollout collection.
+
+VecEnv steps n copies of an environment in lockstep in the current process,
+SubprocVecEnv runs each copy in its own worker process. Both step only the
+subset of environments that is still live, so episodes of different lengths
+can be collected together.
+"""
+import numpy as np
+import gym
+from multiprocessing import Pipe, Process
+
+
+def make_env(env_name, seed):
+    env = gym.make(env_name)
+    env.seed(seed)
+    return env
+
+class VecEnv(object):
+    def __init__(self, env_name, n_envs, seed):
+        """
+            arguments:
+                env_name: name of the gym environment
+                n_envs: number of environment copies
+                seed: environment i is seeded with seed + i
+        """
+        self.n_envs = n_envs
+        self.envs = [make_env(env_name, seed + i) for i in range(n_envs)]
+
+    def reset(self, idxs=None):
+        """
+            Reset the environments in idxs (all of them by default)
+
+            returns:
+                obs: (len(idxs), ob_dim)
+        """
+        idxs = range(self.n_envs) if idxs is None else idxs
+        return np.array([self.envs[i].reset() for i in idxs], dtype=np.float32)
+
+    def step(self, acs, idxs):
+        """
+            Step the environments in idxs, environment idxs[j] takes action acs[j]
+
+            returns:
+                obs: (len(idxs), ob_dim)
+                rews: (len(idxs),)
+                dones: (len(idxs),)
+        """
+        results = [self.envs[i].step(ac) for i, ac in zip(idxs, acs)]
+        return self._stack(results)
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+    @staticmethod
+    def _stack(results):
+        obs, rews, dones, _ = zip(*results)
+        return np.array(obs, dtype=np.float32), np.array(rews, dtype=np.float32), np.array(dones)
+
+def _worker(remote, env_name, seed):
+    env = make_env(env_name, seed)
+    while True:
+        cmd, data = remote.recv()
+        if cmd == 'step':
+            remote.send(env.step(data))
+        elif cmd == 'reset':
+            remote.send(env.reset())
+        elif cmd == 'close':
+            env.close()
+            remote.close()
+            break
+
+class SubprocVecEnv(VecEnv):
+    def __init__(self, env_name, n_envs, seed):
+        """ Same as VecEnv, but every environment lives in its own worker process """
+        self.n_envs = n_envs
+        self.remotes, work_remotes = zip(*[Pipe() for _ in range(n_envs)])
+        self.processes = [Process(target=_worker, args=(work_remote, env_name, seed + i))
+                          for i, work_remote in enumerate(work_remotes)]
+        for p in self.processes:
+            p.daemon = True # don't leave workers behind if the main process crashes
+            p.start()
+        for work_remote in work_remotes:
+            work_remote.close()
+
+    def reset(self, idxs=None):
+        idxs = range(self.n_envs) if idxs is None else idxs
+        for i in idxs:
+            self.remotes[i].send(('reset', None))
+        return np.array([self.remotes[i].recv() for i in idxs], dtype=np.float32)
+
+    def step(self, acs, idxs):
+        # send every action before waiting, so the workers simulate in parallel
+        for i, ac in zip(idxs, acs):
+            self.remotes[i].send(('step', ac))
+        return self._stack([self.remotes[i].recv() for i in idxs])
+
+    def close(self):
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for p in self.processes:
+            p.join()
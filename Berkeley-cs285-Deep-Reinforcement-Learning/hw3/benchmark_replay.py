@@ -0,0 +1,74 @@
+"""Micro-benchmark for ReplayBuffer sampling on Atari-sized buffers.
+
+Compares the per-index `_encode_observation` path with the batched
+`_encode_observations` path and checks that both produce the same batches.
+
+    python benchmark_replay.py --size 1000000 --batch_size 32
+"""
+import argparse
+import random
+import time
+import numpy as np
+
+from dqn_utils import ReplayBuffer, sample_n_unique
+
+def fill_buffer(buffer, num_frames, frame_shape, episode_len):
+    frame = np.empty(frame_shape, dtype=np.uint8)
+    for t in range(num_frames):
+        frame.fill(t % 256)
+        idx = buffer.store_frame(frame)
+        buffer.store_effect(idx, t % 6, 1.0, (t + 1) % episode_len == 0)
+
+def loop_sample(buffer, batch_size):
+    """The original list-comprehension sampling path."""
+    idxes = sample_n_unique(lambda: random.randint(0, buffer.num_in_buffer - 2), batch_size)
+    obs_batch      = np.concatenate([buffer._encode_observation(idx)[None] for idx in idxes], 0)
+    act_batch      = buffer.action[idxes]
+    rew_batch      = buffer.reward[idxes]
+    next_obs_batch = np.concatenate([buffer._encode_observation(idx + 1)[None] for idx in idxes], 0)
+    done_mask      = np.array([1.0 if buffer.done[idx] else 0.0 for idx in idxes], dtype=np.float32)
+    return obs_batch, act_batch, rew_batch, next_obs_batch, done_mask
+
+def check_equivalence(buffer, num_checks=20, batch_size=256):
+    for _ in range(num_checks):
+        idxes = np.random.randint(0, buffer.num_in_buffer - 1, size=batch_size)
+        loop_obs = np.stack([buffer._encode_observation(idx) for idx in idxes])
+        loop_next_obs = np.stack([buffer._encode_observation(idx + 1) for idx in idxes])
+        obs, _, _, next_obs, _ = buffer._encode_sample(idxes)
+        assert np.array_equal(loop_obs, obs)
+        assert np.array_equal(loop_next_obs, next_obs)
+
+def time_fn(fn, n_iters):
+    start = time.time()
+    for _ in range(n_iters):
+        fn()
+    return (time.time() - start) / n_iters
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--fill', type=int, default=None,
+                        help='number of frames to store (default: 1.5 * size, so the buffer wraps)')
+    parser.add_argument('--frame_history_len', type=int, default=4)
+    parser.add_argument('--episode_len', type=int, default=997)
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--n_iters', type=int, default=1000)
+    args = parser.parse_args()
+
+    frame_shape = (84, 84, 1)
+    fill = args.fill or int(args.size * 1.5)
+    buffer = ReplayBuffer(args.size, args.frame_history_len)
+    print('filling buffer with %d frames...' % fill)
+    fill_buffer(buffer, fill, frame_shape, args.episode_len)
+
+    check_equivalence(buffer)
+    print('batched sampling matches the per-index path')
+
+    loop_time = time_fn(lambda: loop_sample(buffer, args.batch_size), args.n_iters)
+    vec_time = time_fn(lambda: buffer.sample(args.batch_size), args.n_iters)
+    print('per-index sample: %.3f ms/batch' % (loop_time * 1e3))
+    print('batched sample:   %.3f ms/batch' % (vec_time * 1e3))
+    print('speedup:          %.1fx' % (loop_time / vec_time))
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 import uuid
 import time
 import pickle
@@ -49,6 +50,13 @@ class QLearner(object):
     rew_file=None,
     double_q=True,
     lander=False,
+    prioritized_replay=False,
+    prioritized_replay_alpha=0.6,
+    prioritized_replay_beta=LinearSchedule(1000000, 1.0, 0.4),
+    prioritized_replay_eps=1e-6,
+    replay_buffer_dir=None,
+    replay_snapshot_dir=None,
+    replay_snapshot_freq=1000000,
     logdir=None):
     """Run Deep Q-learning algorithm.
 
@@ -102,6 +110,25 @@ class QLearner(object):
     double_q: bool
         If True, then use double Q-learning to compute target values. Otherwise, use vanilla DQN.
         https://papers.nips.cc/paper/3964-double-q-learning.pdf
+    prioritized_replay: bool
+        If True, sample transitions proportionally to their TD error
+        from a PrioritizedReplayBuffer instead of uniformly.
+        https://arxiv.org/abs/1511.05952
+    prioritized_replay_alpha: float
+        How much prioritization is used (0 - uniform sampling).
+    prioritized_replay_beta: rl_algs.deepq.utils.schedules.Schedule
+        schedule for the importance sampling exponent.
+    prioritized_replay_eps: float
+        Added to the absolute TD errors so no priority is zero.
+    replay_buffer_dir: str or None
+        If not None, back the replay buffer with memory-mapped files in this
+        directory instead of RAM.
+    replay_snapshot_dir: str or None
+        If not None, the replay buffer is restored from this directory when
+        a snapshot exists there, and saved to it every `replay_snapshot_freq`
+        steps. Frames in a restored buffer count towards `learning_starts`.
+    replay_snapshot_freq: int
+        How many steps of environment to take between replay buffer snapshots
     """
     assert type(env.observation_space) == gym.spaces.Box
     assert type(env.action_space)      == gym.spaces.Discrete
@@ -117,6 +144,9 @@ class QLearner(object):
     self.env = env
     self.session = session
     self.exploration = exploration
+    self.prioritized_replay = prioritized_replay
+    self.prioritized_replay_beta = prioritized_replay_beta
+    self.prioritized_replay_eps = prioritized_replay_eps
     self.rew_file = str(uuid.uuid4()) + '.pkl' if rew_file is None else rew_file
     self.session.__enter__()
     ###############
@@ -148,6 +178,8 @@ class QLearner(object):
     # episode, only the current state reward contributes to the target, not the
     # next state Q-value (i.e. target is just rew_t_ph, not rew_t_ph + gamma * q_tp1)
     self.done_mask_ph          = tf.placeholder(tf.float32, [None])
+    # placeholder for importance sampling weights, only fed with prioritized replay
+    self.is_weight_ph          = tf.placeholder_with_default(tf.ones_like(self.rew_t_ph), [None])
 
     # casting to float on GPU ensures lower data transfer times.
     if lander:
@@ -193,7 +225,8 @@ class QLearner(object):
         
     q_target = self.rew_t_ph + (1 - self.done_mask_ph) * gamma * q_next
 
-    self.total_error = huber_loss(q - q_target)
+    self.td_error = q - q_target
+    self.total_error = self.is_weight_ph * huber_loss(self.td_error)
 
     with tf.name_scope('loss_'):
         stats_summary(self.total_error, 'loss', min=False, max=False)
@@ -219,7 +252,22 @@ class QLearner(object):
     self.update_target_fn = tf.group(*update_target_fn)
 
     # construct the replay buffer
-    self.replay_buffer = ReplayBuffer(replay_buffer_size, frame_history_len, lander=lander)
+    if prioritized_replay:
+        self.replay_buffer = PrioritizedReplayBuffer(
+            replay_buffer_size, frame_history_len, prioritized_replay_alpha,
+            lander=lander, storage_dir=replay_buffer_dir)
+    else:
+        self.replay_buffer = ReplayBuffer(replay_buffer_size, frame_history_len,
+                                          lander=lander, storage_dir=replay_buffer_dir)
+    self.replay_snapshot_dir = replay_snapshot_dir
+    self.replay_snapshot_freq = replay_snapshot_freq
+    if replay_snapshot_dir is not None and os.path.exists(os.path.join(replay_snapshot_dir, 'meta.pkl')):
+        self.replay_buffer.restore(replay_snapshot_dir)
+        # the env is reset below, so close the last stored episode; this keeps
+        # frame history and the last transition from spanning the two runs
+        self.replay_buffer.done[(self.replay_buffer.next_idx - 1) % self.replay_buffer.size] = True
+        self.learning_starts = max(0, learning_starts - self.replay_buffer.num_in_buffer)
+        print('Restored %d transitions from %s' % (self.replay_buffer.num_in_buffer, replay_snapshot_dir))
     self.replay_buffer_idx = None
 
     ###############
@@ -329,7 +377,11 @@ class QLearner(object):
 
       # YOUR CODE HERE
         # 3.a
-        obs, actions, rewards, next_obs, dones = self.replay_buffer.sample(self.batch_size)
+        if self.prioritized_replay:
+            obs, actions, rewards, next_obs, dones, weights, idxes = self.replay_buffer.sample(
+                self.batch_size, self.prioritized_replay_beta.value(self.t))
+        else:
+            obs, actions, rewards, next_obs, dones = self.replay_buffer.sample(self.batch_size)
 
         # 3.b
         if not self.model_initialized:
@@ -342,14 +394,21 @@ class QLearner(object):
             print('Model initialized')
 
         # 3.c
-        _, summary = self.session.run([self.train_fn, self.graph_summary], feed_dict={
+        feed_dict = {
             self.obs_t_ph: obs,
             self.act_t_ph: actions,
             self.rew_t_ph: rewards,
             self.obs_tp1_ph: next_obs,
             self.done_mask_ph: dones,
             self.learning_rate: self.optimizer_spec.lr_schedule.value(self.t)
-        })
+        }
+        if self.prioritized_replay:
+            feed_dict[self.is_weight_ph] = weights
+            _, summary, td_error = self.session.run([self.train_fn, self.graph_summary, self.td_error],
+                                                    feed_dict=feed_dict)
+            self.replay_buffer.update_priorities(idxes, np.abs(td_error) + self.prioritized_replay_eps)
+        else:
+            _, summary = self.session.run([self.train_fn, self.graph_summary], feed_dict=feed_dict)
         if self.t % 100 == 0:
             self.writer.add_summary(summary, self.t)
 
@@ -380,14 +439,24 @@ class QLearner(object):
         logz.dump_tabular()
         logz.pickle_tf_vars()
 
+  def snapshot_replay_buffer(self):
+    if (self.replay_snapshot_dir is not None and self.t > 0 and
+        self.t % self.replay_snapshot_freq == 0):
+        self.replay_buffer.save(self.replay_snapshot_dir)
+
 def learn(*args, **kwargs):
     alg = QLearner(*args, **kwargs)
-    while not alg.stopping_criterion_met():
-        alg.start_time = time.time()
-        alg.step_env()
-        # at this point, the environment should have been advanced one step (and
-        # reset if done was true), and self.last_obs should point to the new latest
-        # observation
-        alg.update_model()
-        alg.log_progress()
+    try:
+        while not alg.stopping_criterion_met():
+            alg.start_time = time.time()
+            alg.step_env()
+            # at this point, the environment should have been advanced one step (and
+            # reset if done was true), and self.last_obs should point to the new latest
+            # observation
+            alg.update_model()
+            alg.log_progress()
+            alg.snapshot_replay_buffer()
+    finally:
+        # deletes the memmap files of a --replay_buffer_dir run
+        alg.replay_buffer.close()
 
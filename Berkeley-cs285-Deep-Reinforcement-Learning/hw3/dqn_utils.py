@@ -1,5 +1,10 @@
 """This file includes a collection of utility functions that are useful for
 implementing DQN."""
+import atexit
+import os
+import shutil
+import pickle
+import tempfile
 import gym
 import tensorflow as tf
 import numpy as np
@@ -24,6 +29,17 @@ def sample_n_unique(sampling_f, n):
             res.append(candidate)
     return res
 
+def sample_n_unique_idxes(high, n):
+    """Sample n unique integers from [0, high) with vectorized rejection
+    sampling. Cheap when n << high, which is the replay buffer case.
+    """
+    assert n <= high
+    res = np.unique(np.random.randint(0, high, size=n))
+    while len(res) < n:
+        extra = np.random.randint(0, high, size=n - len(res))
+        res = np.unique(np.concatenate([res, extra]))
+    return res
+
 class Schedule(object):
     def value(self, t):
         """Value of the schedule at time t"""
@@ -172,7 +188,7 @@ def get_wrapper_by_name(env, classname):
             raise ValueError("Couldn't find wrapper named %s"%classname)
 
 class ReplayBuffer(object):
-    def __init__(self, size, frame_history_len, lander=False):
+    def __init__(self, size, frame_history_len, lander=False, storage_dir=None):
         """This is a memory efficient implementation of the replay buffer.
 
         The sepecific memory optimizations use here are:
@@ -186,6 +202,10 @@ class ReplayBuffer(object):
         For the tipical use case in Atari Deep RL buffer with 1M frames the total
         memory footprint of this buffer is 10^6 * 84 * 84 bytes ~= 7 gigabytes
 
+        If `storage_dir` is given, the buffer arrays are backed by np.memmap
+        files in a fresh subdirectory of it instead of RAM, so only the pages
+        that are actually being touched stay resident.
+
         Warning! Assumes that returning frame of zeros at the beginning
         of the episode, when there is less frames than `frame_history_len`,
         is acceptable.
@@ -197,9 +217,19 @@ class ReplayBuffer(object):
             overflows the old memories are dropped.
         frame_history_len: int
             Number of memories to be retried for each observation.
+        storage_dir: str or None
+            Directory in which to create the memory-mapped buffer files.
+            If None the buffer is kept in memory.
         """
         self.lander = lander
 
+        self.storage_dir = None
+        if storage_dir is not None:
+            os.makedirs(storage_dir, exist_ok=True)
+            self.storage_dir = tempfile.mkdtemp(prefix='replay_', dir=storage_dir)
+            # in case the buffer is never closed, e.g. QLearner fails to start
+            atexit.register(self.close)
+
         self.size = size
         self.frame_history_len = frame_history_len
 
@@ -216,11 +246,12 @@ class ReplayBuffer(object):
         return batch_size + 1 <= self.num_in_buffer
 
     def _encode_sample(self, idxes):
-        obs_batch      = np.concatenate([self._encode_observation(idx)[None] for idx in idxes], 0)
+        idxes          = np.asarray(idxes)
+        obs_batch      = self._encode_observations(idxes)
         act_batch      = self.action[idxes]
         rew_batch      = self.reward[idxes]
-        next_obs_batch = np.concatenate([self._encode_observation(idx + 1)[None] for idx in idxes], 0)
-        done_mask      = np.array([1.0 if self.done[idx] else 0.0 for idx in idxes], dtype=np.float32)
+        next_obs_batch = self._encode_observations(idxes + 1)
+        done_mask      = self.done[idxes].astype(np.float32)
 
         return obs_batch, act_batch, rew_batch, next_obs_batch, done_mask
 
@@ -259,7 +290,7 @@ class ReplayBuffer(object):
             Array of shape (batch_size,) and dtype np.float32
         """
         assert self.can_sample(batch_size)
-        idxes = sample_n_unique(lambda: random.randint(0, self.num_in_buffer - 2), batch_size)
+        idxes = sample_n_unique_idxes(self.num_in_buffer - 1, batch_size)
         return self._encode_sample(idxes)
 
     def encode_recent_observation(self):
@@ -301,6 +332,39 @@ class ReplayBuffer(object):
             img_h, img_w = self.obs.shape[1], self.obs.shape[2]
             return self.obs[start_idx:end_idx].transpose(1, 2, 0, 3).reshape(img_h, img_w, -1)
 
+    def _encode_observations(self, idxes):
+        """Batched version of `_encode_observation`.
+
+        Computes the frame window of every index at once: window positions
+        that fall before the start of the buffer (when it is not yet full) or
+        before the last episode boundary are zero padded, exactly as in
+        `_encode_observation`. All frames are fetched with a single gather
+        into one preallocated array.
+        """
+        if len(self.obs.shape) == 2:
+            return self.obs[idxes % self.size]
+        batch_size = len(idxes)
+        k = self.frame_history_len
+        # positions[i, j] is the buffer position of the j-th frame for idxes[i]
+        positions = idxes[:, None] + np.arange(1 - k, 1)[None]
+        wrapped = positions % self.size
+        if self.num_in_buffer != self.size:
+            valid = positions >= 0
+        else:
+            valid = np.ones_like(positions, dtype=bool)
+        # a done flag at position j invalidates frames 0..j of the window
+        hits = self.done[wrapped[:, :-1]] & valid[:, :-1]
+        after_done = np.logical_or.accumulate(hits[:, ::-1], axis=1)[:, ::-1]
+        valid[:, :-1] &= ~after_done
+
+        img_h, img_w, img_c = self.obs.shape[1:]
+        frames = np.empty((batch_size, k, img_h, img_w, img_c), dtype=self.obs.dtype)
+        # indices are already in range; mode="clip" lets take write into `out` unbuffered
+        np.take(self.obs, wrapped, axis=0, out=frames, mode="clip")
+        frames[~valid] = 0
+        # like the single-index path, this is a view for single-channel frames
+        return frames.transpose(0, 2, 3, 1, 4).reshape(batch_size, img_h, img_w, k * img_c)
+
     def store_frame(self, frame):
         """Store a single frame in the buffer at the next available index, overwriting
         old frames if necessary.
@@ -317,10 +381,10 @@ class ReplayBuffer(object):
             Index at which the frame is stored. To be used for `store_effect` later.
         """
         if self.obs is None:
-            self.obs      = np.empty([self.size] + list(frame.shape), dtype=np.float32 if self.lander else np.uint8)
-            self.action   = np.empty([self.size],                     dtype=np.int32)
-            self.reward   = np.empty([self.size],                     dtype=np.float32)
-            self.done     = np.empty([self.size],                     dtype=np.bool)
+            self.obs      = self._allocate('obs',    [self.size] + list(frame.shape), np.float32 if self.lander else np.uint8)
+            self.action   = self._allocate('action', [self.size],                     np.int32)
+            self.reward   = self._allocate('reward', [self.size],                     np.float32)
+            self.done     = self._allocate('done',   [self.size],                     np.bool)
         self.obs[self.next_idx] = frame
 
         ret = self.next_idx
@@ -350,3 +414,267 @@ class ReplayBuffer(object):
         self.reward[idx] = reward
         self.done[idx]   = done
 
+    def _allocate(self, name, shape, dtype):
+        if self.storage_dir is None:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.storage_dir, name + '.dat'),
+                         dtype=dtype, mode='w+', shape=tuple(shape))
+
+    _ARRAYS = ('obs', 'action', 'reward', 'done')
+
+    def save(self, path):
+        """Write a snapshot of the buffer to directory `path`, so that a run
+        can be resumed with `restore` without refilling the buffer.
+        """
+        assert self.obs is not None, "Nothing to save in an empty buffer"
+        # write next to the old snapshot and swap, so a crash mid-save
+        # never leaves a half-written snapshot behind
+        tmp_path = path.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in self._ARRAYS:
+            np.save(os.path.join(tmp_path, name + '.npy'), getattr(self, name))
+        with open(os.path.join(tmp_path, 'meta.pkl'), 'wb') as f:
+            pickle.dump(self._meta(), f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    def restore(self, path):
+        """Load a snapshot written by `save`. The arrays are copied into the
+        buffer's own storage, i.e. into RAM or into fresh memmap files.
+        """
+        with open(os.path.join(path, 'meta.pkl'), 'rb') as f:
+            meta = pickle.load(f)
+        assert meta['size'] == self.size and meta['frame_history_len'] == self.frame_history_len, \
+            "Snapshot was taken from a buffer with a different configuration"
+        for name in self._ARRAYS:
+            saved = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+            array = self._allocate(name, saved.shape, saved.dtype)
+            array[:] = saved
+            setattr(self, name, array)
+        self._load_meta(meta)
+
+    def _meta(self):
+        return {
+            'size': self.size,
+            'frame_history_len': self.frame_history_len,
+            'next_idx': self.next_idx,
+            'num_in_buffer': self.num_in_buffer,
+        }
+
+    def _load_meta(self, meta):
+        self.next_idx = meta['next_idx']
+        self.num_in_buffer = meta['num_in_buffer']
+
+    def close(self):
+        """Release the buffer and delete its memmap files, if any."""
+        self.obs = self.action = self.reward = self.done = None
+        if self.storage_dir is not None:
+            shutil.rmtree(self.storage_dir, ignore_errors=True)
+            self.storage_dir = None
+
+
+
+class SegmentTree(object):
+    def __init__(self, capacity, operation, neutral_element):
+        """Array-based segment tree.
+
+        Node i has children 2i and 2i+1, and leaves live at
+        [capacity, 2 * capacity). All updates and queries take a batch of
+        indices and do O(log capacity) vectorized numpy operations.
+
+        Parameters
+        ----------
+        capacity: int
+            Number of leaves. Rounded up to a power of two.
+        operation: np.ufunc
+            Associative binary operation used to combine children,
+            e.g. np.add or np.minimum.
+        neutral_element: float
+            Neutral element of `operation`, e.g. 0 for add and inf for min.
+        """
+        self._capacity = 1
+        while self._capacity < capacity:
+            self._capacity *= 2
+        self._operation = operation
+        self._neutral_element = neutral_element
+        self._value = np.full(2 * self._capacity, neutral_element, dtype=np.float64)
+
+    def reduce(self):
+        """Returns `operation` applied over all leaves."""
+        return self._value[1]
+
+    def __setitem__(self, idxes, values):
+        nodes = np.asarray(idxes) + self._capacity
+        self._value[nodes] = values
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self._value[nodes] = self._operation(self._value[2 * nodes], self._value[2 * nodes + 1])
+            nodes = np.unique(nodes // 2)
+
+    def __getitem__(self, idxes):
+        return self._value[np.asarray(idxes) + self._capacity]
+
+class SumSegmentTree(SegmentTree):
+    def __init__(self, capacity):
+        super(SumSegmentTree, self).__init__(capacity, np.add, 0.0)
+
+    def sum(self):
+        return self.reduce()
+
+    def find_prefixsum_idx(self, prefixsums):
+        """For every element of `prefixsums` find the highest index i such
+        that sum(leaves[:i]) <= prefixsum, descending all the queries at
+        once, one tree level per step.
+        """
+        prefixsums = np.array(prefixsums, dtype=np.float64)
+        nodes = np.ones(len(prefixsums), dtype=np.int64)
+        while nodes[0] < self._capacity:
+            left = 2 * nodes
+            left_sum = self._value[left]
+            go_right = prefixsums >= left_sum
+            prefixsums -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+        return nodes - self._capacity
+
+class MinSegmentTree(SegmentTree):
+    def __init__(self, capacity):
+        super(MinSegmentTree, self).__init__(capacity, np.minimum, float('inf'))
+
+    def min(self):
+        return self.reduce()
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, size, frame_history_len, alpha, lander=False, storage_dir=None):
+        """Replay buffer that samples transitions proportionally to their
+        priority, see https://arxiv.org/abs/1511.05952
+
+        Priorities are kept in a sum-tree and a min-tree over buffer
+        indices, so priority updates are O(log size) and sampling a batch
+        costs O(batch_size * log size), independent of how full the
+        buffer is.
+
+        A transition gets a priority only once its effect has been stored
+        and the frame after it has been stored too, so neither the
+        transition that is in progress nor the one whose next observation
+        is not in the buffer yet can be sampled.
+
+        Parameters
+        ----------
+        size: int
+            See ReplayBuffer.
+        frame_history_len: int
+            See ReplayBuffer.
+        alpha: float
+            How much prioritization is used
+            (0 - no prioritization, 1 - full prioritization).
+        """
+        super(PrioritizedReplayBuffer, self).__init__(size, frame_history_len, lander=lander,
+                                                      storage_dir=storage_dir)
+        assert alpha >= 0
+        self.alpha = alpha
+        self.max_priority = 1.0
+        self._it_sum = SumSegmentTree(size)
+        self._it_min = MinSegmentTree(size)
+        # index of the transition whose effect is stored but whose next
+        # frame isn't, or None
+        self._waiting_idx = None
+
+    def store_frame(self, frame):
+        """See ReplayBuffer.store_frame"""
+        idx = super(PrioritizedReplayBuffer, self).store_frame(frame)
+        # the slot no longer holds a complete transition until store_effect
+        self._it_sum[[idx]] = 0.0
+        self._it_min[[idx]] = float('inf')
+        if self._waiting_idx is not None and self._waiting_idx != idx:
+            # its next observation is now in the buffer
+            self._it_sum[[self._waiting_idx]] = self.max_priority ** self.alpha
+            self._it_min[[self._waiting_idx]] = self.max_priority ** self.alpha
+        self._waiting_idx = None
+        return idx
+
+    def store_effect(self, idx, action, reward, done):
+        """See ReplayBuffer.store_effect"""
+        super(PrioritizedReplayBuffer, self).store_effect(idx, action, reward, done)
+        # sampled once store_frame has stored the frame after it
+        self._waiting_idx = idx
+
+    def _sample_proportional(self, batch_size):
+        # stratified sampling: one draw from each of batch_size equal segments
+        total = self._it_sum.sum()
+        segment = total / batch_size
+        prefixsums = (np.arange(batch_size) + np.random.uniform(size=batch_size)) * segment
+        return self._it_sum.find_prefixsum_idx(np.minimum(prefixsums, np.nextafter(total, 0)))
+
+    def sample(self, batch_size, beta):
+        """Sample a batch of transitions with probability proportional to
+        their priority.
+
+        Compared to ReplayBuffer.sample it also returns importance
+        sampling weights and the indices of the sampled transitions.
+
+        Parameters
+        ----------
+        batch_size: int
+            How many transitions to sample.
+        beta: float
+            To what degree to use importance weights
+            (0 - no corrections, 1 - full correction)
+
+        Returns
+        -------
+        obs_batch, act_batch, rew_batch, next_obs_batch, done_mask:
+            See ReplayBuffer.sample
+        weights: np.array
+            Array of shape (batch_size,) and dtype np.float32
+            denoting importance weight of each sampled transition
+        idxes: np.array
+            Array of shape (batch_size,) and dtype np.int64
+            indices in buffer of sampled transitions
+        """
+        assert self.can_sample(batch_size)
+        assert beta > 0
+
+        idxes = self._sample_proportional(batch_size)
+
+        total = self._it_sum.sum()
+        p_min = self._it_min.min() / total
+        max_weight = (p_min * self.num_in_buffer) ** (-beta)
+        p_sample = self._it_sum[idxes] / total
+        weights = ((p_sample * self.num_in_buffer) ** (-beta) / max_weight).astype(np.float32)
+
+        return self._encode_sample(idxes) + (weights, idxes)
+
+    def update_priorities(self, idxes, priorities):
+        """Update priorities of sampled transitions in bulk.
+
+        Parameters
+        ----------
+        idxes: [int]
+            List of idxes of sampled transitions
+        priorities: [float]
+            List of updated priorities corresponding to
+            transitions at the sampled idxes denoted by
+            variable `idxes`.
+        """
+        priorities = np.asarray(priorities, dtype=np.float64)
+        assert len(idxes) == len(priorities)
+        assert np.all(priorities > 0)
+        self._it_sum[idxes] = priorities ** self.alpha
+        self._it_min[idxes] = priorities ** self.alpha
+        self.max_priority = max(self.max_priority, np.max(priorities))
+
+    def _meta(self):
+        meta = super(PrioritizedReplayBuffer, self)._meta()
+        meta['max_priority'] = self.max_priority
+        meta['waiting_idx'] = self._waiting_idx
+        meta['it_sum'] = self._it_sum._value
+        meta['it_min'] = self._it_min._value
+        return meta
+
+    def _load_meta(self, meta):
+        super(PrioritizedReplayBuffer, self)._load_meta(meta)
+        self.max_priority = meta['max_priority']
+        self._waiting_idx = meta.get('waiting_idx')
+        self._it_sum._value[:] = meta['it_sum']
+        self._it_min._value[:] = meta['it_min']
@@ -35,7 +35,10 @@ def atari_learn(env,
                 double,
                 logdir,
                 seed,
-                num_timesteps):
+                num_timesteps,
+                prioritized=False,
+                replay_buffer_dir=None,
+                replay_snapshot_dir=None):
     # This is just a rough estimate
     num_iterations = float(num_timesteps) / 4.0
 
@@ -81,6 +84,9 @@ def atari_learn(env,
         target_update_freq=10000,
         grad_norm_clipping=10,
         double_q=double,
+        prioritized_replay=prioritized,
+        replay_buffer_dir=replay_buffer_dir,
+        replay_snapshot_dir=replay_snapshot_dir,
         logdir=os.path.join(logdir,'%d'%seed)
     )
     env.close()
@@ -132,6 +138,11 @@ def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--env_name', type=str, default='PongNoFrameskip-v4')
+    parser.add_argument('--prioritized', action='store_true')
+    parser.add_argument('--replay_buffer_dir', type=str, default=None,
+                        help='keep the replay buffer in memory-mapped files under this directory')
+    parser.add_argument('--replay_snapshot_dir', type=str, default=None,
+                        help='periodically snapshot the replay buffer here, and resume from it if present')
     args = parser.parse_args()
 
     data_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
@@ -144,6 +155,8 @@ def main():
     for double in [True]:
         def train_func():
             alg_name = 'ddqn' if double else 'dqn'
+            if args.prioritized:
+                alg_name = 'per_' + alg_name
             logdir = args.env_name + '_' + alg_name + '_' + time.strftime("%d-%m-%Y_%H-%M-%S")
             logdir = os.path.join(data_path, logdir)
             if not(os.path.exists(logdir)):
@@ -157,7 +170,9 @@ def main():
             print('random seed = %d' % seed)
             env = get_env(task, seed)
             session = get_session()
-            atari_learn(env, session, double, logdir, seed, num_timesteps=2e8)
+            atari_learn(env, session, double, logdir, seed, num_timesteps=2e8, prioritized=args.prioritized,
+                        replay_buffer_dir=args.replay_buffer_dir,
+                        replay_snapshot_dir=args.replay_snapshot_dir)
 
         p = Process(target=train_func)
         p.start()
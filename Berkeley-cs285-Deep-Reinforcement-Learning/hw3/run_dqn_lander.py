@@ -60,7 +60,8 @@ def lander_kwargs():
 def lander_learn(env,
                  session,
                  num_timesteps,
-                 seed):
+                 seed,
+                 prioritized=False):
     
     optimizer = lander_optimizer()
     stopping_criterion = lander_stopping_criterion(num_timesteps)
@@ -72,6 +73,7 @@ def lander_learn(env,
         exploration=lander_exploration_schedule(num_timesteps),
         stopping_criterion=lander_stopping_criterion(num_timesteps),
         double_q=True,
+        prioritized_replay=prioritized,
         **lander_kwargs()
     )
     env.close()
@@ -105,13 +107,17 @@ def get_env(seed):
     return env
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--prioritized', action='store_true')
+    args = parser.parse_args()
+
     # Run training
     seed = 4565 # you may want to randomize this
     print('random seed = %d' % seed)
     env = get_env(seed)
     session = get_session()
     set_global_seeds(seed)
-    lander_learn(env, session, num_timesteps=500000, seed=seed)
+    lander_learn(env, session, num_timesteps=500000, seed=seed, prioritized=args.prioritized)
 
 if __name__ == "__main__":
     main()
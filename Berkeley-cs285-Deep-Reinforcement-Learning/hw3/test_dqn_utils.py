@@ -0,0 +1,16 @@
+import numpy as np
+
+from dqn_utils import PrioritizedReplayBuffer
+
+
+def test_prioritized_sample_skips_transition_without_next_frame():
+    np.random.seed(0)
+    buffer = PrioritizedReplayBuffer(16, 1, alpha=0.6, lander=True)
+    for t in range(40):
+        idx = buffer.store_frame(np.full(2, t, dtype=np.float32))
+        buffer.store_effect(idx, 0, 1.0, False)
+        if buffer.can_sample(8):
+            # as in QLearner.update_model, before the next store_frame
+            obs, _, _, next_obs, _, _, idxes = buffer.sample(8, beta=0.4)
+            assert idx not in idxes
+            np.testing.assert_array_equal(next_obs, obs + 1)
@@ -14,6 +14,11 @@ parser.add_argument('--render', action='store_true')
 parser.add_argument('--mpc_horizon', type=int, default=15)
 parser.add_argument('--num_random_action_selection', type=int, default=4096)
 parser.add_argument('--nn_layers', type=int, default=1)
+parser.add_argument('--planner', type=str, default='random', choices=('random', 'cem', 'mppi'))
+parser.add_argument('--planner_iterations', type=int, default=5)
+parser.add_argument('--num_elites', type=int, default=64)
+parser.add_argument('--ensemble_size', type=int, default=1)
+parser.add_argument('--propagation', type=str, default='ts1', choices=('ts1', 'tsinf'))
 args = parser.parse_args()
 
 data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
@@ -34,7 +39,12 @@ mbrl = ModelBasedRL(env=env,
                     render=args.render,
                     mpc_horizon=args.mpc_horizon,
                     num_random_action_selection=args.num_random_action_selection,
-                    nn_layers=args.nn_layers)
+                    nn_layers=args.nn_layers,
+                    planner=args.planner,
+                    planner_iterations=args.planner_iterations,
+                    num_elites=args.num_elites,
+                    ensemble_size=args.ensemble_size,
+                    propagation=args.propagation)
 
 run_func = {
     'q1': mbrl.run_q1,
@@ -11,7 +11,13 @@ class ModelBasedPolicy(object):
                  init_dataset,
                  horizon=15,
                  num_random_action_selection=4096,
-                 nn_layers=1):
+                 nn_layers=1,
+                 planner='random',
+                 planner_iterations=5,
+                 num_elites=64,
+                 mppi_temperature=1.0,
+                 ensemble_size=1,
+                 propagation='ts1'):
         self._cost_fn = env.cost_fn
         self._state_dim = env.observation_space.shape[0]
         self._action_dim = env.action_space.shape[0]
@@ -22,9 +28,23 @@ class ModelBasedPolicy(object):
         self._num_random_action_selection = num_random_action_selection
         self._nn_layers = nn_layers
         self._learning_rate = 1e-3
-
-        self._sess, self._state_ph, self._action_ph, self._next_state_ph,\
-            self._next_state_pred, self._loss, self._optimizer, self._best_action = self._setup_graph()
+        assert planner in ('random', 'cem', 'mppi')
+        self._planner = planner
+        self._planner_iterations = planner_iterations
+        self._num_elites = num_elites
+        self._mppi_temperature = mppi_temperature
+        assert propagation in ('ts1', 'tsinf')
+        assert num_random_action_selection % ensemble_size == 0, \
+            'the planned action sequences are split evenly between the ensemble members'
+        self._ensemble_size = ensemble_size
+        self._propagation = propagation
+        # plan used when there is no previous one: the middle of the action space
+        self._default_plan = np.tile((self._action_space_low + self._action_space_high) / 2.,
+                                     (self._horizon, 1))
+
+        self._sess, self._state_ph, self._action_ph, self._next_state_ph, self._plan_init_ph,\
+            self._next_state_pred, self._loss, self._optimizer, self._best_action, self._plan = self._setup_graph()
+        self.reset()
 
     def _setup_placeholders(self):
         """
@@ -34,6 +54,8 @@ class ModelBasedPolicy(object):
                 state_ph: current state
                 action_ph: current_action
                 next_state_ph: next state
+                plan_init_ph: action sequence the planner starts refining from,
+                    shape [self._horizon, self._action_dim]
 
             implementation details:
                 (a) the placeholders should have 2 dimensions,
@@ -44,8 +66,9 @@ class ModelBasedPolicy(object):
         state_ph = tf.placeholder(tf.float32, [None, self._state_dim], name='state')
         action_ph = tf.placeholder(tf.float32, [None, self._action_dim], name='action')
         next_state_ph = tf.placeholder(tf.float32, [None, self._state_dim], name='next_state')
+        plan_init_ph = tf.placeholder(tf.float32, [self._horizon, self._action_dim], name='plan_init')
 
-        return state_ph, action_ph, next_state_ph
+        return state_ph, action_ph, next_state_ph, plan_init_ph
 
     def _dynamics_func(self, state, action, reuse):
         """
@@ -69,8 +92,13 @@ class ModelBasedPolicy(object):
         ### YOUR CODE HERE
         state_norm = utils.normalize(state, self._init_dataset.state_mean, self._init_dataset.state_std)
         action_norm = utils.normalize(action, self._init_dataset.action_mean, self._init_dataset.action_std)
-        x = tf.concat([state_norm, action_norm], axis=1)
-        state_delta = utils.build_mlp(x, self._state_dim, 'dynamic_net', self._nn_layers, reuse=reuse)
+        x = tf.concat([state_norm, action_norm], axis=-1)
+        if self._ensemble_size > 1:
+            # state and action are [ensemble_size, batch_size, dim], one batch per member
+            state_delta = utils.build_ensemble_mlp(x, self._state_dim, 'dynamic_net', self._ensemble_size,
+                                                   self._nn_layers, reuse=reuse)
+        else:
+            state_delta = utils.build_mlp(x, self._state_dim, 'dynamic_net', self._nn_layers, reuse=reuse)
         next_state_pred = state + utils.unnormalize(state_delta, self._init_dataset.delta_state_mean, self._init_dataset.delta_state_std)
 
         return next_state_pred
@@ -107,6 +135,31 @@ class ModelBasedPolicy(object):
 
         return loss, optimizer
 
+    def _setup_ensemble(self, state_ph, action_ph, next_state_ph):
+        """
+            Training and prediction for an ensemble of self._ensemble_size dynamics models
+
+            Every member is trained on its own bootstrap resample of the minibatch, drawn inside
+            the graph, so one train_step updates the whole ensemble. Predictions are the mean
+            over the members.
+
+            returns:
+                next_state_pred: predicted next state, averaged over the ensemble
+                loss: Scalar loss tensor
+                optimizer: Operation used to perform gradient descent
+        """
+        batch_size = tf.shape(state_ph)[0]
+        bootstrap_idxs = tf.random_uniform([self._ensemble_size, batch_size], 0, batch_size, dtype=tf.int32)
+        states = tf.gather(state_ph, bootstrap_idxs)
+        next_states = tf.gather(next_state_ph, bootstrap_idxs)
+        next_states_pred = self._dynamics_func(states, tf.gather(action_ph, bootstrap_idxs), reuse=False)
+        loss, optimizer = self._setup_training(states, next_states, next_states_pred)
+
+        tile = lambda x: tf.tile(x[None], [self._ensemble_size, 1, 1])
+        next_state_pred = tf.reduce_mean(self._dynamics_func(tile(state_ph), tile(action_ph), reuse=True), axis=0)
+
+        return next_state_pred, loss, optimizer
+
     def _setup_action_selection(self, state_ph):
         """
             Computes the best action from the current state by using randomly sampled action sequences
@@ -138,17 +191,91 @@ class ModelBasedPolicy(object):
         ### YOUR CODE HERE
         action_sequences = tf.random_uniform([self._horizon, self._num_random_action_selection, self._action_dim], 
                                              self._action_space_low, self._action_space_high)
-        states = tf.tile(state_ph, [self._num_random_action_selection, 1])
-        
-        costs = tf.zeros([self._num_random_action_selection])
+        costs = self._rollout_costs(state_ph, action_sequences)
+
+        best_action = action_sequences[0, tf.argmin(costs)]
+
+        return best_action
+
+    def _rollout_costs(self, state_ph, action_sequences):
+        """
+            Unrolls action_sequences of shape [self._horizon, N, self._action_dim] from the state
+            in state_ph through the dynamics model
+
+            returns:
+                costs: total cost of every action sequence, shape [N]
+        """
+        num_sequences = action_sequences.get_shape()[1].value
+        states = tf.tile(state_ph, [num_sequences, 1])
+
+        costs = tf.zeros([num_sequences])
         for i in range(self._horizon):
-            next_states = self._dynamics_func(states, action_sequences[i], reuse=True)
+            next_states = self._propagate(states, action_sequences[i])
             costs += self._cost_fn(states, action_sequences[i], next_states)
             states = next_states
 
-        best_action = action_sequences[0, tf.argmin(costs)]
+        return costs
 
-        return best_action
+    def _propagate(self, states, actions):
+        """
+            Predicts the next states of a batch of planned trajectories, shape [N, self._state_dim]
+
+            With an ensemble the batch is split into self._ensemble_size equal groups, each
+            propagated by one member in a single batched op:
+                'ts1': trajectory i always goes through the same member
+                'tsinf': trajectories are shuffled between members at every step
+        """
+        if self._ensemble_size == 1:
+            return self._dynamics_func(states, actions, reuse=True)
+
+        # the state batch size is not known statically, the planned actions' is
+        num_sequences = actions.get_shape()[0].value
+        if self._propagation == 'tsinf':
+            perm = tf.random_shuffle(tf.range(num_sequences))
+            states, actions = tf.gather(states, perm), tf.gather(actions, perm)
+        next_states = self._dynamics_func(tf.reshape(states, [self._ensemble_size, -1, self._state_dim]),
+                                          tf.reshape(actions, [self._ensemble_size, -1, self._action_dim]),
+                                          reuse=True)
+        next_states = tf.reshape(next_states, [num_sequences, self._state_dim])
+        if self._propagation == 'tsinf':
+            next_states = tf.gather(next_states, tf.invert_permutation(perm))
+        return next_states
+
+    def _setup_iterative_action_selection(self, state_ph, plan_init_ph):
+        """
+            Computes the best action with a sampling-based planner that refines a Gaussian
+            over action sequences for self._planner_iterations iterations, starting from the
+            mean plan_init_ph (the previous plan shifted by one step)
+
+            'cem': the Gaussian is refit to the self._num_elites lowest-cost sequences
+            'mppi': the mean is replaced by the average of all sequences weighted by
+                exp(-cost / self._mppi_temperature), the standard deviation is kept fixed
+
+            returns:
+                best_action: first action of the refined plan (tensor with shape [self._action_dim])
+                plan: the refined plan, shape [self._horizon, self._action_dim]
+        """
+        low = self._action_space_low.astype(np.float32)
+        high = self._action_space_high.astype(np.float32)
+        num_sequences = self._num_random_action_selection
+
+        mean = plan_init_ph
+        std = tf.tile(((high - low) / 4.)[None], [self._horizon, 1])
+        for _ in range(self._planner_iterations):
+            noise = tf.random_normal([self._horizon, num_sequences, self._action_dim])
+            action_sequences = tf.clip_by_value(mean[:, None] + std[:, None] * noise, low, high)
+            costs = self._rollout_costs(state_ph, action_sequences)
+
+            if self._planner == 'cem':
+                _, elite_idxs = tf.nn.top_k(-costs, k=self._num_elites)
+                elites = tf.gather(action_sequences, elite_idxs, axis=1)
+                mean, var = tf.nn.moments(elites, axes=[1])
+                std = tf.sqrt(var)
+            else:
+                weights = tf.nn.softmax(-(costs - tf.reduce_min(costs)) / self._mppi_temperature)
+                mean = tf.reduce_sum(weights[None, :, None] * action_sequences, axis=1)
+
+        return mean[0], mean
 
     def _setup_graph(self):
         """
@@ -160,17 +287,24 @@ class ModelBasedPolicy(object):
 
         ### PROBLEM 1
         ### YOUR CODE HERE
-        state_ph, action_ph, next_state_ph = self._setup_placeholders()
-        next_state_pred = self._dynamics_func(state_ph, action_ph, reuse=False)
-        loss, optimizer = self._setup_training(state_ph, next_state_ph, next_state_pred)
+        state_ph, action_ph, next_state_ph, plan_init_ph = self._setup_placeholders()
+        if self._ensemble_size > 1:
+            next_state_pred, loss, optimizer = self._setup_ensemble(state_ph, action_ph, next_state_ph)
+        else:
+            next_state_pred = self._dynamics_func(state_ph, action_ph, reuse=False)
+            loss, optimizer = self._setup_training(state_ph, next_state_ph, next_state_pred)
         ### PROBLEM 2
         ### YOUR CODE HERE
-        best_action = self._setup_action_selection(state_ph)
+        if self._planner == 'random':
+            best_action = self._setup_action_selection(state_ph)
+            plan = plan_init_ph
+        else:
+            best_action, plan = self._setup_iterative_action_selection(state_ph, plan_init_ph)
 
         sess.run(tf.global_variables_initializer())
 
-        return sess, state_ph, action_ph, next_state_ph, \
-                next_state_pred, loss, optimizer, best_action
+        return sess, state_ph, action_ph, next_state_ph, plan_init_ph, \
+                next_state_pred, loss, optimizer, best_action, plan
 
     def train_step(self, states, actions, next_states):
         """
@@ -222,7 +356,17 @@ class ModelBasedPolicy(object):
 
         ### PROBLEM 2
         ### YOUR CODE HERE
-        best_action = self._sess.run(self._best_action, feed_dict={self._state_ph: state[None]})
+        best_action, plan = self._sess.run([self._best_action, self._plan],
+                                           feed_dict={self._state_ph: state[None],
+                                                      self._plan_init_ph: self._prev_plan})
+        # warm start the next step from this plan, shifted by one step
+        self._prev_plan = np.concatenate([plan[1:], self._default_plan[-1:]])
 
         assert np.shape(best_action) == (self._action_dim,)
         return best_action
+
+    def reset(self):
+        """
+        Forgets the previous plan, called at the start of every rollout
+        """
+        self._prev_plan = self._default_plan
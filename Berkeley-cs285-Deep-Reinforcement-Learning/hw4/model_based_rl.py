@@ -22,7 +22,12 @@ class ModelBasedRL(object):
                  render=False,
                  mpc_horizon=15,
                  num_random_action_selection=4096,
-                 nn_layers=1):
+                 nn_layers=1,
+                 planner='random',
+                 planner_iterations=5,
+                 num_elites=64,
+                 ensemble_size=1,
+                 propagation='ts1'):
         self._env = env
         self._max_rollout_length = max_rollout_length
         self._num_onpolicy_iters = num_onplicy_iters
@@ -39,7 +44,12 @@ class ModelBasedRL(object):
         self._policy = ModelBasedPolicy(env,
                                         self._random_dataset,
                                         horizon=mpc_horizon,
-                                        num_random_action_selection=num_random_action_selection)
+                                        num_random_action_selection=num_random_action_selection,
+                                        planner=planner,
+                                        planner_iterations=planner_iterations,
+                                        num_elites=num_elites,
+                                        ensemble_size=ensemble_size,
+                                        propagation=propagation)
 
         timeit.reset()
         timeit.start('total')
@@ -49,6 +59,7 @@ class ModelBasedRL(object):
 
         for _ in range(num_rollouts):
             state = self._env.reset()
+            policy.reset()
             done = False
             t = 0
             while not done:
@@ -37,3 +37,12 @@ python main.py q3 --exp_name layers1 --nn_layers 1
 python main.py q3 --exp_name layers2 --nn_layers 2
 python main.py q3 --exp_name layers3 --nn_layers 3
 python plot.py --exps HalfCheetah_q3_layers1 HalfCheetah_q3_layers2 HalfCheetah_q3_layers3 --save HalfCheetah_q3_nn_layers
+
+################
+### Planners ###
+################
+
+python main.py q3 --exp_name random --planner random
+python main.py q3 --exp_name cem --planner cem --num_random_action_selection 512
+python main.py q3 --exp_name mppi --planner mppi --num_random_action_selection 512
+python plot.py --exps HalfCheetah_q3_random HalfCheetah_q3_cem HalfCheetah_q3_mppi --save HalfCheetah_q3_planners
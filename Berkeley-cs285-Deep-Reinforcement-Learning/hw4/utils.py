@@ -8,21 +8,76 @@ from logger import logger
 ### Data ###
 ############
 
-class Dataset(object):
+class _RunningStats(object):
+    """
+    Running mean and (population) variance of a stream of vectors, updated in
+    O(dim) per sample or per merged batch with Chan et al.'s parallel algorithm
+    """
 
     def __init__(self):
-        self._states = []
-        self._actions = []
-        self._next_states = []
-        self._rewards = []
-        self._dones = []
+        self._count = 0
+        self._mean = None
+        self._m2 = None
+
+    def update(self, x):
+        """
+        Add a batch of samples x with shape (batch_size, dim)
+        """
+        count = len(x)
+        if count == 0:
+            return
+        mean = np.mean(x, axis=0)
+        m2 = np.sum(np.square(x - mean), axis=0)
+        self.merge(count, mean, m2)
+
+    def merge(self, count, mean, m2):
+        if count == 0:
+            return
+        if self._count == 0:
+            self._count, self._mean, self._m2 = count, mean.astype(np.float64), m2.astype(np.float64)
+            return
+        total = self._count + count
+        delta = mean - self._mean
+        self._mean = self._mean + delta * count / total
+        self._m2 = self._m2 + m2 + np.square(delta) * self._count * count / total
+        self._count = total
+
+    @property
+    def mean(self):
+        return self._mean if self._count > 0 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / self._count) if self._count > 0 else np.nan
+
+
+class Dataset(object):
+    """
+    Transitions stored column-wise in preallocated numpy arrays whose capacity
+    doubles when full, so adding data is amortized O(1) and iterating never
+    converts the whole dataset to arrays. Normalization statistics are kept up
+    to date incrementally as data is added.
+    """
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._capacity = capacity
+        self._states = None
+        self._actions = None
+        self._next_states = None
+        self._rewards = None
+        self._dones = None
+
+        self._state_stats = _RunningStats()
+        self._action_stats = _RunningStats()
+        self._delta_state_stats = _RunningStats()
 
     @property
     def is_empty(self):
         return len(self) == 0
 
     def __len__(self):
-        return len(self._states)
+        return self._size
 
     ##################
     ### Statistics ###
@@ -30,63 +85,130 @@ class Dataset(object):
 
     @property
     def state_mean(self):
-        return np.mean(self._states, axis=0)
+        return self._state_stats.mean
 
     @property
     def state_std(self):
-        return np.std(self._states, axis=0)
+        return self._state_stats.std
 
     @property
     def action_mean(self):
-        return np.mean(self._actions, axis=0)
+        return self._action_stats.mean
 
     @property
     def action_std(self):
-        return np.std(self._actions, axis=0)
+        return self._action_stats.std
 
     @property
     def delta_state_mean(self):
-        return np.mean(np.array(self._next_states) - np.array(self._states), axis=0)
+        return self._delta_state_stats.mean
 
     @property
     def delta_state_std(self):
-        return np.std(np.array(self._next_states) - np.array(self._states), axis=0)
+        return self._delta_state_stats.std
 
     ###################
     ### Adding data ###
     ###################
 
+    def _allocate(self, state_dim, action_dim):
+        self._states = np.empty((self._capacity, state_dim))
+        self._actions = np.empty((self._capacity, action_dim))
+        self._next_states = np.empty((self._capacity, state_dim))
+        self._rewards = np.empty(self._capacity)
+        self._dones = np.empty(self._capacity, dtype=bool)
+
+    def _reserve(self, size):
+        """
+        Grow the arrays by doubling until they can hold size transitions
+        """
+        if size <= self._capacity:
+            return
+        while self._capacity < size:
+            self._capacity *= 2
+        for name in ('_states', '_actions', '_next_states', '_rewards', '_dones'):
+            old = getattr(self, name)
+            new = np.empty((self._capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
     def add(self, state, action, next_state, reward, done):
         """
         Add (s, a, r, s') to this dataset
         """
-        if not self.is_empty:
-            # ensure the state, action, next_state are of the same dimension
-            assert len(self._states[-1]) == len(np.ravel(state))
-            assert len(self._actions[-1]) == len(np.ravel(action))
-            assert len(self._next_states[-1]) == len(np.ravel(next_state))
-
-        self._states.append(np.ravel(state))
-        self._actions.append(np.ravel(action))
-        self._next_states.append(np.ravel(next_state))
-        self._rewards.append(reward)
-        self._dones.append(done)
+        state, action, next_state = np.ravel(state), np.ravel(action), np.ravel(next_state)
+        if self._states is None:
+            self._allocate(len(state), len(action))
+        # ensure the state, action, next_state are of the same dimension
+        assert self._states.shape[1] == len(state)
+        assert self._actions.shape[1] == len(action)
+        assert self._next_states.shape[1] == len(next_state)
+
+        self._reserve(self._size + 1)
+        i = self._size
+        self._states[i] = state
+        self._actions[i] = action
+        self._next_states[i] = next_state
+        self._rewards[i] = reward
+        self._dones[i] = done
+        self._size += 1
+
+        self._state_stats.update(state[None])
+        self._action_stats.update(action[None])
+        self._delta_state_stats.update((next_state - state)[None])
 
     def append(self, other_dataset):
         """
         Append other_dataset to this dataset
         """
-        if not self.is_empty and not other_dataset.is_empty:
-            # ensure the state, action, next_state are of the same dimension
-            assert len(self._states[-1]) == len(other_dataset._states[-1])
-            assert len(self._actions[-1]) == len(other_dataset._actions[-1])
-            assert len(self._next_states[-1]) == len(other_dataset._next_states[-1])
-
-        self._states += other_dataset._states
-        self._actions += other_dataset._actions
-        self._next_states += other_dataset._next_states
-        self._rewards += other_dataset._rewards
-        self._dones += other_dataset._dones
+        if other_dataset.is_empty:
+            return
+        if self._states is None:
+            self._allocate(other_dataset._states.shape[1], other_dataset._actions.shape[1])
+        # ensure the state, action, next_state are of the same dimension
+        assert self._states.shape[1] == other_dataset._states.shape[1]
+        assert self._actions.shape[1] == other_dataset._actions.shape[1]
+        assert self._next_states.shape[1] == other_dataset._next_states.shape[1]
+
+        start, end = self._size, self._size + len(other_dataset)
+        self._reserve(end)
+        self._states[start:end] = other_dataset.states
+        self._actions[start:end] = other_dataset.actions
+        self._next_states[start:end] = other_dataset.next_states
+        self._rewards[start:end] = other_dataset.rewards
+        self._dones[start:end] = other_dataset.dones
+        self._size = end
+
+        for stats, other_stats in ((self._state_stats, other_dataset._state_stats),
+                                   (self._action_stats, other_dataset._action_stats),
+                                   (self._delta_state_stats, other_dataset._delta_state_stats)):
+            stats.merge(other_stats._count, other_stats._mean, other_stats._m2)
+
+    ##############
+    ### Access ###
+    ##############
+
+    # views of the filled part of the storage, valid until the next add/append
+
+    @property
+    def states(self):
+        return self._states[:self._size]
+
+    @property
+    def actions(self):
+        return self._actions[:self._size]
+
+    @property
+    def next_states(self):
+        return self._next_states[:self._size]
+
+    @property
+    def rewards(self):
+        return self._rewards[:self._size]
+
+    @property
+    def dones(self):
+        return self._dones[:self._size]
 
     ############################
     ### Iterate through data ###
@@ -96,38 +218,31 @@ class Dataset(object):
         """
         Iterate through all the rollouts in the dataset sequentially
         """
-        end_indices = np.nonzero(self._dones)[0] + 1
-
-        states = np.asarray(self._states)
-        actions = np.asarray(self._actions)
-        next_states = np.asarray(self._next_states)
-        rewards = np.asarray(self._rewards)
-        dones = np.asarray(self._dones)
+        if self.is_empty:
+            return
+        end_indices = np.nonzero(self.dones)[0] + 1
 
         start_idx = 0
         for end_idx in end_indices:
-            indices = np.arange(start_idx, end_idx)
-            yield states[indices], actions[indices], next_states[indices], rewards[indices], dones[indices]
+            s = slice(start_idx, end_idx)
+            yield self._states[s], self._actions[s], self._next_states[s], self._rewards[s], self._dones[s]
             start_idx = end_idx
 
     def random_iterator(self, batch_size):
         """
         Iterate once through all (s, a, r, s') in batches in a random order
         """
-        all_indices = np.nonzero(np.logical_not(self._dones))[0]
+        if self.is_empty:
+            return
+        all_indices = np.nonzero(np.logical_not(self.dones))[0]
         np.random.shuffle(all_indices)
 
-        states = np.asarray(self._states)
-        actions = np.asarray(self._actions)
-        next_states = np.asarray(self._next_states)
-        rewards = np.asarray(self._rewards)
-        dones = np.asarray(self._dones)
-
         i = 0
         while i < len(all_indices):
             indices = all_indices[i:i+batch_size]
 
-            yield states[indices], actions[indices], next_states[indices], rewards[indices], dones[indices]
+            yield self._states[indices], self._actions[indices], self._next_states[indices], \
+                  self._rewards[indices], self._dones[indices]
 
             i += batch_size
 
@@ -136,16 +251,12 @@ class Dataset(object):
     ###############
 
     def log(self):
-        end_idxs = np.nonzero(self._dones)[0] + 1
-
-        returns = []
-
-        start_idx = 0
-        for end_idx in end_idxs:
-            rewards = self._rewards[start_idx:end_idx]
-            returns.append(np.sum(rewards))
-
-            start_idx = end_idx
+        end_idxs = np.nonzero(self.dones)[0] + 1
+        if len(end_idxs) > 0:
+            start_idxs = np.append(0, end_idxs[:-1])
+            returns = np.add.reduceat(self.rewards[:end_idxs[-1]], start_idxs)
+        else:
+            returns = []
 
         logger.record_tabular('ReturnAvg', np.mean(returns))
         logger.record_tabular('ReturnStd', np.std(returns))
@@ -171,6 +282,36 @@ def build_mlp(input_layer,
         layer = tf.layers.dense(layer, output_dim, activation=output_activation)
     return layer
 
+def build_ensemble_mlp(input_layer,
+                       output_dim,
+                       scope,
+                       ensemble_size,
+                       n_layers=1,
+                       hidden_dim=500,
+                       activation=tf.nn.relu,
+                       output_activation=None,
+                       reuse=False):
+    """
+    ensemble_size independent MLPs evaluated as one batched matmul per layer
+
+    input_layer has shape [ensemble_size, batch_size, input_dim], member k gets input_layer[k]
+    """
+    layer = input_layer
+    with tf.variable_scope(scope, reuse=reuse):
+        for i in range(n_layers + 1):
+            is_output = (i == n_layers)
+            in_dim = layer.get_shape()[-1].value
+            out_dim = output_dim if is_output else hidden_dim
+            kernel = tf.get_variable('kernel_{0}'.format(i), [ensemble_size, in_dim, out_dim],
+                                     initializer=tf.glorot_uniform_initializer())
+            bias = tf.get_variable('bias_{0}'.format(i), [ensemble_size, 1, out_dim],
+                                   initializer=tf.zeros_initializer())
+            layer = tf.matmul(layer, kernel) + bias
+            layer_activation = output_activation if is_output else activation
+            if layer_activation is not None:
+                layer = layer_activation(layer)
+    return layer
+
 def normalize(x, mean, std, eps=1e-8):
     return (x - mean) / (std + eps)
 
@@ -190,3 +331,6 @@ class RandomPolicy(object):
     def get_action(self, state):
         return np.random.uniform(self._action_space_low, self._action_space_high)
 
+    def reset(self):
+        pass
+
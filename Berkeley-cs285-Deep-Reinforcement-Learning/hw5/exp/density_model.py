@@ -1,4 +1,5 @@
 import numpy as np
+import scipy.spatial
 import tensorflow as tf
 import tensorflow_probability as tfp
 from ex_utils import build_mlp
@@ -15,30 +16,31 @@ class Density_Model(object):
 
 class Histogram(Density_Model):
     def __init__(self, nbins, preprocessor):
+        """
+            preprocessor maps a batch of states (bsize, ob_dim) to their bins (bsize)
+        """
         super(Histogram, self).__init__()
-        self.nbins = nbins
+        self.nbins = int(nbins)
         self.total = 0.
-        self.hist = {}
-        for i in range(int(self.nbins)):
-            self.hist[i] = 0
+        self.hist = np.zeros(self.nbins)
         self.preprocessor = preprocessor
 
-    def update_count(self, state, increment):
+    def update_count(self, states, increment):
         """
             ### PROBLEM 1
             ### YOUR CODE HERE
 
             args:
-                state: numpy array
+                states: numpy array (bsize, ob_dim), or a single state (ob_dim)
                 increment: int
 
             TODO:
                 1. increment the entry "bin_name" in self.hist by "increment"
                 2. increment self.total by "increment" 
         """
-        bin_name = self.preprocessor(state)
-        self.hist[bin_name] += increment
-        self.total += increment
+        bin_names = np.atleast_1d(self.preprocessor(states))
+        self.hist += increment * np.bincount(bin_names, minlength=self.nbins)
+        self.total += increment * len(bin_names)
 
     def get_count(self, states):
         """
@@ -56,10 +58,7 @@ class Histogram(Density_Model):
                     1. get the bin_name using self.preprocessor
                     2. get the value of self.hist with key bin_name
         """
-        counts = np.zeros(states.shape[0])
-        for i, s in enumerate(states):
-            bin_name = self.preprocessor(s)
-            counts[i] = self.hist[bin_name]
+        counts = self.hist[self.preprocessor(states)]
         return counts
 
     def get_prob(self, states):
@@ -159,6 +158,117 @@ class RBF(Density_Model):
 
             return densities
 
+class KDTreeRBF(RBF):
+    """
+        RBF density with the kernel truncated at cutoff * sigma.
+
+        The means are indexed by a KD-tree, so every state only touches the
+        replay states within the cutoff instead of all B of them. Each dropped
+        term is smaller than exp(-cutoff**2 / 2), so with the default cutoff of
+        3 the densities match RBF to about 1e-2 of a single kernel.
+    """
+    def __init__(self, sigma, cutoff=3.):
+        super(KDTreeRBF, self).__init__(sigma)
+        self.cutoff = cutoff
+        self.tree = None
+
+    def fit_data(self, data):
+        super(KDTreeRBF, self).fit_data(data)
+        self.tree = scipy.spatial.cKDTree(self.means)
+
+    def get_prob(self, states):
+        b, ob_dim = states.shape
+        if self.means is None:
+            return (1.0/len(states))*np.ones(len(states))
+        B, replay_dim = self.means.shape
+        assert states.ndim == self.means.ndim and ob_dim == replay_dim
+
+        # (state, mean, distance) for every pair closer than the cutoff
+        pairs = scipy.spatial.cKDTree(states).sparse_distance_matrix(
+            self.tree, self.cutoff * self.sigma, output_type='ndarray')
+
+        gaussians = np.exp(-pairs['v']**2 / (2 * self.sigma**2))
+        densities = np.bincount(pairs['i'], weights=gaussians, minlength=b) / B
+
+        # states with nothing within the cutoff fall back to their nearest
+        # mean, which keeps the density (and so -log density) finite
+        lonely = np.bincount(pairs['i'], minlength=b) == 0
+        if np.any(lonely):
+            nn_dists, _ = self.tree.query(states[lonely])
+            densities[lonely] = np.exp(-nn_dists**2 / (2 * self.sigma**2)) / B
+        assert densities.shape == (b,)
+
+        return densities
+
+class RandomFeatureRBF(RBF):
+    """
+        RBF density approximated with random Fourier features,
+        https://people.eecs.berkeley.edu/~brecht/papers/07.rah.rec.nips.pdf
+
+        k(x, y) ~ phi(x) . phi(y), so the mean over the replay buffer of
+        k(x, mean) is phi(x) . mu where mu is the mean feature of the buffer.
+        mu is kept as a running sum that add_data/remove_data update, so a
+        bonus costs O(b * num_features * ob_dim) whatever the replay size.
+    """
+    incremental = True
+
+    def __init__(self, sigma, num_features=512, seed=None):
+        super(RandomFeatureRBF, self).__init__(sigma)
+        self.num_features = num_features
+        self.rng = np.random.RandomState(seed)
+        self.W = None
+        self.feature_sum = None
+        self.count = 0
+
+    def _features(self, states):
+        states = np.asarray(states, dtype=np.float64)
+        if self.W is None:
+            ob_dim = states.shape[-1]
+            self.W = self.rng.normal(scale=1. / self.sigma, size=(ob_dim, self.num_features))
+            self.b = self.rng.uniform(0, 2 * np.pi, size=self.num_features)
+            self.feature_sum = np.zeros(self.num_features)
+        return np.sqrt(2. / self.num_features) * np.cos(states.dot(self.W) + self.b)
+
+    def add_data(self, data):
+        """
+            args:
+                data: list of states of shape (ob_dim)
+        """
+        if len(data) == 0:
+            return
+        features = self._features(np.stack(data))
+        self.feature_sum += features.sum(axis=0)
+        self.count += len(data)
+
+    def remove_data(self, data):
+        """
+            args:
+                data: list of states of shape (ob_dim) that left the replay buffer
+        """
+        if len(data) == 0:
+            return
+        features = self._features(np.stack(data))
+        self.feature_sum -= features.sum(axis=0)
+        self.count -= len(data)
+
+    def fit_data(self, data):
+        if self.feature_sum is not None:
+            self.feature_sum[:] = 0
+        self.count = 0
+        self.add_data(data)
+
+    def get_prob(self, states):
+        b, ob_dim = states.shape
+        if self.count == 0:
+            return (1.0/len(states))*np.ones(len(states))
+        mean_embedding = self.feature_sum / self.count
+        densities = self._features(states).dot(mean_embedding)
+        # the estimate is unbiased but can dip below zero far from the data
+        densities = np.maximum(densities, np.finfo(np.float32).tiny)
+        assert densities.shape == (b,)
+
+        return densities
+
 class Exemplar(Density_Model):
     def __init__(self, ob_dim, hid_dim, learning_rate, kl_weight):
         super(Exemplar, self).__init__()
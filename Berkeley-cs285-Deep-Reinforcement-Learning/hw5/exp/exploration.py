@@ -56,8 +56,7 @@ class DiscreteExploration(Exploration):
             args:
                 states: (bsize, ob_dim)
         """
-        for s in states:
-            self.density_model.update_count(s, 1)
+        self.density_model.update_count(states, 1)
 
     def bonus_function(self, count):
         """
@@ -123,8 +122,17 @@ class RBFExploration(ContinuousExploration):
             args:
                 states: (bsize, ob_dim)
         """
-        self.replay_buffer.prepend(states)
-        self.density_model.fit_data(self.replay_buffer.get_memory())
+        if getattr(self.density_model, 'incremental', False):
+            # only hand the model what entered and left the buffer, instead of
+            # refitting it to a copy of the whole memory
+            incoming = list(states) + self.replay_buffer.memory
+            self.replay_buffer.prepend(states)
+            evicted = incoming[len(self.replay_buffer):]
+            self.density_model.add_data(list(states))
+            self.density_model.remove_data(evicted)
+        else:
+            self.replay_buffer.prepend(states)
+            self.density_model.fit_data(self.replay_buffer.get_memory())
 
 
 class ExemplarExploration(ContinuousExploration):
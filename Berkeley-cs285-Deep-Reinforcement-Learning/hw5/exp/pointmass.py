@@ -73,15 +73,15 @@ class PointMass(Env):
         return state, reward, done, None
 
     def preprocess(self, state):
-        scaled_state = self.scale * state
-        x_floor, y_floor = np.floor(scaled_state)
-        assert x_floor <= self.scale
-        assert y_floor <= self.scale
-        if x_floor == self.scale:
-            x_floor -= 1
-        if y_floor == self.scale:
-            y_floor -= 1
-        index = self.scale*x_floor + y_floor
+        """
+            grid cell index of a state (ob_dim,) or of a batch of states (b, ob_dim)
+        """
+        scaled_state = self.scale * np.asarray(state)
+        floors = np.floor(scaled_state).astype(np.int64)
+        assert np.all(floors <= self.scale)
+        # states on the upper boundary belong to the last cell
+        floors = np.minimum(floors, self.scale - 1)
+        index = self.scale*floors[..., 0] + floors[..., 1]
         return index
 
     def unprocess(self, index):
@@ -96,10 +96,7 @@ class PointMass(Env):
     def render(self):
         # create a grid
         states = [self.state/self.scale]
-        indices = np.array([int(self.preprocess(s)) for s in states])
-        a = np.zeros(self.grid_size)
-        for i in indices:
-            a[i] += 1
+        a = np.bincount(self.preprocess(np.array(states)), minlength=self.grid_size).astype(np.float64)
         max_freq = np.max(a)
         a/=float(max_freq)  # normalize
         a = np.reshape(a, (self.scale, self.scale))
@@ -111,10 +108,7 @@ class PointMass(Env):
     def visualize(self, states, itr, dirname):
         if states is None:
             states = np.load(os.path.join(dirname, '{}.npy'.format(itr)))
-        indices = np.array([int(self.preprocess(s)) for s in states])
-        a = np.zeros(int(self.grid_size))
-        for i in indices:
-            a[i] += 1
+        a = np.bincount(self.preprocess(np.array(states)), minlength=self.grid_size).astype(np.float64)
         max_freq = np.max(a)
         a/=float(max_freq)  # normalize
         a = np.reshape(a, (self.scale, self.scale))
@@ -15,7 +15,7 @@ import inspect
 from multiprocessing import Process
 
 from exploration import ExemplarExploration, DiscreteExploration, RBFExploration
-from density_model import Exemplar, Histogram, RBF
+from density_model import Exemplar, Histogram, RBF, KDTreeRBF, RandomFeatureRBF
 
 #============================================================================================#
 # Utilities
@@ -389,6 +389,9 @@ def train_AC(
         dm,
         replay_size,
         sigma,
+        rbf_backend='exact',
+        rbf_cutoff=3.,
+        rbf_features=512,
         ########################################################################
         ):
     start = time.time()
@@ -469,7 +472,12 @@ def train_AC(
                 density_model=density_model,
                 bonus_coeff=bonus_coeff)
         elif dm == 'rbf':
-            density_model = RBF(sigma=sigma)
+            if rbf_backend == 'kdtree':
+                density_model = KDTreeRBF(sigma=sigma, cutoff=rbf_cutoff)
+            elif rbf_backend == 'rff':
+                density_model = RandomFeatureRBF(sigma=sigma, num_features=rbf_features, seed=seed)
+            else:
+                density_model = RBF(sigma=sigma)
             exploration = RBFExploration(
                 density_model=density_model,
                 bonus_coeff=bonus_coeff,
@@ -622,6 +630,9 @@ def main():
     parser.add_argument('--density_hiddim', '-dh', type=int, default=32)
     parser.add_argument('--replay_size', '-rs', type=int, default=int(1e6))
     parser.add_argument('--sigma', '-sig', type=float, default=0.2)
+    parser.add_argument('--rbf_backend', '-rbf', type=str, default='exact', choices=['exact', 'kdtree', 'rff'])
+    parser.add_argument('--rbf_cutoff', type=float, default=3.)
+    parser.add_argument('--rbf_features', type=int, default=512)
     ########################################################################
 
     args = parser.parse_args()
@@ -669,7 +680,10 @@ def main():
                 density_hiddim=args.density_hiddim,
                 dm=args.density_model,
                 replay_size=args.replay_size,
-                sigma=args.sigma
+                sigma=args.sigma,
+                rbf_backend=args.rbf_backend,
+                rbf_cutoff=args.rbf_cutoff,
+                rbf_features=args.rbf_features
                 ########################################################################
                 )
 
@@ -0,0 +1,91 @@
+"""
+O(T) discounted return and GAE kernels for flat, concatenated batches of paths.
+
+A batch of paths is given as one array of per-step values plus a mask that is 0
+on the last step of every path (where nothing is bootstrapped from the next
+step) and 1 elsewhere. Nothing here loops over paths or steps in Python: every
+kernel is a handful of numpy calls plus one scipy.signal.lfilter pass over the
+whole batch.
+
+Copied verbatim into every homework that uses it, like logz.py.
+"""
+import numpy as np
+import scipy.signal
+
+
+def discount_cumsum(x, discount):
+    """
+        y[t] = sum_{t' >= t} discount^(t'-t) * x[t'], over the whole array
+    """
+    return scipy.signal.lfilter([1], [1, float(-discount)], x[::-1], axis=0)[::-1]
+
+def path_masks(lengths):
+    """
+        masks for paths of the given lengths laid out back to back:
+        0 on the last step of every path, 1 elsewhere
+    """
+    masks = np.ones(np.sum(lengths))
+    masks[np.cumsum(lengths) - 1] = 0
+    return masks
+
+def segmented_discount_cumsum(x, discount, masks):
+    """
+        discount_cumsum restricted to the path every step belongs to:
+
+            y[t] = x[t] + discount * masks[t] * y[t+1]
+
+        The unrestricted cumsum z is computed once over the whole batch, then the
+        part that leaked in from later paths is removed:
+
+            y[t] = z[t] - discount^(e+1-t) * z[e+1]
+
+        where e is the last step of the path containing t. A batch that does not
+        end with mask 0 is treated as ending there.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    masks = np.asarray(masks)
+    T = len(x)
+    t = np.arange(T)
+    # e[t]: index of the first path end at or after t
+    ends = np.where(masks == 0, t, T - 1)
+    e = np.minimum.accumulate(ends[::-1])[::-1]
+    z = np.append(discount_cumsum(x, discount), 0.)
+    return z[:-1] - float(discount) ** (e + 1 - t) * z[e + 1]
+
+def reward_to_go(rewards, gamma, masks):
+    """
+        Q_t = sum_{t'=t}^T gamma^(t'-t) * r_{t'}, per path
+    """
+    return segmented_discount_cumsum(rewards, gamma, masks)
+
+def trajectory_returns(rewards, gamma, masks):
+    """
+        Ret(tau) = sum_{t'=0}^T gamma^t' r_{t'}, repeated for every step of its path
+    """
+    rtg = reward_to_go(rewards, gamma, masks)
+    starts = np.append(True, np.asarray(masks)[:-1] == 0)
+    path_ids = np.cumsum(starts) - 1
+    return rtg[starts][path_ids]
+
+def gae(rewards, values, gamma, tau, masks):
+    """
+        Generalized advantage estimation, https://arxiv.org/abs/1506.02438
+
+        arguments:
+            rewards: (T,)
+            values: (T,) value estimates V(s_t)
+            gamma: discount
+            tau: GAE lambda
+            masks: (T,) 0 on the last step of every path
+
+        returns:
+            advantages: (T,)
+            returns: (T,) discounted reward to go
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    next_values = np.append(values[1:], 0.)
+    deltas = rewards + gamma * masks * next_values - values
+    advantages = segmented_discount_cumsum(deltas, gamma * tau, masks)
+    returns = segmented_discount_cumsum(rewards, gamma, masks)
+    return advantages, returns
@@ -19,6 +19,7 @@ import inspect
 from multiprocessing import Process
 
 from replay_buffer import ReplayBuffer, PPOReplayBuffer
+from returns import gae
 
 from point_mass import PointEnv
 from point_mass_observed import ObservedPointEnv
@@ -454,25 +455,10 @@ class Agent(object):
         assert rewards.shape == masks.shape == (bsize,)
         assert values.shape == (bsize, 1)
 
-        bsize = len(rewards)
-        returns = np.empty((bsize,))
-        deltas = np.empty((bsize,))
-        advantages = np.empty((bsize,))
-
-        prev_return = 0
-        prev_value = 0
-        prev_advantage = 0
-        for i in reversed(range(bsize)):
-            returns[i] = rewards[i] + gamma * prev_return * masks[i]
-            deltas[i] = rewards[i] + gamma * prev_value * masks[i] - values[i]
-            advantages[i] = deltas[i] + gamma * tau * prev_advantage * masks[i]
-
-            prev_return = returns[i]
-            prev_value = values[i]
-            prev_advantage = advantages[i]
+        advantages, q_n = gae(rewards, values[:, 0], gamma, tau, masks)
 
         advantages = (advantages - np.mean(advantages, axis=0)) / np.std(advantages, axis=0)
-        return advantages, returns
+        return advantages, q_n
 
 
     def estimate_return(self, ob_no, re_n, hidden, masks):
@@ -1,5 +1,6 @@
-import distutils.version
+import importlib
 import logging
+import re
 import sys
 
 from gym import error
@@ -9,19 +10,26 @@ from gym.version import VERSION as __version__
 
 logger = logging.getLogger(__name__)
 
+def _version_tuple(version):
+    """'1.10.4' -> (1, 10, 4), stopping at the first non-numeric part"""
+    parts = []
+    for part in version.split('.'):
+        digits = re.match(r'\d*', part).group()
+        if not digits:
+            break
+        parts.append(int(digits))
+    return tuple(parts)
+
 # Do this before importing any other gym modules, as most of them import some
-# dependencies themselves.
+# dependencies themselves. requests is only needed by the scoreboard, which
+# checks its version when it is first used.
 def sanity_check_dependencies():
     import numpy
-    import requests
     import six
 
-    if distutils.version.LooseVersion(numpy.__version__) < distutils.version.LooseVersion('1.10.4'):
+    if _version_tuple(numpy.__version__) < (1, 10, 4):
         logger.warn("You have 'numpy' version %s installed, but 'gym' requires at least 1.10.4. HINT: upgrade via 'pip install -U numpy'.", numpy.__version__)
 
-    if distutils.version.LooseVersion(requests.__version__) < distutils.version.LooseVersion('2.0'):
-        logger.warn("You have 'requests' version %s installed, but 'gym' requires at least 2.0. HINT: upgrade via 'pip install -U requests'.", requests.__version__)
-
 # We automatically configure a logger with a simple stderr handler. If
 # you'd rather customize logging yourself, run undo_logger_setup.
 #
@@ -45,9 +53,35 @@ del logger_setup
 sanity_check_dependencies()
 
 from gym.core import Env, Space, Wrapper, ObservationWrapper, ActionWrapper, RewardWrapper
-from gym.benchmarks import benchmark_spec
 from gym.envs import make, spec
-from gym.scoreboard.api import upload
-from gym import wrappers
+
+# The scoreboard, benchmarks and monitoring pull in requests and a few
+# dozen modules that most processes never use, so they are only imported
+# when first accessed as attributes of gym.
+_lazy_attributes = {
+    'benchmark_spec': ('gym.benchmarks', 'benchmark_spec'),
+    'upload': ('gym.scoreboard.api', 'upload'),
+}
+_lazy_submodules = ('benchmarks', 'monitoring', 'scoreboard', 'vector', 'wrappers')
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        module_name, attribute = _lazy_attributes[name]
+        value = getattr(importlib.import_module(module_name), attribute)
+    elif name in _lazy_submodules:
+        value = importlib.import_module('gym.' + name)
+    else:
+        raise AttributeError("module 'gym' has no attribute '{}'".format(name))
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes) | set(_lazy_submodules))
+
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is not supported, import everything now
+    for _name in list(_lazy_attributes) + list(_lazy_submodules):
+        __getattr__(_name)
+    del _name
 
 __all__ = ["Env", "Space", "Wrapper", "make", "spec", "upload", "wrappers"]
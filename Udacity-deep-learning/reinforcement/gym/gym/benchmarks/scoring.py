@@ -1,8 +1,9 @@
 from __future__ import division
 
+import collections
 import logging
+import multiprocessing
 import numpy as np
-from gym import envs
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +64,46 @@ def benchmark_aggregate_score(benchmark, env_id_to_benchmark_results):
         summed_training_seconds=summed_training_seconds,
     )
 
+def _score_training_dir(args):
+    benchmark, training_dir = args
+    # Imported here since gym.monitoring pulls in the wrappers
+    from gym import monitoring
+    results = monitoring.load_results(training_dir)
+    if results is None:
+        return None
+    env_id = results['env_info']['env_id']
+    return env_id, benchmark.score_evaluation(env_id, results['data_sources'], results['initial_reset_timestamps'], results['episode_lengths'], results['episode_rewards'], results['episode_types'], results['timestamps'])
+
+def score_training_dirs(benchmark, training_dirs, processes=None):
+    """Scores every training directory against the benchmark, returning the
+    env_id -> [benchmark_result] mapping benchmark_aggregate_score takes.
+    Results keep the order of training_dirs, and directories without any
+    results are skipped.
+
+    The directories are loaded and scored by a pool of worker processes,
+    one per CPU unless processes is given. With processes=1 everything
+    runs in this process.
+    """
+    jobs = [(benchmark, training_dir) for training_dir in training_dirs]
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(jobs) <= 1:
+        scored = [_score_training_dir(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            chunksize = max(1, len(jobs) // (4 * processes))
+            scored = pool.map(_score_training_dir, jobs, chunksize=chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
+    env_id_to_benchmark_results = collections.defaultdict(list)
+    for result in scored:
+        if result is not None:
+            env_id, benchmark_result = result
+            env_id_to_benchmark_results[env_id].append(benchmark_result)
+    return env_id_to_benchmark_results
+
 class ClipTo01ThenAverage(object):
     """Benchmark scoring rule
 
@@ -90,63 +131,40 @@ class ClipTo01ThenAverage(object):
 
     def score_evaluation(self, benchmark, env_id, data_sources, initial_reset_timestamps, episode_lengths, episode_rewards, episode_types, timestamps):
         tasks = benchmark.task_specs(env_id)
-        spec = envs.spec(env_id)
-
-        #### 0. Compute timing stats
-
-        if len(initial_reset_timestamps) > 0:
-            initial_reset_timestamp = min(initial_reset_timestamps)
-        else:
-            initial_reset_timestamp = 0
 
+        #### 0. Load the episodes into typed arrays, with the time each
+        #### episode actually took
 
-        # How long each episode actually took
-        # How long each episode actually took
-        durations = np.zeros(len(timestamps))
-
-        data_sources = np.array(data_sources)
-        timestamps = np.array(timestamps)
-        for source, initial_ts in enumerate(initial_reset_timestamps):
-            (source_indexes,) = np.where(data_sources == source)
-
-            if len(source_indexes) == 0:
-                continue
-            # Once we know the indexes corresponding to a particular
-            # source (i.e. worker thread), we can just subtract
-            # adjoining values
-            durations[source_indexes[0]] = timestamps[source_indexes[0]] - initial_ts
-            durations[source_indexes[1:]] = timestamps[source_indexes[1:]] - timestamps[source_indexes[:-1]]
+        columns = _episode_columns(data_sources, initial_reset_timestamps, episode_lengths, episode_rewards, episode_types, timestamps)
 
         #### 1. Select out which indexes are for evaluation and which are for training
 
-        (t_idx,) = np.where([t == 't' for t in episode_types]) # training episodes
-        (e_idx,) = np.where([t == 'e' for t in episode_types]) # evaluation episodes
+        t_idx = columns.training_idx
+        e_idx = columns.evaluation_idx
         if len(e_idx) == 0:
             # If no episodes marked for evaluation, consider
             # everything both a training and evaluation episode.
-            (t_idx,) = np.where([True for t in episode_types])
-            (e_idx,) = np.where([True for t in episode_types])
-
-        #### 2. Grab the data corresponding to each of evaluation/training
+            t_idx = e_idx = np.arange(len(columns.types))
 
-        training_lengths = np.array(episode_lengths)[t_idx]
-        training_rewards = np.array(episode_rewards)[t_idx]
-        training_durations = np.array(durations)[t_idx]
-
-        evaluation_lengths = np.array(episode_lengths)[e_idx]
-        evaluation_rewards = np.array(episode_rewards)[e_idx]
-        evaluation_durations = np.array(durations)[e_idx]
-
-        #### 3. Calculate the total elapsed time (in various units)
-        #### for each episode
+        #### 2. Calculate the total elapsed time (in various units)
+        #### for each training episode
 
         # How many training timesteps have elapsed by the end of each
         # episode. Not to be confused with Unix timestamps.
-        elapsed_timesteps = np.cumsum(training_lengths)
+        elapsed_timesteps = np.cumsum(columns.lengths[t_idx])
         # Total number of seconds elapsed by the end of each
         # episode. Note that with n parallel workers each running for
         # m seconds, we want to count the total time as n * m.
-        elapsed_seconds = np.cumsum(training_durations)
+        elapsed_seconds = np.cumsum(columns.durations[t_idx])
+
+        #### 3. Find the first training episode over the allotted
+        #### experience for every task, and how many evaluation episodes
+        #### come before it (in the original, unfiltered order)
+
+        cutoffs = _find_cutoffs_for_tasks(tasks, elapsed_timesteps, elapsed_seconds)
+        has_cutoff = cutoffs < len(t_idx)
+        num_allowed = np.full(len(tasks), len(e_idx))
+        num_allowed[has_cutoff] = np.searchsorted(e_idx, t_idx[cutoffs[has_cutoff]])
 
         scores = []
         solves = []
@@ -154,36 +172,15 @@ class ClipTo01ThenAverage(object):
         lengths = []
         _timestamps = []
         elapsed_times = []
-        for task in tasks:
-            # Find the first episode where we're over the allotted
-            # training timesteps.
-            cutoff_idx = np.inf
-            if task.max_timesteps:
-                # this looks a little funny, but we want the first idx greater
-                # than the cutoff
-                (timestep_cutoff,) = np.where(elapsed_timesteps > task.max_timesteps)
-                if len(timestep_cutoff) > 0:
-                    cutoff_idx = min(cutoff_idx, timestep_cutoff[0])
-            if task.max_seconds:
-                (seconds_cutoff,) = np.where(elapsed_seconds > task.max_seconds)
-                if len(seconds_cutoff) > 0:
-                    cutoff_idx = min(cutoff_idx, seconds_cutoff[0])
-            if np.isfinite(cutoff_idx):
-                orig_cutoff_idx = t_idx[cutoff_idx] # cutoff index in the original (i.e. before filtering to training/evaluation)
-                (allowed_e_idx,) = np.where(e_idx < orig_cutoff_idx) # restrict to earlier episodes
-            else:
-                # All episodes are fair game
-                allowed_e_idx = e_idx
-
+        for task, cutoff_idx, allowed in zip(tasks, cutoffs, num_allowed):
             # Grab the last num_episodes evaluation episodes from
             # before the cutoff (at which point we've gathered too
             # much experience).
             #
             # This probably won't work long-term but is fine for now.
-            allowed_episode_rewards = np.array(episode_rewards)[allowed_e_idx]
-            reward = allowed_episode_rewards[-self.num_episodes:]
-            allowed_episode_lengths = np.array(episode_lengths)[allowed_e_idx]
-            length = allowed_episode_lengths[-self.num_episodes:]
+            last_e_idx = e_idx[max(allowed - self.num_episodes, 0):allowed]
+            reward = columns.rewards[last_e_idx]
+            length = columns.lengths[last_e_idx]
 
             floor = task.reward_floor
             ceiling = task.reward_ceiling
@@ -209,18 +206,18 @@ class ClipTo01ThenAverage(object):
             # Record the list of lengths
             lengths.append(length)
 
-            if len(allowed_e_idx) > 0:
-                if not np.isfinite(cutoff_idx):
+            if allowed > 0 and len(t_idx) > 0:
+                if cutoff_idx == len(t_idx):
                     cutoff_idx = len(elapsed_seconds) - 1
                 last_t_idx = t_idx[cutoff_idx]
                 # timestamps is full length
-                last_timestamp = timestamps[last_t_idx]
+                last_timestamp = columns.timestamps[last_t_idx]
                 # elapsed seconds contains only training
                 elapsed_time = elapsed_seconds[cutoff_idx]
             else:
-                # If we don't have any evaluation episodes, then the
-                # last valid timestamp is when we started.
-                last_timestamp = initial_reset_timestamp
+                # If we don't have any evaluation (or training) episodes,
+                # then the last valid timestamp is when we started.
+                last_timestamp = columns.initial_reset_timestamp
                 elapsed_time = 0.0
 
             # Record the timestamp of the last episode timestamp
@@ -234,7 +231,7 @@ class ClipTo01ThenAverage(object):
             'solves': solves,
             'timestamps': _timestamps,
             'elapsed_times': elapsed_times,
-            'initial_reset_timestamp': initial_reset_timestamp,
+            'initial_reset_timestamp': columns.initial_reset_timestamp,
         }
 
     def score_benchmark(self, benchmark, episode_scores):
@@ -244,6 +241,39 @@ class ClipTo01ThenAverage(object):
 
         return np.mean(all_scores)
 
+EpisodeColumns = collections.namedtuple('EpisodeColumns', [
+    'lengths', 'rewards', 'timestamps', 'types', 'durations',
+    'training_idx', 'evaluation_idx', 'initial_reset_timestamp'])
+
+def _episode_columns(data_sources, initial_reset_timestamps, episode_lengths, episode_rewards, episode_types, timestamps):
+    # Converts merged monitor data (lists, as returned by load_results) into
+    # typed arrays once, so the scoring rules never go back to the lists
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    lengths = np.asarray(episode_lengths, dtype=np.int64)
+    rewards = np.asarray(episode_rewards, dtype=np.float64)
+    if episode_types is None:
+        types = np.full(len(timestamps), 't')
+    else:
+        types = np.asarray(episode_types, dtype=str)
+    (training_idx,) = np.nonzero(types == 't')
+    (evaluation_idx,) = np.nonzero(types == 'e')
+
+    if len(initial_reset_timestamps) > 0:
+        initial_reset_timestamp = min(initial_reset_timestamps)
+    else:
+        initial_reset_timestamp = 0
+
+    return EpisodeColumns(
+        lengths=lengths,
+        rewards=rewards,
+        timestamps=timestamps,
+        types=types,
+        durations=_compute_episode_durations(initial_reset_timestamps, data_sources, timestamps),
+        training_idx=training_idx,
+        evaluation_idx=evaluation_idx,
+        initial_reset_timestamp=initial_reset_timestamp,
+    )
+
 def _compute_episode_durations(initial_reset_timestamps, data_sources, timestamps):
     # We'd like to compute the actual time taken by each episode.
     # This should be a simple as subtracting adjoining timestamps
@@ -257,35 +287,47 @@ def _compute_episode_durations(initial_reset_timestamps, data_sources, timestamp
     # TODO if we don't merge monitor files together at a higher level this logic
     # can be a lot simpler
 
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    data_sources = np.asarray(data_sources, dtype=np.int64)
+    initial_reset_timestamps = np.asarray(initial_reset_timestamps, dtype=np.float64)
     durations = np.zeros(len(timestamps))
-    data_sources = np.array(data_sources)
-    for source, initial_ts in enumerate(initial_reset_timestamps):
-        (source_indexes,) = np.where(data_sources == source)
 
-        if len(source_indexes) == 0:
-            continue
-        # Once we know the indexes corresponding to a particular
-        # source (i.e. worker thread), we can just subtract
-        # adjoining values
-        durations[source_indexes[0]] = timestamps[source_indexes[0]] - initial_ts
-        durations[source_indexes[1:]] = timestamps[source_indexes[1:]] - timestamps[source_indexes[:-1]]
+    # Episodes from a source without an initial reset timestamp are left at
+    # zero. A stable sort groups the rest by source (i.e. worker thread)
+    # while keeping each source in its original order, so we can just
+    # subtract adjoining values, using the initial reset timestamp for the
+    # first episode of every source.
+    (valid,) = np.nonzero((data_sources >= 0) & (data_sources < len(initial_reset_timestamps)))
+    order = valid[np.argsort(data_sources[valid], kind='mergesort')]
+    sources = data_sources[order]
+    source_timestamps = timestamps[order]
+
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sources[1:] != sources[:-1]
+    previous = np.empty_like(source_timestamps)
+    previous[1:] = source_timestamps[:-1]
+    previous[first] = initial_reset_timestamps[sources[first]]
+
+    durations[order] = source_timestamps - previous
     return durations
 
-def _find_cutoffs_for_task(task, elapsed_timesteps, elapsed_seconds):
-    # Apply max_timesteps and max_seconds cutoffs. Return np.inf if no cutoff is necessary
-    cutoff_idx = np.inf
-    if task.max_timesteps:
-        # this looks a little funny, but we want the first idx greater
-        # than the cutoff
-        (timestep_cutoff,) = np.where(elapsed_timesteps > task.max_timesteps)
-        if len(timestep_cutoff) > 0:
-            cutoff_idx = min(cutoff_idx, timestep_cutoff[0])
-    if task.max_seconds:
-        (seconds_cutoff,) = np.where(elapsed_seconds > task.max_seconds)
-        if len(seconds_cutoff) > 0:
-            cutoff_idx = min(cutoff_idx, seconds_cutoff[0])
-
-    return cutoff_idx
+def _find_cutoffs_for_tasks(tasks, elapsed_timesteps, elapsed_seconds):
+    # Apply max_timesteps and max_seconds cutoffs, returning the index of
+    # the first episode over either limit for every task. Tasks that need no
+    # cutoff get len(elapsed_timesteps).
+    cutoffs = np.full(len(tasks), len(elapsed_timesteps), dtype=np.int64)
+    for attr, elapsed in [('max_timesteps', elapsed_timesteps), ('max_seconds', elapsed_seconds)]:
+        limits = np.array([getattr(task, attr) or 0 for task in tasks], dtype=np.float64)
+        (limited,) = np.nonzero(limits)
+        if len(limited) == 0:
+            continue
+        # We want the first idx greater than the cutoff. The first element
+        # above a limit is also the first place the running maximum goes
+        # above it, and the running maximum is sorted, so this stays exact
+        # even if an out of order timestamp gave a negative duration.
+        running_max = np.maximum.accumulate(elapsed) if len(elapsed) > 0 else elapsed
+        cutoffs[limited] = np.minimum(cutoffs[limited], np.searchsorted(running_max, limits[limited], side='right'))
+    return cutoffs
 
 class BenchmarkScoringRule(object):
     """Benchmark scoring rule class
@@ -309,23 +351,12 @@ class BenchmarkScoringRule(object):
 
     def score_evaluation(self, benchmark, env_id, data_sources, initial_reset_timestamps, episode_lengths, episode_rewards, episode_types, timestamps):
         tasks = benchmark.task_specs(env_id)
-        spec = envs.spec(env_id)
 
-        #### 0. Compute timing stats
-
-        if len(initial_reset_timestamps) > 0:
-            initial_reset_timestamp = min(initial_reset_timestamps)
-        else:
-            initial_reset_timestamp = 0
-
-
-        # How long each episode actually took
-        timestamps = np.array(timestamps)
-        durations = _compute_episode_durations(initial_reset_timestamps, data_sources, timestamps)
-
-        #### Grab the data corresponding to each of evaluation/training
-        lengths = np.array(episode_lengths)
-        rewards = np.array(episode_rewards)
+        #### Load the episodes into typed arrays, with the time each
+        #### episode actually took
+        columns = _episode_columns(data_sources, initial_reset_timestamps, episode_lengths, episode_rewards, episode_types, timestamps)
+        timestamps = columns.timestamps
+        lengths = columns.lengths
 
         #### Calculate the total elapsed time (in various units)
         #### for each episode
@@ -336,7 +367,16 @@ class BenchmarkScoringRule(object):
         # Total number of seconds elapsed by the end of each
         # episode. Note that with n parallel workers each running for
         # m seconds, we want to count the total time as n * m.
-        elapsed_seconds = np.cumsum(durations)
+        elapsed_seconds = np.cumsum(columns.durations)
+
+        # Find the first episode where we're over the allotted training
+        # experience, for all tasks at once. All episodes are fair game
+        # for tasks without a cutoff.
+        cutoffs = _find_cutoffs_for_tasks(tasks, elapsed_timesteps, elapsed_seconds)
+        # An episode with a nonzero timestamp must come before the cutoff
+        # for it to count as valid
+        (nonzero_timestamps,) = np.nonzero(timestamps)
+        first_valid = nonzero_timestamps[0] if len(nonzero_timestamps) > 0 else len(timestamps)
 
         # List of score for each task
         scores = []
@@ -348,15 +388,8 @@ class BenchmarkScoringRule(object):
         cutoff_lengths = []
         _timestamps = []
         elapsed_times = []
-        for task in tasks:
-            # Find the first episode where we're over the allotted
-            # training timesteps.
-            cutoff_idx = _find_cutoffs_for_task(task, elapsed_timesteps, elapsed_seconds)
-            if not np.isfinite(cutoff_idx):
-                # All episodes are fair game
-                cutoff_idx = len(lengths)
-
-            reward = np.array(episode_rewards)[:cutoff_idx]
+        for task, cutoff_idx in zip(tasks, cutoffs):
+            reward = columns.rewards[:cutoff_idx]
 
             score, solved = self.score_and_solved_func(task, reward, elapsed_seconds[:cutoff_idx])
 
@@ -365,13 +398,13 @@ class BenchmarkScoringRule(object):
             rewards.append(reward)
             cutoff_lengths.append(lengths[:cutoff_idx])
 
-            if np.any(timestamps[:cutoff_idx]):
+            if first_valid < cutoff_idx:
                 last_timestamp = timestamps[cutoff_idx - 1]
                 elapsed_time = elapsed_seconds[cutoff_idx - 1]
             else:
                 # If we don't have any valid episodes, then the
                 # last valid timestamp is when we started.
-                last_timestamp = initial_reset_timestamp
+                last_timestamp = columns.initial_reset_timestamp
                 elapsed_time = 0.0
 
             # Record the timestamp of the last episode
@@ -385,7 +418,7 @@ class BenchmarkScoringRule(object):
             'solves': solves,
             'timestamps': _timestamps,
             'elapsed_times': elapsed_times,
-            'initial_reset_timestamp': initial_reset_timestamp,
+            'initial_reset_timestamp': columns.initial_reset_timestamp,
         }
 
     def score_benchmark(self, benchmark, episode_scores):
@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 
 import gym
@@ -45,6 +47,50 @@ def test():
         assert np.all(np.isclose(evaluation_score['scores'], [0.00089999999999999998, 0.0054000000000000003])), "evaluation_score={}".format(evaluation_score)
         assert np.isclose(benchmark_score, 0.00315), "benchmark_score={}".format(benchmark_score)
 
+def test_episode_durations():
+    # Episodes from two interleaved sources, plus one from a source
+    # without an initial reset timestamp
+    durations = scoring._compute_episode_durations([10., 11.], [0, 1, 0, 2, 1, 0], [12., 13., 15., 16., 17., 18.])
+    assert np.allclose(durations, [2., 2., 3., 0., 4., 3.])
+
+def test_find_cutoffs_for_tasks():
+    tasks = registration.Benchmark(id='MyBenchmark-v0', scorer=scoring.TotalReward(), tasks=[
+        {'env_id': 'CartPole-v0', 'trials': 1, 'max_timesteps': 25},
+        {'env_id': 'CartPole-v0', 'trials': 1, 'max_timesteps': 100, 'max_seconds': 2.5},
+        {'env_id': 'CartPole-v0', 'trials': 1, 'max_timesteps': 1000},
+    ]).tasks
+    cutoffs = scoring._find_cutoffs_for_tasks(tasks, np.array([10, 20, 30, 40]), np.array([1., 2., 3., 4.]))
+    assert list(cutoffs) == [2, 2, 4]
+
+def test_score_training_dirs():
+    benchmark = registration.Benchmark(
+        id='MyBenchmark-v0',
+        scorer=scoring.ClipTo01ThenAverage(num_episodes=2),
+        tasks=[
+            {'env_id': 'CartPole-v0',
+             'trials': 3,
+             'max_timesteps': 50,
+            }])
+
+    with helpers.tempdir() as temp:
+        training_dirs = []
+        for i in range(3):
+            training_dir = os.path.join(temp, str(i))
+            env = wrappers.Monitor(gym.make('CartPole-v0'), directory=training_dir, video_callable=False)
+            env.seed(i)
+            for _ in range(3):
+                rollout(env, good=(i == 1))
+            env.close()
+            training_dirs.append(training_dir)
+
+        serial = scoring.score_training_dirs(benchmark, training_dirs, processes=1)
+        parallel = scoring.score_training_dirs(benchmark, training_dirs, processes=2)
+
+    assert list(serial) == list(parallel) == ['CartPole-v0']
+    assert [r['scores'] for r in serial['CartPole-v0']] == [r['scores'] for r in parallel['CartPole-v0']]
+    assert np.isclose(scoring.benchmark_aggregate_score(benchmark, serial)['score'],
+                      scoring.benchmark_aggregate_score(benchmark, parallel)['score'])
+
 def rollout(env, good=False):
     env.reset()
 
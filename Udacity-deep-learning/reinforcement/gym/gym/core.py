@@ -1,3 +1,4 @@
+import copy
 import logging
 logger = logging.getLogger(__name__)
 
@@ -73,6 +74,23 @@ class Env(object):
     def _render(self, mode='human', close=False): return
     def _seed(self, seed=None): return []
 
+    # Set this in SOME subclasses to support clone_state/restore_state:
+    # the names of the members that hold the state of the environment.
+    # Override _clone_state/_restore_state instead if copying them with
+    # copy.deepcopy doesn't work or is too slow.
+    _state_attributes = None
+
+    def _clone_state(self):
+        if self._state_attributes is None:
+            raise error.UnsupportedStateSnapshot('{} does not support state snapshots'.format(self))
+        return {name: copy.deepcopy(getattr(self, name)) for name in self._state_attributes}
+
+    def _restore_state(self, state):
+        if self._state_attributes is None:
+            raise error.UnsupportedStateSnapshot('{} does not support state snapshots'.format(self))
+        for name in self._state_attributes:
+            setattr(self, name, copy.deepcopy(state[name]))
+
     # Do not override
     _owns_render = True
 
@@ -189,6 +207,58 @@ class Env(object):
         """
         return self._seed(seed)
 
+    def clone_state(self):
+        """Takes a snapshot of the current state of the environment,
+        including its random number generator, for restore_state().
+
+        Stepping the environment doesn't change the snapshot, so it can be
+        restored any number of times, also on another instance of the same
+        environment (made with the same arguments).
+
+        Returns:
+            object: an opaque snapshot of the state
+        """
+        np_random = getattr(self, 'np_random', None)
+        return {
+            'state': self._clone_state(),
+            'np_random': np_random.get_state() if np_random is not None else None,
+        }
+
+    def restore_state(self, state):
+        """Returns the environment to a snapshot taken by clone_state().
+        The following steps give the same results as they would have at the
+        time of the snapshot.
+
+        Args:
+            state (object): the snapshot
+        """
+        self._restore_state(state['state'])
+        if state['np_random'] is not None:
+            # in place, since policies and wrappers may hold the generator
+            self.np_random.set_state(state['np_random'])
+
+    def fork(self, actions, state=None):
+        """Steps one child of a state for each action, e.g. to expand a
+        node of a tree search. The environment is left in the parent state.
+
+        Args:
+            actions (list): one action per child
+            state (object): snapshot of the parent, the current state if None
+
+        Returns:
+            list: (state, observation, reward, done, info) of every child,
+              where state is a snapshot of the child
+        """
+        if state is None:
+            state = self.clone_state()
+        children = []
+        for action in actions:
+            self.restore_state(state)
+            observation, reward, done, info = self.step(action)
+            children.append((self.clone_state(), observation, reward, done, info))
+        self.restore_state(state)
+        return children
+
     @property
     def unwrapped(self):
         """Completely unwrap this env.
@@ -290,6 +360,19 @@ class Wrapper(Env):
     def _seed(self, seed=None):
         return self.env.seed(seed)
 
+    # The members of the wrapper itself that are part of the state, e.g.
+    # counters; the wrapped environment is snapshotted along with them
+    _state_attributes = ()
+
+    def _clone_state(self):
+        state = super(Wrapper, self)._clone_state()
+        state['env'] = self.env.clone_state()
+        return state
+
+    def _restore_state(self, state):
+        super(Wrapper, self)._restore_state(state)
+        self.env.restore_state(state['env'])
+
     def __str__(self):
         return '<{}{}>'.format(type(self).__name__, self.env)
 
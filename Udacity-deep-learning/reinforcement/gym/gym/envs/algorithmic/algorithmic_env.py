@@ -48,6 +48,9 @@ class AlgorithmicEnv(Env):
     # last n episodes was no more than this far from the maximum reward
     MIN_REWARD_SHORTFALL_FOR_PROMOTION = -1.0
 
+    _state_attributes = ('last_action', 'last_reward', 'read_head_position', 'write_head_position',
+                         'episode_total_reward', 'time', 'input_data', 'target')
+
     def __init__(self, base=10, chars=False, starting_min_length=2):
         """
         base: Number of distinct characters. 
@@ -218,6 +221,18 @@ class AlgorithmicEnv(Env):
             AlgorithmicEnv.reward_shortfalls = []
         
 
+    def _clone_state(self):
+        state = super(AlgorithmicEnv, self)._clone_state()
+        # the curriculum decides the input length of the next episodes
+        state['min_length'] = AlgorithmicEnv.min_length
+        state['reward_shortfalls'] = list(AlgorithmicEnv.reward_shortfalls)
+        return state
+
+    def _restore_state(self, state):
+        super(AlgorithmicEnv, self)._restore_state(state)
+        AlgorithmicEnv.min_length = state['min_length']
+        AlgorithmicEnv.reward_shortfalls = list(state['reward_shortfalls'])
+
     def _reset(self):
         self._check_levelup()
         self.last_action = None
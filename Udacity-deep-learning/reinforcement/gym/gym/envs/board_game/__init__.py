@@ -1,2 +1,20 @@
-from gym.envs.board_game.go import GoEnv
+import sys
+
+from gym import error
 from gym.envs.board_game.hex import HexEnv
+from gym.envs.board_game.go_board import GoBoard
+
+# GoEnv needs pachi_py, so it is imported on first use and the rest of the
+# board games work without it
+def __getattr__(name):
+    if name == 'GoEnv':
+        from gym.envs.board_game.go import GoEnv
+        return GoEnv
+    raise AttributeError("module 'gym.envs.board_game' has no attribute '{}'".format(name))
+
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is not supported, import it now if we can
+    try:
+        from gym.envs.board_game.go import GoEnv
+    except error.DependencyNotInstalled:
+        pass
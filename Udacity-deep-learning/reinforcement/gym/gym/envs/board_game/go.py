@@ -265,6 +265,23 @@ class GoEnv(gym.Env):
     def _state(self):
         return self.state
 
+    # GoState.act returns a new state, so states are never modified and
+    # the snapshot can share them
+    def _clone_state(self):
+        if self.opponent != 'random':
+            # the Pachi engine keeps its own search state, tied to the board
+            raise error.UnsupportedStateSnapshot('State snapshots are only supported against the random opponent, not {}'.format(self.opponent))
+        return {'state': self.state, 'done': self.done}
+
+    def _restore_state(self, state):
+        if self.opponent != 'random':
+            raise error.UnsupportedStateSnapshot('State snapshots are only supported against the random opponent, not {}'.format(self.opponent))
+        self.state = state['state']
+        self.done = state['done']
+        if self.opponent_policy is None:
+            # restored before the first reset
+            self._reset_opponent(self.state.board)
+
     def _reset_opponent(self, board):
         if self.opponent == 'random':
             self.opponent_policy = make_random_policy(self.np_random)
@@ -0,0 +1,268 @@
+"""
+Go rules engine in Python and NumPy, for generating self-play data on
+machines without a Pachi build. It follows the conventions of the pachi_py
+based GoEnv: actions are i * size + j for the point on row i and column j,
+size**2 is pass and size**2 + 1 is resign, encode() returns the 'image3c'
+planes (black, white, empty), and official_score is positive when white
+wins. Scoring is by area (stones plus surrounded territory) with komi, and
+all stones on the board at the end count as alive.
+"""
+
+import numpy as np
+
+from gym import error
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+
+def other_color(color):
+    return BLACK + WHITE - color
+
+class _Group(object):
+    __slots__ = ('color', 'stones', 'liberties')
+
+    def __init__(self, color, stones, liberties):
+        self.color = color
+        self.stones = stones
+        self.liberties = liberties
+
+_neighbour_cache = {}
+
+def _go_neighbours(size):
+    # orthogonal neighbours of every point, shared between all boards of a size
+    if size not in _neighbour_cache:
+        _neighbour_cache[size] = tuple(
+            tuple((i + di) * size + j + dj for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                  if 0 <= i + di < size and 0 <= j + dj < size)
+            for i in range(size) for j in range(size))
+    return _neighbour_cache[size]
+
+_neighbour_table_cache = {}
+
+def _go_neighbour_table(size):
+    # the same as a (size**2, 4) array, padded with the index size**2
+    if size not in _neighbour_table_cache:
+        table = np.full((size * size, 4), size * size, dtype=np.int64)
+        for p, neighbours in enumerate(_go_neighbours(size)):
+            table[p, :len(neighbours)] = neighbours
+        _neighbour_table_cache[size] = table
+    return _neighbour_table_cache[size]
+
+class GoBoard(object):
+    """
+    Go position with incremental group and liberty tracking. Every stone
+    points to its group, which keeps its stones and the set of its
+    liberties, so legality, captures and ko are decided from the groups
+    next to the move instead of by searching the board.
+
+    Members:
+        board: flat int8 array of EMPTY, BLACK and WHITE
+        liberty_counts: flat array of the number of liberties of the group
+            on each point, 0 on empty points
+        ko_point: point that can't be played on the next move, or None
+        consecutive_passes: the game is over after two
+        resigned: color that resigned, or EMPTY
+        captures: number of stones captured by each color
+    """
+    def __init__(self, size, komi=7.5):
+        self.size = size
+        self.komi = komi
+        self.board = np.zeros(size * size, dtype=np.int8)
+        self.liberty_counts = np.zeros(size * size, dtype=np.int16)
+        self.ko_point = None
+        self.consecutive_passes = 0
+        self.resigned = EMPTY
+        self.captures = {BLACK: 0, WHITE: 0}
+        self._groups = [None] * (size * size)
+        self._neighbours = _go_neighbours(size)
+
+    @property
+    def pass_action(self):
+        return self.size ** 2
+
+    @property
+    def resign_action(self):
+        return self.size ** 2 + 1
+
+    @property
+    def is_terminal(self):
+        return self.consecutive_passes >= 2 or self.resigned != EMPTY
+
+    def copy(self):
+        other = GoBoard.__new__(GoBoard)
+        other.__dict__.update(self.__dict__)
+        other.board = self.board.copy()
+        other.liberty_counts = self.liberty_counts.copy()
+        other.captures = dict(self.captures)
+        copies = {}
+        other._groups = [None] * len(self._groups)
+        for p, group in enumerate(self._groups):
+            if group is not None:
+                if group not in copies:
+                    copies[group] = _Group(group.color, list(group.stones), set(group.liberties))
+                other._groups[p] = copies[group]
+        return other
+
+    def is_legal(self, action, color):
+        if action == self.pass_action or action == self.resign_action:
+            return True
+        if self._groups[action] is not None or action == self.ko_point:
+            return False
+        for q in self._neighbours[action]:
+            group = self._groups[q]
+            if group is None:
+                return True
+            if group.color == color:
+                # joining a group that keeps another liberty
+                if len(group.liberties) > 1:
+                    return True
+            elif len(group.liberties) == 1:
+                # capturing
+                return True
+        # suicide
+        return False
+
+    def legal_moves(self, color):
+        """Boolean mask over the board points and pass (resign is left out)"""
+        return legal_moves_batch([self], [color])[0]
+
+    def play(self, action, color):
+        """Returns a new board with the move played"""
+        board = self.copy()
+        board.play_inplace(action, color)
+        return board
+
+    def play_inplace(self, action, color):
+        if action == self.pass_action:
+            self.consecutive_passes += 1
+            self.ko_point = None
+            return
+        if action == self.resign_action:
+            self.resigned = color
+            return
+        if not 0 <= action < self.size ** 2 or not self.is_legal(action, color):
+            raise error.IllegalMove('Illegal move {} for color {}'.format(action, color))
+
+        self.consecutive_passes = 0
+        self.board[action] = color
+        group = _Group(color, [action], set())
+        self._groups[action] = group
+        captured = []
+        for q in self._neighbours[action]:
+            neighbour = self._groups[q]
+            if neighbour is None:
+                group.liberties.add(q)
+            elif neighbour.color == color:
+                if neighbour is not group:
+                    group = self._merge(group, neighbour)
+            else:
+                neighbour.liberties.discard(action)
+                if not neighbour.liberties:
+                    captured.extend(neighbour.stones)
+                    self._remove(neighbour)
+                else:
+                    self.liberty_counts[neighbour.stones] = len(neighbour.liberties)
+        group.liberties.discard(action)
+        self.liberty_counts[group.stones] = len(group.liberties)
+        self.captures[color] += len(captured)
+
+        # A single stone that captured a single stone and is left with that
+        # point as its only liberty could be retaken right away
+        if len(captured) == 1 and len(group.stones) == 1 and len(group.liberties) == 1:
+            self.ko_point = captured[0]
+        else:
+            self.ko_point = None
+
+    def _merge(self, group, other):
+        if len(group.stones) > len(other.stones):
+            group, other = other, group
+        # keep the larger group and relabel the smaller one
+        other.stones.extend(group.stones)
+        other.liberties |= group.liberties
+        for p in group.stones:
+            self._groups[p] = other
+        return other
+
+    def _remove(self, group):
+        self.board[group.stones] = EMPTY
+        self.liberty_counts[group.stones] = 0
+        for p in group.stones:
+            self._groups[p] = None
+        gained = set()
+        for p in group.stones:
+            for q in self._neighbours[p]:
+                neighbour = self._groups[q]
+                if neighbour is not None:
+                    neighbour.liberties.add(p)
+                    gained.add(neighbour)
+        for neighbour in gained:
+            self.liberty_counts[neighbour.stones] = len(neighbour.liberties)
+
+    def encode(self):
+        """(3, size, size) uint8 planes of the black, white and empty points"""
+        board = self.board.reshape(self.size, self.size)
+        return np.stack([board == BLACK, board == WHITE, board == EMPTY]).astype(np.uint8)
+
+    def area(self):
+        """Area of each color: its stones plus the empty regions that only
+        border its stones"""
+        area = {BLACK: int(np.sum(self.board == BLACK)), WHITE: int(np.sum(self.board == WHITE))}
+        seen = np.zeros(len(self.board), dtype=bool)
+        for start in np.flatnonzero(self.board == EMPTY):
+            if seen[start]:
+                continue
+            seen[start] = True
+            region, borders, stack = 0, set(), [start]
+            while stack:
+                p = stack.pop()
+                region += 1
+                for q in self._neighbours[p]:
+                    if self.board[q] == EMPTY:
+                        if not seen[q]:
+                            seen[q] = True
+                            stack.append(q)
+                    else:
+                        borders.add(int(self.board[q]))
+            if len(borders) == 1:
+                area[borders.pop()] += region
+        return area
+
+    @property
+    def official_score(self):
+        """Area score of white minus black, plus komi: positive if white wins"""
+        if self.resigned != EMPTY:
+            return float('inf') if self.resigned == BLACK else float('-inf')
+        area = self.area()
+        return area[WHITE] - area[BLACK] + self.komi
+
+    def __repr__(self):
+        symbols = {EMPTY: '.', BLACK: 'X', WHITE: 'O'}
+        return '\n'.join(' '.join(symbols[c] for c in row) for row in self.board.reshape(self.size, self.size).tolist())
+
+def legal_moves_batch(boards, colors):
+    """
+    GoBoard.legal_moves for many boards of the same size at once: a
+    (len(boards), size**2 + 1) mask. Applies the rules of is_legal to every
+    point, using the padded neighbour table and liberty_counts.
+    """
+    size = boards[0].size
+    table = _go_neighbour_table(size)
+    colors = np.asarray(colors).reshape(-1, 1, 1)
+    # the padding point past the end of the board gets an impossible color
+    stones = np.full((len(boards), size * size + 1), -1, dtype=np.int8)
+    stones[:, :-1] = [board.board for board in boards]
+    liberty_counts = np.zeros((len(boards), size * size + 1), dtype=np.int16)
+    liberty_counts[:, :-1] = [board.liberty_counts for board in boards]
+    neighbour_stones = stones[:, table]
+    neighbour_liberties = liberty_counts[:, table]
+
+    legal = np.ones((len(boards), size * size + 1), dtype=bool)
+    legal[:, :-1] = (stones[:, :-1] == EMPTY) & np.any(
+        (neighbour_stones == EMPTY) |
+        ((neighbour_stones == colors) & (neighbour_liberties > 1)) |
+        ((neighbour_stones == BLACK + WHITE - colors) & (neighbour_liberties == 1)), axis=2)
+    for i, board in enumerate(boards):
+        if board.ko_point is not None:
+            legal[i, board.ko_point] = False
+    return legal
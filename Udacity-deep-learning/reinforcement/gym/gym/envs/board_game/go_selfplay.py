@@ -0,0 +1,141 @@
+"""
+Batched Go self-play on top of GoBoard, without Pachi.
+
+    data = self_play(1000, board_size=9, processes=8)
+
+Games are split into batches that worker processes play in lockstep: each
+move, the policy is called once with the stacked observations of every
+unfinished game in the batch. The positions of all games come back as
+stacked arrays, ready to train on.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from gym.envs.board_game.go_board import GoBoard, BLACK, WHITE, EMPTY, legal_moves_batch, other_color
+
+def random_policy(observations, legal, colors, np_random):
+    """
+    Plays uniformly among the legal moves that don't fill one of the
+    player's own single-point eyes, and passes when there are none left,
+    so that random games end.
+
+    Args:
+        observations: (B, 3, size, size) image3c planes
+        legal: (B, size**2 + 1) mask of legal points and pass
+        colors: (B,) color to play
+        np_random: RandomState of the worker
+
+    Returns:
+        (B,) actions
+    """
+    batch, size = len(observations), observations.shape[-1]
+    own = np.where((colors == BLACK)[:, None, None], observations[:, 0], observations[:, 1]).astype(bool)
+    # points whose neighbours are all the player's stones or off the board
+    padded = np.pad(own, ((0, 0), (1, 1), (1, 1)), mode='constant', constant_values=True)
+    eyes = padded[:, :-2, 1:-1] & padded[:, 2:, 1:-1] & padded[:, 1:-1, :-2] & padded[:, 1:-1, 2:]
+    candidates = legal[:, :-1] & ~eyes.reshape(batch, -1)
+    # the largest of uniform keys is a uniform choice among the candidates
+    actions = np.argmax(np_random.rand(batch, size * size) * candidates, axis=1)
+    actions[~candidates.any(axis=1)] = size * size
+    return actions
+
+def _play_batch(args):
+    num_games, board_size, policy, max_moves, komi, seed = args
+    np_random = np.random.RandomState(seed)
+    boards = [GoBoard(board_size, komi) for _ in range(num_games)]
+    colors = np.full(num_games, BLACK, dtype=np.int8)
+    lengths = np.zeros(num_games, dtype=np.int32)
+    active = np.arange(num_games)
+
+    observations, game_ids, players, actions = [], [], [], []
+    for _ in range(max_moves):
+        if len(active) == 0:
+            break
+        batch_observations = np.stack([boards[i].encode() for i in active])
+        legal = legal_moves_batch([boards[i] for i in active], colors[active])
+        batch_actions = np.asarray(policy(batch_observations, legal, colors[active], np_random))
+
+        observations.append(batch_observations)
+        game_ids.append(active)
+        players.append(colors[active])
+        actions.append(batch_actions)
+
+        for i, action in zip(active, batch_actions):
+            boards[i].play_inplace(int(action), colors[i])
+        colors[active] = other_color(colors[active])
+        lengths[active] += 1
+        active = np.array([i for i in active if not boards[i].is_terminal], dtype=np.int64)
+
+    scores = np.array([board.official_score for board in boards])
+    return {
+        'observations': np.concatenate(observations) if observations else np.zeros((0, 3, board_size, board_size), dtype=np.uint8),
+        'game_ids': np.concatenate(game_ids) if game_ids else np.zeros(0, dtype=np.int64),
+        'colors': np.concatenate(players) if players else np.zeros(0, dtype=np.int8),
+        'actions': np.concatenate(actions) if actions else np.zeros(0, dtype=np.int64),
+        'scores': scores,
+        'lengths': lengths,
+    }
+
+def self_play(num_games, board_size=9, policy=random_policy, processes=None, games_per_batch=64,
+              max_moves=None, komi=7.5, seed=None):
+    """
+    Plays num_games games of policy against itself.
+
+    Args:
+        policy: called as policy(observations, legal, colors, np_random) for a
+            batch of games, see random_policy. It has to be picklable (e.g. a
+            module level function) to run in worker processes.
+        processes: number of worker processes, one per CPU if None. With
+            processes=1 every batch is played in this process.
+        games_per_batch: number of games each worker plays in lockstep.
+        max_moves: games still running after this many moves are scored as
+            they are. Defaults to 3 * board_size**2.
+        seed: seeds the batches, which get seed + batch index.
+
+    Returns:
+        A dict of arrays with one row per move of every game, in the order
+        the moves were played within each batch:
+            observations: (N, 3, size, size) uint8 image3c planes before the move
+            colors: (N,) color that played the move
+            actions: (N,) move played
+            game_ids: (N,) game the move belongs to
+            outcomes: (N,) 1. if the player of the move won, -1. if it lost, 0. on a draw
+        and one row per game:
+            scores: (num_games,) official score, positive if white won
+            winners: (num_games,) BLACK, WHITE or EMPTY for a draw
+            lengths: (num_games,) number of moves
+    """
+    if max_moves is None:
+        max_moves = 3 * board_size ** 2
+    if seed is None:
+        seed = np.random.randint(2 ** 31)
+    batch_sizes = [min(games_per_batch, num_games - start) for start in range(0, num_games, games_per_batch)]
+    jobs = [(n, board_size, policy, max_moves, komi, seed + i) for i, n in enumerate(batch_sizes)]
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(jobs) <= 1:
+        batches = [_play_batch(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(min(processes, len(jobs)))
+        try:
+            batches = pool.map(_play_batch, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    offsets = np.cumsum([0] + batch_sizes[:-1])
+    data = {
+        'observations': np.concatenate([b['observations'] for b in batches]),
+        'colors': np.concatenate([b['colors'] for b in batches]),
+        'actions': np.concatenate([b['actions'] for b in batches]),
+        'game_ids': np.concatenate([b['game_ids'] + offset for b, offset in zip(batches, offsets)]),
+        'scores': np.concatenate([b['scores'] for b in batches]),
+        'lengths': np.concatenate([b['lengths'] for b in batches]),
+    }
+    scores = data['scores']
+    data['winners'] = np.where(scores > 0, WHITE, np.where(scores < 0, BLACK, EMPTY)).astype(np.int8)
+    winners = data['winners'][data['game_ids']]
+    data['outcomes'] = np.where(winners == EMPTY, 0., np.where(winners == data['colors'], 1., -1.)).astype(np.float32)
+    return data
@@ -3,6 +3,7 @@ Game of Hex
 """
 
 from six import StringIO
+import bisect
 import sys
 import gym
 from gym import spaces
@@ -10,9 +11,11 @@ import numpy as np
 from gym import error
 from gym.utils import seeding
 
-def make_random_policy(np_random):
+def make_random_policy(np_random, get_possible_actions=None):
+    if get_possible_actions is None:
+        get_possible_actions = HexEnv.get_possible_actions
     def random_policy(state):
-        possible_moves = HexEnv.get_possible_actions(state)
+        possible_moves = get_possible_actions(state)
         # No moves left
         if len(possible_moves) == 0:
             return None
@@ -73,7 +76,7 @@ class HexEnv(gym.Env):
         # Update the random policy if needed
         if isinstance(self.opponent, str):
             if self.opponent == 'random':
-                self.opponent_policy = make_random_policy(self.np_random)
+                self.opponent_policy = make_random_policy(self.np_random, lambda state: self.board.possible_actions())
             else:
                 raise error.Error('Unrecognized opponent policy {}'.format(self.opponent))
         else:
@@ -81,16 +84,29 @@ class HexEnv(gym.Env):
 
         return [seed]
 
+    @property
+    def state(self):
+        return self.board.state
+
+    # A custom opponent policy isn't part of the snapshot, so it has to
+    # be deterministic (or use self.np_random) for restored games to replay
+    def _clone_state(self):
+        return {'board': self.board.copy(), 'to_play': self.to_play, 'done': self.done}
+
+    def _restore_state(self, state):
+        self.board = state['board'].copy()
+        self.to_play = state['to_play']
+        self.done = state['done']
+
     def _reset(self):
-        self.state = np.zeros((3, self.board_size, self.board_size))
-        self.state[2, :, :] = 1.0
+        self.board = HexBoard(self.board_size)
         self.to_play = HexEnv.BLACK
         self.done = False
 
         # Let the opponent play if it's not the agent's turn
         if self.player_color != self.to_play:
             a = self.opponent_policy(self.state)
-            HexEnv.make_move(self.state, a, HexEnv.BLACK)
+            self.board.play(a, HexEnv.BLACK)
             self.to_play = HexEnv.WHITE
         return self.state
 
@@ -114,7 +130,7 @@ class HexEnv(gym.Env):
             else:
                 raise error.Error('Unsupported illegal move action: {}'.format(self.illegal_move_mode))
         else:
-            HexEnv.make_move(self.state, action, self.player_color)
+            self.board.play(action, self.player_color)
 
         # Opponent play
         a = self.opponent_policy(self.state)
@@ -127,9 +143,9 @@ class HexEnv(gym.Env):
             if HexEnv.resign_move(self.board_size, a):
                 return self.state, 1, True, {'state': self.state}
             else:
-                HexEnv.make_move(self.state, a, 1 - self.player_color)
+                self.board.play(a, 1 - self.player_color)
 
-        reward = HexEnv.game_finished(self.state)
+        reward = self.board.winner
         if self.player_color == HexEnv.WHITE:
             reward = - reward
         self.done = reward != 0
@@ -204,105 +220,128 @@ class HexEnv(gym.Env):
 
     @staticmethod
     def get_possible_actions(board):
-        free_x, free_y = np.where(board[2, :, :] == 1)
-        return [HexEnv.coordinate_to_action(board, [x, y]) for x, y in zip(free_x, free_y)]
+        return np.flatnonzero(board[2, :, :] == 1).tolist()
 
     @staticmethod
     def game_finished(board):
-        # Returns 1 if player 1 wins, -1 if player 2 wins and 0 otherwise
-        d = board.shape[1]
-
-        inpath = set()
-        newset = set()
-        for i in range(d):
-            if board[0, 0, i] == 1:
-                newset.add(i)
-
-        while len(newset) > 0:
-            for i in range(len(newset)):
-                v = newset.pop()
-                inpath.add(v)
-                cx = v // d
-                cy = v % d
-                # Left
-                if cy > 0 and board[0, cx, cy - 1] == 1:
-                    v = cx * d + cy - 1
-                    if v not in inpath:
-                        newset.add(v)
-                # Right
-                if cy + 1 < d and board[0, cx, cy + 1] == 1:
-                    v = cx * d + cy + 1
-                    if v not in inpath:
-                        newset.add(v)
-                # Up
-                if cx > 0 and board[0, cx - 1, cy] == 1:
-                    v = (cx - 1) * d + cy
-                    if v not in inpath:
-                        newset.add(v)
-                # Down
-                if cx + 1 < d and board[0, cx + 1, cy] == 1:
-                    if cx + 1 == d - 1:
-                        return 1
-                    v = (cx + 1) * d + cy
-                    if v not in inpath:
-                        newset.add(v)
-                # Up Right
-                if cx > 0 and cy + 1 < d and board[0, cx - 1, cy + 1] == 1:
-                    v = (cx - 1) * d + cy + 1
-                    if v not in inpath:
-                        newset.add(v)
-                # Down Left
-                if cx + 1 < d and cy > 0 and board[0, cx + 1, cy - 1] == 1:
-                    if cx + 1 == d - 1:
-                        return 1
-                    v = (cx + 1) * d + cy - 1
-                    if v not in inpath:
-                        newset.add(v)
-
-        inpath.clear()
-        newset.clear()
-        for i in range(d):
-            if board[1, i, 0] == 1:
-                newset.add(i)
-
-        while len(newset) > 0:
-            for i in range(len(newset)):
-                v = newset.pop()
-                inpath.add(v)
-                cy = v // d
-                cx = v % d
-                # Left
-                if cy > 0 and board[1, cx, cy - 1] == 1:
-                    v = (cy - 1) * d + cx
-                    if v not in inpath:
-                        newset.add(v)
-                # Right
-                if cy + 1 < d and board[1, cx, cy + 1] == 1:
-                    if cy + 1 == d - 1:
-                        return -1
-                    v = (cy + 1) * d + cx
-                    if v not in inpath:
-                        newset.add(v)
-                # Up
-                if cx > 0 and board[1, cx - 1, cy] == 1:
-                    v = cy * d + cx - 1
-                    if v not in inpath:
-                        newset.add(v)
-                # Down
-                if cx + 1 < d and board[1, cx + 1, cy] == 1:
-                    v = cy * d + cx + 1
-                    if v not in inpath:
-                        newset.add(v)
-                # Up Right
-                if cx > 0 and cy + 1 < d and board[1, cx - 1, cy + 1] == 1:
-                    if cy + 1 == d - 1:
-                        return -1
-                    v = (cy + 1) * d + cx - 1
-                    if v not in inpath:
-                        newset.add(v)
-                # Left Down
-                if cx + 1 < d and cy > 0 and board[1, cx + 1, cy - 1] == 1:
-                    v = (cy - 1) * d + cx + 1
-                    if v not in inpath:
-                        newset.add(v)
-        return 0
+        # Returns 1 if player 1 wins, -1 if player 2 wins and 0 otherwise.
+        # HexEnv itself keeps a HexBoard up to date instead of calling this
+        # on every move.
+        return HexBoard.from_state(board).winner
+
+class HexBoard(object):
+    """
+    Hex position that tracks connectivity incrementally. Every stone is
+    merged with its same-colored neighbours in a disjoint-set forest over
+    the cells plus four virtual nodes for the edges (black connects top to
+    bottom, white left to right), so checking for a win after a move is a
+    couple of find operations instead of a flood fill.
+
+    state is the numpy3c encoding used by HexEnv. The free cells are kept
+    sorted, in the order HexEnv.get_possible_actions returns them.
+
+    copy() returns a copy-on-write snapshot: the position is only copied
+    when either board plays a move, so tree search can snapshot freely.
+    """
+    def __init__(self, board_size):
+        d = board_size
+        self.board_size = d
+        self.state = np.zeros((3, d, d))
+        self.state[2, :, :] = 1.0
+        # cell colors: -1 for empty, else HexEnv.BLACK or HexEnv.WHITE
+        self._colors = [-1] * (d * d)
+        # d * d + (0, 1, 2, 3) are the top, bottom, left and right edges
+        self._parent = list(range(d * d + 4))
+        self._rank = [0] * (d * d + 4)
+        self._free = list(range(d * d))
+        self._neighbours = _hex_neighbours(d)
+        self._shared = False
+        self.winner = 0
+
+    @classmethod
+    def from_state(cls, state):
+        board = cls(state.shape[-1])
+        for player in [HexEnv.BLACK, HexEnv.WHITE]:
+            for action in np.flatnonzero(state[player] == 1):
+                board.play(int(action), player)
+        return board
+
+    def copy(self):
+        snapshot = object.__new__(HexBoard)
+        snapshot.__dict__.update(self.__dict__)
+        self._shared = snapshot._shared = True
+        return snapshot
+
+    def possible_actions(self):
+        return list(self._free)
+
+    def play(self, action, player):
+        """Places a stone of player on action, and returns the winner: 1 if
+        black has won, -1 if white has, 0 otherwise"""
+        if self._shared:
+            self.state = self.state.copy()
+            self._colors = list(self._colors)
+            self._parent = list(self._parent)
+            self._rank = list(self._rank)
+            self._free = list(self._free)
+            self._shared = False
+
+        d = self.board_size
+        action = int(action)
+        if self._colors[action] != -1:
+            raise error.Error('Cell {} is already taken'.format(action))
+        x, y = divmod(action, d)
+        self.state[2, x, y] = 0
+        self.state[player, x, y] = 1
+        self._colors[action] = player
+        del self._free[bisect.bisect_left(self._free, action)]
+
+        for neighbour in self._neighbours[action]:
+            if self._colors[neighbour] == player:
+                self._union(action, neighbour)
+
+        n = d * d
+        if player == HexEnv.BLACK:
+            if x == 0:
+                self._union(action, n)
+            if x == d - 1:
+                self._union(action, n + 1)
+            if self.winner == 0 and self._find(n) == self._find(n + 1):
+                self.winner = 1
+        else:
+            if y == 0:
+                self._union(action, n + 2)
+            if y == d - 1:
+                self._union(action, n + 3)
+            if self.winner == 0 and self._find(n + 2) == self._find(n + 3):
+                self.winner = -1
+        return self.winner
+
+    def _find(self, v):
+        parent = self._parent
+        while parent[v] != v:
+            # path halving
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def _union(self, u, v):
+        u, v = self._find(u), self._find(v)
+        if u == v:
+            return
+        if self._rank[u] < self._rank[v]:
+            u, v = v, u
+        self._parent[v] = u
+        if self._rank[u] == self._rank[v]:
+            self._rank[u] += 1
+
+_neighbour_cache = {}
+
+def _hex_neighbours(d):
+    # neighbours of every cell, shared between all boards of a size
+    if d not in _neighbour_cache:
+        offsets = [(0, -1), (0, 1), (-1, 0), (1, 0), (-1, 1), (1, -1)]
+        _neighbour_cache[d] = tuple(
+            tuple((x + dx) * d + y + dy for dx, dy in offsets if 0 <= x + dx < d and 0 <= y + dy < d)
+            for x in range(d) for y in range(d))
+    return _neighbour_cache[d]
@@ -79,6 +79,8 @@ class AcrobotEnv(core.Env):
     domain_fig = None
     actions_num = 3
 
+    _state_attributes = ('state',)
+
     def __init__(self):
         self.viewer = None
         high = np.array([1.0, 1.0, 1.0, 1.0, self.MAX_VEL_1, self.MAX_VEL_2])
@@ -270,16 +272,19 @@ def rk4(derivs, y0, t, *args, **kwargs):
             return -alpha*x + exp(-t)
         y0 = 1
         yout = rk4(derivs, y0, t)
+    Example 3::
+        ## a batch of N independent 2D systems, y0 has shape (N, 2) and
+        ## derivs has to return an array of that shape
+        def derivs_batch(x, t):
+            return np.stack([x[:, 0] + 2*x[:, 1], -3*x[:, 0] + 4*x[:, 1]], axis=-1)
+        y0 = np.ones((N, 2))
+        yout = rk4(derivs_batch, y0, t)    # (len(t), N, 2)
+
     If you have access to scipy, you should probably be using the
     scipy.integrate tools rather than this function.
     """
 
-    try:
-        Ny = len(y0)
-    except TypeError:
-        yout = np.zeros((len(t),), np.float_)
-    else:
-        yout = np.zeros((len(t), Ny), np.float_)
+    yout = np.zeros((len(t),) + np.shape(y0), np.float64)
 
     yout[0] = y0
     i = 0
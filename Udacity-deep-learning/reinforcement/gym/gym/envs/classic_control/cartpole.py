@@ -18,6 +18,8 @@ class CartPoleEnv(gym.Env):
         'video.frames_per_second' : 50
     }
 
+    _state_attributes = ('state', 'steps_beyond_done')
+
     def __init__(self):
         self.gravity = 9.8
         self.masscart = 1.0
@@ -25,6 +25,8 @@ class Continuous_MountainCarEnv(gym.Env):
         'video.frames_per_second': 30
     }
 
+    _state_attributes = ('state',)
+
     def __init__(self):
         self.min_action = -1.0
         self.max_action = 1.0
@@ -14,6 +14,8 @@ class MountainCarEnv(gym.Env):
         'video.frames_per_second': 30
     }
 
+    _state_attributes = ('state',)
+
     def __init__(self):
         self.min_position = -1.2
         self.max_position = 0.6
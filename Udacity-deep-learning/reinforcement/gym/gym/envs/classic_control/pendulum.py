@@ -10,6 +10,8 @@ class PendulumEnv(gym.Env):
         'video.frames_per_second' : 30
     }
 
+    _state_attributes = ('state', 'last_u')
+
     def __init__(self):
         self.max_speed=8
         self.max_torque=2.
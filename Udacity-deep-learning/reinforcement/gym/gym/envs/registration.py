@@ -1,5 +1,5 @@
+import importlib
 import logging
-import pkg_resources
 import re
 from gym import error
 import warnings
@@ -13,8 +13,13 @@ logger = logging.getLogger(__name__)
 env_id_re = re.compile(r'^(?:[\w:-]+\/)?([\w:.-]+)-v(\d+)$')
 
 def load(name):
-    entry_point = pkg_resources.EntryPoint.parse('x={}'.format(name))
-    result = entry_point.load(False)
+    """Resolves an entry point of the form module.name:Class (or
+    module.name:object.attribute), importing the module only now.
+    """
+    module_name, _, attributes = name.partition(':')
+    result = importlib.import_module(module_name)
+    for attribute in attributes.split('.'):
+        result = getattr(result, attribute)
     return result
 
 class EnvSpec(object):
@@ -112,6 +117,10 @@ class EnvRegistry(object):
 
     def __init__(self):
         self.env_specs = {}
+        # kwargs of registered envs whose EnvSpec has not been built yet.
+        # Most processes look up a single env out of the hundreds that are
+        # registered at import time, so specs are built on first lookup.
+        self._unbuilt_specs = {}
 
     def make(self, id):
         logger.info('Making new env: %s', id)
@@ -126,6 +135,7 @@ class EnvRegistry(object):
 
 
     def all(self):
+        self._build_all()
         return self.env_specs.values()
 
     def spec(self, id):
@@ -133,11 +143,13 @@ class EnvRegistry(object):
         if not match:
             raise error.Error('Attempted to look up malformed environment ID: {}. (Currently all IDs must be of the form {}.)'.format(id.encode('utf-8'), env_id_re.pattern))
 
+        self._build(id)
         try:
             return self.env_specs[id]
         except KeyError:
             # Parse the env name and check to see if it matches the non-version
             # part of a valid env (could also check the exact number here)
+            self._build_all()
             env_name = match.group(1)
             matching_envs = [valid_env_name for valid_env_name, valid_env_spec in self.env_specs.items()
                              if env_name == valid_env_spec._env_name]
@@ -147,9 +159,20 @@ class EnvRegistry(object):
                 raise error.UnregisteredEnv('No registered env with id: {}'.format(id))
 
     def register(self, id, **kwargs):
-        if id in self.env_specs:
+        if id in self.env_specs or id in self._unbuilt_specs:
             raise error.Error('Cannot re-register id: {}'.format(id))
-        self.env_specs[id] = EnvSpec(id, **kwargs)
+        if not env_id_re.search(id):
+            raise error.Error('Attempted to register malformed environment ID: {}. (Currently all IDs must be of the form {}.)'.format(id, env_id_re.pattern))
+        self._unbuilt_specs[id] = kwargs
+
+    def _build(self, id):
+        kwargs = self._unbuilt_specs.pop(id, None)
+        if kwargs is not None:
+            self.env_specs[id] = EnvSpec(id, **kwargs)
+
+    def _build_all(self):
+        for id in list(self._unbuilt_specs):
+            self._build(id)
 
 # Have a global registry
 registry = EnvRegistry()
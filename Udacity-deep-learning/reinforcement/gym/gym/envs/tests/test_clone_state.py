@@ -0,0 +1,60 @@
+import copy
+
+import pytest
+
+from gym import envs, spaces
+from gym.envs.tests.spec_list import spec_list
+from gym.envs.tests.test_determinism import assert_equals
+
+families = ('gym.envs.classic_control:', 'gym.envs.toy_text:', 'gym.envs.algorithmic:', 'gym.envs.board_game:')
+snapshot_specs = [spec for spec in spec_list if spec._entry_point.startswith(families)] + [envs.spec('Hex9x9-v0')]
+
+def rollout(env, actions):
+    responses = []
+    for action in actions:
+        responses.append(copy.deepcopy(env.step(action)))
+        if responses[-1][2]:
+            break
+    return responses
+
+@pytest.mark.parametrize("spec", snapshot_specs)
+def test_restore_replays_steps(spec):
+    spaces.seed(0)
+    env = spec.make()
+    env.seed(0)
+    actions = [env.action_space.sample() for _ in range(10)]
+    env.reset()
+    env.step(actions[0])
+    state = env.clone_state()
+    responses = rollout(env, actions[1:])
+
+    env.restore_state(state)
+    for response, replayed in zip(responses, rollout(env, actions[1:])):
+        assert_equals(response, replayed)
+
+    # also into a fresh instance, whose own RNG is overwritten
+    other = spec.make()
+    other.seed(1)
+    other.restore_state(state)
+    for response, replayed in zip(responses, rollout(other, actions[1:])):
+        assert_equals(response, replayed)
+    env.close()
+    other.close()
+
+def test_fork():
+    env = envs.make('CartPole-v0')
+    env.seed(0)
+    env.reset()
+    parent = env.clone_state()
+    children = env.fork([0, 1, 0])
+    assert_equals(env.clone_state(), parent)
+    assert_equals(children[0][1:], children[2][1:])
+    assert children[0][1][1] < children[1][1][1]
+
+    # children continue from their own state
+    env.restore_state(children[1][0])
+    assert env._elapsed_steps == 1
+    observation, _, _, _ = env.step(0)
+    env.restore_state(parent)
+    env.step(1)
+    assert_equals(env.step(0)[0], observation)
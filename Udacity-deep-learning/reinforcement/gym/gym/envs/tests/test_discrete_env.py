@@ -0,0 +1,82 @@
+import copy
+
+import numpy as np
+import pytest
+
+from gym import envs
+from gym.envs.toy_text import discrete
+
+def q_values_loop(env, V, gamma):
+    Q = np.zeros((env.nS, env.nA))
+    for s in range(env.nS):
+        for a in range(env.nA):
+            for prob, next_state, reward, done in env.P[s][a]:
+                Q[s, a] += prob * (reward + (0. if done else gamma * V[next_state]))
+    return Q
+
+@pytest.mark.parametrize("env_id", ['FrozenLake-v0', 'FrozenLake8x8-v0', 'Taxi-v2'])
+def test_step_matches_categorical_sample(env_id):
+    env = envs.make(env_id).unwrapped
+    env.seed(0)
+    np_random = copy.deepcopy(env.np_random)
+    env.reset()
+    s = discrete.categorical_sample(env.isd, np_random)
+    for t in range(2000):
+        a = t % env.nA
+        transitions = env.P[s][a]
+        p, s, r, d = transitions[discrete.categorical_sample([transition[0] for transition in transitions], np_random)]
+        assert env.step(a) == (s, r, d, {"prob": p})
+        if d:
+            assert env.reset() == discrete.categorical_sample(env.isd, np_random)
+            s = env.s
+
+def test_sample_batch():
+    env = envs.make('FrozenLake8x8-v0').unwrapped
+    rng = np.random.RandomState(0)
+    states, actions, u = rng.randint(env.nS, size=500), rng.randint(env.nA, size=500), rng.rand(500)
+    idxs = env.transitions.sample_batch(states, actions, u)
+    assert list(idxs) == [env.transitions.sample(s, a, x) for s, a, x in zip(states, actions, u)]
+
+def test_q_values():
+    env = envs.make('FrozenLake-v0').unwrapped
+    V = np.random.RandomState(0).rand(2, env.nS)
+    Q = env.transitions.q_values(V, np.array([0.5, 0.9]))
+    assert np.allclose(Q[0], q_values_loop(env, V[0], 0.5))
+    assert np.allclose(Q[1], q_values_loop(env, V[1], 0.9))
+    # FrozenLake episodes end exactly on entering a hole or the goal
+    terminal = np.array([c in b'GH' for c in env.desc.flat])
+    transitions, rewards = env.transitions.dense()
+    assert np.allclose(np.sum(transitions * (rewards + 0.9 * np.where(terminal, 0., V[1])), axis=-1), Q[1])
+
+def test_value_iteration_and_policy_evaluation():
+    env = envs.make('FrozenLake-v0').unwrapped
+    gammas = np.array([0.9, 0.99])
+    V, policy = discrete.value_iteration(env.transitions, gammas, theta=1e-10)
+    for g, v in zip(gammas, V):
+        assert np.allclose(q_values_loop(env, v, g).max(axis=1), v)
+
+    greedy = np.eye(env.nA)[policy]
+    uniform = np.ones((env.nS, env.nA)) / env.nA
+    values = discrete.policy_evaluation(env.transitions, np.stack([greedy[1], uniform]), 0.99, theta=1e-10)
+    assert np.allclose(values[0], V[1], atol=1e-6)
+    assert np.all(values[1] <= values[0] + 1e-6)
+
+def test_value_iteration_taxi_is_episodic():
+    env = envs.make('Taxi-v2').unwrapped
+    # fewest actions from each state to the dropoff that ends the episode
+    steps = np.full(env.nS, np.inf)
+    changed = True
+    while changed:
+        changed = False
+        for s in range(env.nS):
+            for a in range(env.nA):
+                (_, next_state, _, done), = env.P[s][a]
+                n = 1 if done else steps[next_state] + 1
+                if n < steps[s]:
+                    steps[s], changed = n, True
+    # -1 per step and +20 for the dropoff
+    V, _ = discrete.value_iteration(env.transitions, 1.)
+    reachable = np.isfinite(steps)
+    assert np.allclose(V[reachable], 21 - steps[reachable])
+    V, _ = discrete.value_iteration(env.transitions, 0.99)
+    assert 19 < V.max() <= 20
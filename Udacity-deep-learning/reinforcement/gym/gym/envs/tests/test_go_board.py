@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from gym import error
+from gym.envs.board_game.go_board import GoBoard, legal_moves_batch, BLACK, WHITE, EMPTY
+from gym.envs.board_game.go_selfplay import self_play
+
+def test_capture_and_ko():
+    board = GoBoard(5)
+    # white surrounds 7 on three sides, black surrounds 8 on three sides
+    for action, color in [(2, WHITE), (3, BLACK), (6, WHITE), (9, BLACK), (12, WHITE), (13, BLACK), (8, WHITE)]:
+        board.play_inplace(action, color)
+    board.play_inplace(7, BLACK)
+    assert board.board[8] == EMPTY and board.captures[BLACK] == 1
+    assert board.ko_point == 8
+    assert not board.is_legal(8, WHITE) and not board.legal_moves(WHITE)[8]
+    with pytest.raises(error.IllegalMove):
+        board.play_inplace(8, WHITE)
+    # the ko can be taken back after a move elsewhere
+    board.play_inplace(24, WHITE)
+    board.play_inplace(20, BLACK)
+    board.play_inplace(8, WHITE)
+    assert board.board[7] == EMPTY and board.captures[WHITE] == 1
+
+def test_suicide():
+    board = GoBoard(3)
+    board.play_inplace(1, BLACK)
+    board.play_inplace(3, BLACK)
+    assert not board.is_legal(0, WHITE)
+    with pytest.raises(error.IllegalMove):
+        board.play_inplace(0, WHITE)
+    assert board.is_legal(0, BLACK)
+
+def test_legal_moves_match_is_legal():
+    rng = np.random.RandomState(0)
+    boards, colors = [], []
+    for _ in range(20):
+        board, color = GoBoard(7), BLACK
+        for _ in range(rng.randint(80)):
+            legal = np.flatnonzero(board.legal_moves(color))
+            board.play_inplace(int(rng.choice(legal)), color)
+            color = BLACK + WHITE - color
+            if board.is_terminal:
+                break
+        boards.append(board)
+        colors.append(color)
+    legal = legal_moves_batch(boards, colors)
+    for board, color, mask in zip(boards, colors, legal):
+        assert list(mask) == [board.is_legal(a, color) for a in range(board.pass_action + 1)]
+
+def test_copy_and_score():
+    board = GoBoard(5, komi=0.5)
+    for action in [1, 6, 11, 16, 21]:
+        board.play_inplace(action, BLACK)
+    snapshot = board.copy()
+    snapshot.play_inplace(3, WHITE)
+    assert board.board[3] == EMPTY
+    assert board.area() == {BLACK: 25, WHITE: 0}
+    assert board.official_score == -24.5
+    # with a white stone, only the first column is surrounded by black
+    assert snapshot.area() == {BLACK: 10, WHITE: 1}
+    board.play_inplace(board.resign_action, WHITE)
+    assert board.is_terminal and board.official_score == float('-inf')
+
+def test_self_play():
+    data = self_play(6, board_size=5, processes=1, games_per_batch=4, seed=0)
+    n = len(data['actions'])
+    assert data['observations'].shape == (n, 3, 5, 5)
+    assert data['lengths'].sum() == n
+    assert np.array_equal(np.bincount(data['game_ids'], minlength=6), data['lengths'])
+    assert np.all(data['outcomes'][data['colors'] == data['winners'][data['game_ids']]] == 1.)
+
+    parallel = self_play(6, board_size=5, processes=2, games_per_batch=4, seed=0)
+    for key in data:
+        assert np.array_equal(data[key], parallel[key])
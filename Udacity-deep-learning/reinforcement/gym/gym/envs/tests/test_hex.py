@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from gym import error
+
+try:
+    from gym.envs.board_game.hex import HexBoard, HexEnv
+except error.DependencyNotInstalled as e:
+    # gym.envs.board_game also imports the pachi Go environment
+    pytestmark = pytest.mark.skip(reason=str(e))
+
+def test_black_wins_top_to_bottom():
+    board = HexBoard(3)
+    # a zigzag down the board through the up-right/down-left diagonal
+    assert board.play(1, HexEnv.BLACK) == 0
+    assert board.play(3, HexEnv.WHITE) == 0
+    assert board.play(4, HexEnv.BLACK) == 0
+    assert board.play(6, HexEnv.BLACK) == 1
+    assert HexEnv.game_finished(board.state) == 1
+
+def test_white_wins_left_to_right():
+    board = HexBoard(3)
+    for action in [6, 4]:
+        assert board.play(action, HexEnv.WHITE) == 0
+    assert board.play(2, HexEnv.WHITE) == -1
+    assert HexEnv.game_finished(board.state) == -1
+
+def test_matches_game_finished():
+    rng = np.random.RandomState(0)
+    for _ in range(100):
+        board = HexBoard(5)
+        player = HexEnv.BLACK
+        for action in rng.permutation(25):
+            winner = board.play(action, player)
+            assert winner == HexEnv.game_finished(board.state)
+            assert board.possible_actions() == HexEnv.get_possible_actions(board.state)
+            if winner:
+                break
+            player = 1 - player
+
+def test_copy_on_write():
+    board = HexBoard(4)
+    board.play(0, HexEnv.BLACK)
+    snapshot = board.copy()
+    snapshot.play(1, HexEnv.WHITE)
+    board.play(2, HexEnv.BLACK)
+    assert snapshot.state[HexEnv.WHITE, 0, 1] == 1 and snapshot.state[2, 0, 2] == 1
+    assert board.state[2, 0, 1] == 1 and board.state[HexEnv.BLACK, 0, 2] == 1
+    assert 1 not in snapshot.possible_actions() and 2 in snapshot.possible_actions()
+    with pytest.raises(error.Error):
+        board.play(0, HexEnv.WHITE)
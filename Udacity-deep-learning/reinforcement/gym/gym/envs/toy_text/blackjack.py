@@ -70,6 +70,8 @@ class BlackjackEnv(gym.Env):
     by Sutton and Barto (1998).
     https://webdocs.cs.ualberta.ca/~sutton/book/the-book.html
     """
+    _state_attributes = ('dealer', 'player')
+
     def __init__(self, natural=False):
         self.action_space = spaces.Discrete(2)
         self.observation_space = spaces.Tuple((
@@ -1,3 +1,5 @@
+import bisect
+
 import numpy as np
 
 from gym import Env, spaces
@@ -13,6 +15,142 @@ def categorical_sample(prob_n, np_random):
     return (csprob_n > np_random.rand()).argmax()
 
 
+class CompiledTransitions(object):
+
+    """
+    The transitions P of a DiscreteEnv in compressed sparse row form.
+    The outcomes in P[s][a] are stored one after another in flat arrays,
+    and row s * nA + a spans offsets[s * nA + a]:offsets[s * nA + a + 1].
+
+    Has the following members
+    - offsets: row pointers, of length nS * nA + 1
+    - outcomes: the (probability, nextstate, reward, done) tuples of P
+    - probs, next_states, rewards, dones: the same as arrays
+    - cdf: cumulative sum of probs within each row, for sampling
+    - expected_rewards: (nS, nA) array of the expected reward of each action
+
+    Planning backs up sum_s' p * (reward + gamma * V[s']) over the
+    outcomes, leaving out V[s'] on the outcomes that end the episode: the
+    state an episode ends in isn't necessarily absorbing (a Taxi dropoff
+    lands in a state where the taxi can pick up and drop off again).
+    """
+    def __init__(self, nS, nA, P):
+        self.nS = nS
+        self.nA = nA
+
+        counts = np.array([len(P[s][a]) for s in range(nS) for a in range(nA)], dtype=np.int64)
+        self.offsets = np.zeros(nS * nA + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(counts)
+        self.outcomes = [t for s in range(nS) for a in range(nA) for t in P[s][a]]
+        self.rows = np.repeat(np.arange(nS * nA), counts)
+
+        self.probs = np.array([t[0] for t in self.outcomes], dtype=np.float64)
+        self.next_states = np.array([t[1] for t in self.outcomes], dtype=np.int64)
+        self.rewards = np.array([t[2] for t in self.outcomes], dtype=np.float64)
+        self.dones = np.array([t[3] for t in self.outcomes], dtype=bool)
+
+        # Rows of the same length go through np.cumsum together, which adds
+        # up every row in the same order as categorical_sample does, so
+        # sampling from the cdf gives exactly the same outcomes.
+        # cdf_table holds the same values padded with -inf to the longest
+        # row, for sampling many rows at once.
+        self.cdf = np.empty_like(self.probs)
+        self.cdf_table = np.full((nS * nA, counts.max()), -np.inf)
+        for count in np.unique(counts):
+            (rows,) = np.nonzero(counts == count)
+            idxs = self.offsets[rows][:, None] + np.arange(count)
+            cdf = np.cumsum(self.probs[idxs], axis=1)
+            self.cdf[idxs] = cdf
+            self.cdf_table[rows, :count] = cdf
+        # bisect over a short list beats np.searchsorted on a single sample
+        self._cdf_rows = [self.cdf[start:end].tolist() for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+        self._starts = self.offsets[:-1].tolist()
+
+        self.expected_rewards = np.bincount(self.rows, self.probs * self.rewards, minlength=nS * nA).reshape(nS, nA)
+
+    def sample(self, s, a, u):
+        """Index into outcomes of the first outcome of P[s][a] whose
+        cumulative probability is above u (uniform in [0, 1))"""
+        row = s * self.nA + a
+        cdf = self._cdf_rows[row]
+        i = bisect.bisect_right(cdf, u)
+        # categorical_sample falls back to the first outcome if the
+        # probabilities add up to less than u
+        return self._starts[row] + (i if i < len(cdf) else 0)
+
+    def sample_batch(self, states, actions, u):
+        """Vectorized sample: outcome indexes for arrays of states, actions
+        and uniform samples u"""
+        rows = np.asarray(states) * self.nA + np.asarray(actions)
+        above = self.cdf_table[rows] > np.asarray(u)[..., None]
+        return self.offsets[rows] + above.argmax(axis=-1)
+
+    def dense(self):
+        """Returns the (nS, nA, nS) transition probabilities and the
+        (nS, nA, nS) expected reward of each transition. Which outcomes end
+        the episode is not represented."""
+        flat = self.rows * self.nS + self.next_states
+        size = self.nS * self.nA * self.nS
+        transitions = np.bincount(flat, self.probs, minlength=size)
+        rewards = np.bincount(flat, self.probs * self.rewards, minlength=size)
+        np.divide(rewards, transitions, out=rewards, where=transitions > 0)
+        shape = (self.nS, self.nA, self.nS)
+        return transitions.reshape(shape), rewards.reshape(shape)
+
+    def q_values(self, V, gamma=1.):
+        """Q[..., s, a] = sum_s' p * (reward + gamma * V[..., s'] * (not done))
+        for a value function V of shape (..., nS). gamma can be a scalar or
+        an array that broadcasts against the batch dimensions of V."""
+        V = np.asarray(V, dtype=np.float64)
+        batch_shape = V.shape[:-1]
+        # (K, B): probability weighted next state values of every outcome
+        backed_up = (self.probs * ~self.dones)[:, None] * V.reshape(-1, self.nS).T[self.next_states]
+        Q = np.zeros((self.nS * self.nA, backed_up.shape[1]))
+        nonempty = self.offsets[:-1] < self.offsets[1:]
+        Q[nonempty] = np.add.reduceat(backed_up, self.offsets[:-1][nonempty], axis=0)
+        Q = Q.T.reshape(batch_shape + (self.nS, self.nA))
+        gamma = np.asarray(gamma, dtype=np.float64)[..., None, None]
+        return self.expected_rewards + gamma * Q
+
+
+def value_iteration(transitions, gamma=1., theta=1e-8, max_iterations=100000):
+    """
+    Synchronous value iteration over CompiledTransitions. gamma can be an
+    array of discount factors, which are all solved at once.
+
+    Returns the optimal values, of shape np.shape(gamma) + (nS,), and the
+    greedy policy, of shape np.shape(gamma) + (nS,)
+    """
+    V = np.zeros(np.shape(gamma) + (transitions.nS,))
+    for _ in range(max_iterations):
+        Q = transitions.q_values(V, gamma)
+        new_V = Q.max(axis=-1)
+        delta = np.max(np.abs(new_V - V)) if V.size else 0.
+        V = new_V
+        if delta < theta:
+            break
+    return V, Q.argmax(axis=-1)
+
+def policy_evaluation(transitions, policy, gamma=1., theta=1e-8, max_iterations=100000):
+    """
+    Iterative policy evaluation over CompiledTransitions. policy has shape
+    (..., nS, nA) with the probability of each action in each state, so a
+    batch of policies is evaluated at once (gamma can be batched too).
+
+    Returns the values, of shape (..., nS)
+    """
+    policy = np.asarray(policy, dtype=np.float64)
+    # the batch dimensions of policy and gamma come in with the first backup
+    V = np.zeros(transitions.nS)
+    for _ in range(max_iterations):
+        new_V = np.sum(policy * transitions.q_values(V, gamma), axis=-1)
+        delta = np.max(np.abs(new_V - V)) if V.size else 0.
+        V = new_V
+        if delta < theta:
+            break
+    return V
+
+
 class DiscreteEnv(Env):
 
     """
@@ -21,19 +159,24 @@ class DiscreteEnv(Env):
     - nA: number of actions
     - P: transitions (*)
     - isd: initial state distribution (**)
+    - transitions: P compiled into arrays, see CompiledTransitions
 
     (*) dictionary dict of dicts of lists, where
       P[s][a] == [(probability, nextstate, reward, done), ...]
     (**) list or array of length nS
 
-
+    P is compiled when the environment is created; call compile() after
+    modifying it.
     """
+    _state_attributes = ('s', 'lastaction')
+
     def __init__(self, nS, nA, P, isd):
         self.P = P
         self.isd = isd
         self.lastaction=None # for rendering
         self.nS = nS
         self.nA = nA
+        self.compile()
 
         self.action_space = spaces.Discrete(self.nA)
         self.observation_space = spaces.Discrete(self.nS)
@@ -41,19 +184,22 @@ class DiscreteEnv(Env):
         self._seed()
         self._reset()
 
+    def compile(self):
+        self.transitions = CompiledTransitions(self.nS, self.nA, self.P)
+        self._isd_cdf = np.cumsum(np.asarray(self.isd))
+
     def _seed(self, seed=None):
         self.np_random, seed = seeding.np_random(seed)
         return [seed]
 
     def _reset(self):
-        self.s = categorical_sample(self.isd, self.np_random)
+        self.s = (self._isd_cdf > self.np_random.rand()).argmax()
         self.lastaction=None
         return self.s
 
     def _step(self, a):
-        transitions = self.P[self.s][a]
-        i = categorical_sample([t[0] for t in transitions], self.np_random)
-        p, s, r, d= transitions[i]
+        i = self.transitions.sample(self.s, a, self.np_random.rand())
+        p, s, r, d= self.transitions.outcomes[i]
         self.s = s
         self.lastaction=a
         return (s, r, d, {"prob" : p})
@@ -36,6 +36,8 @@ class GuessingGame(gym.Env):
     The perfect agent would likely learn the bounds of the action space (without referring
     to them explicitly) and then follow binary tree style exploration towards to goal number
     """
+    _state_attributes = ('number', 'guess_count', 'observation')
+
     def __init__(self):
         self.range = 1000  # Randomly selected number is within +/- this value
         self.bounds = 10000
@@ -21,6 +21,8 @@ class HotterColder(gym.Env):
     increase the rate in which is guesses in that direction until the reward reaches
     its maximum
     """
+    _state_attributes = ('number', 'guess_count', 'observation')
+
     def __init__(self):
         self.range = 1000  # +/- value the randomly select number can be between
         self.bounds = 2000  # Action space bounds
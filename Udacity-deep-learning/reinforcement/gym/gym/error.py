@@ -44,6 +44,12 @@ class UnsupportedMode(Exception):
     """
     pass
 
+class UnsupportedStateSnapshot(Exception):
+    """Raised when clone_state() or restore_state() is called on an
+    environment that doesn't support state snapshots.
+    """
+    pass
+
 class ResetNeeded(Exception):
     """When the monitor is active, raised when the user tries to step an
     environment that's already done.
@@ -62,6 +68,12 @@ class InvalidAction(Exception):
     """
     pass
 
+class IllegalMove(InvalidAction):
+    """Raised when a board game move breaks the rules of the game, e.g.
+    playing on an occupied point
+    """
+    pass
+
 # API errors
 
 class APIError(Error):
@@ -138,3 +150,23 @@ class WrapAfterConfigureError(Error):
 
 class RetriesExceededError(Error):
     pass
+
+# Vector env errors
+
+class AlreadyPendingCallError(Error):
+    """Raised when step_async is called on a vector env that is still
+    waiting for the results of a previous step_async.
+    """
+    pass
+
+class NoAsyncCallError(Error):
+    """Raised when step_wait is called on a vector env without a pending
+    step_async.
+    """
+    pass
+
+class VectorEnvWorkerError(Error):
+    """Raised in the main process when a vector env worker process
+    fails.
+    """
+    pass
@@ -1,7 +1,10 @@
 import json
 import os
+import struct
 import time
 
+import numpy as np
+
 from gym import error
 from gym.utils import atomic_write
 from gym.utils.json_utils import json_encode_np
@@ -78,6 +81,7 @@ class StatsRecorder(object):
         # changes the type, it's more natural for it to apply next
         # time the user calls reset().
         self.episode_types.append(self._type)
+        self._episode_type = self._type
 
     def save_complete(self):
         if self.steps is not None:
@@ -101,3 +105,98 @@ class StatsRecorder(object):
                 'episode_rewards': self.episode_rewards,
                 'episode_types': self.episode_types,
             }, f, default=json_encode_np)
+
+# Binary stats files: a fixed header followed by one fixed-width record per
+# completed episode, appended as episodes finish.
+STATS_MAGIC = b'GYMSTAT1'
+# magic, then the initial reset timestamp (NaN until the first reset)
+STATS_HEADER = struct.Struct('<8sd')
+EPISODE_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('length', '<i8'),
+    ('reward', '<f8'),
+    ('type', 'S1'),
+])
+
+class StreamingStatsRecorder(StatsRecorder):
+    """StatsRecorder that appends every completed episode to a binary file
+    instead of rewriting a JSON document with the whole history on every
+    flush, so the cost of a flush only depends on the number of episodes
+    since the previous one.
+
+    Pending records are written on flush and the file is fsync'ed at most
+    every fsync_interval seconds (and on close). A crash loses at most the
+    episodes since the last flush; a torn record at the end of the file is
+    ignored when reading it back with load_stats.
+    """
+    def __init__(self, directory, file_prefix, autoreset=False, env_id=None, fsync_interval=10.):
+        super(StreamingStatsRecorder, self).__init__(directory, file_prefix, autoreset=autoreset, env_id=env_id)
+        self.fsync_interval = fsync_interval
+        self.path = os.path.join(self.directory, '{}.stats.bin'.format(self.file_prefix))
+
+        self._pending = []
+        self._last_fsync = time.time()
+        self._file = open(self.path, 'wb')
+        self._file.write(STATS_HEADER.pack(STATS_MAGIC, float('nan')))
+        self._file.flush()
+
+    def before_reset(self):
+        first_reset = self.initial_reset_timestamp is None
+        super(StreamingStatsRecorder, self).before_reset()
+        if first_reset:
+            # patch the header in place, then carry on appending at the end
+            self._file.seek(0)
+            self._file.write(STATS_HEADER.pack(STATS_MAGIC, self.initial_reset_timestamp))
+            self._file.seek(0, os.SEEK_END)
+
+    def save_complete(self):
+        if self.steps is not None:
+            super(StreamingStatsRecorder, self).save_complete()
+            self._pending.append((self.timestamps[-1], self.steps, self.episode_rewards[-1], self._episode_type))
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self.closed = True
+
+    def flush(self):
+        if self.closed:
+            return
+
+        if self._pending:
+            self._file.write(np.array(self._pending, dtype=EPISODE_DTYPE).tobytes())
+            self._pending = []
+        self._file.flush()
+        if time.time() - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.time()
+
+def load_stats(path):
+    """Reads a stats file written by StatsRecorder (JSON) or
+    StreamingStatsRecorder (binary) into a dict with the keys of the JSON
+    format. The episodes of a binary file are read through a memmap.
+    """
+    if not path.endswith('.bin'):
+        with open(path) as f:
+            return json.load(f)
+
+    with open(path, 'rb') as f:
+        magic, initial_reset_timestamp = STATS_HEADER.unpack(f.read(STATS_HEADER.size))
+    if magic != STATS_MAGIC:
+        raise error.Error('{} is not a gym stats file'.format(path))
+
+    num_episodes = (os.path.getsize(path) - STATS_HEADER.size) // EPISODE_DTYPE.itemsize
+    if num_episodes > 0:
+        episodes = np.memmap(path, dtype=EPISODE_DTYPE, mode='r', offset=STATS_HEADER.size, shape=(num_episodes,))
+    else:
+        episodes = np.zeros(0, dtype=EPISODE_DTYPE)
+    return {
+        'initial_reset_timestamp': None if np.isnan(initial_reset_timestamp) else initial_reset_timestamp,
+        'timestamps': episodes['timestamp'],
+        'episode_lengths': episodes['length'],
+        'episode_rewards': episodes['reward'],
+        'episode_types': np.char.decode(episodes['type'], 'ascii'),
+    }
@@ -203,3 +203,47 @@ def test_steps_limit_restart():
         assert env.episode_id == 1
 
         env.close()
+
+def _run_cartpole(temp, stats_format, episodes):
+    env = gym.make('CartPole-v0')
+    env = Monitor(env, temp, video_callable=False, stats_format=stats_format, write_upon_reset=True)
+    env.seed(0)
+    for episode in range(episodes):
+        if episode == episodes - 1:
+            env.set_monitor_mode('evaluation')
+        env.reset()
+        done = False
+        while not done:
+            _, _, done, _ = env.step(episode % 2)
+    env.close()
+    return monitoring.load_results(temp)
+
+def test_binary_stats_match_json():
+    with helpers.tempdir() as json_temp, helpers.tempdir() as binary_temp:
+        json_results = _run_cartpole(json_temp, 'json', 5)
+        binary_results = _run_cartpole(binary_temp, 'binary', 5)
+        assert glob.glob(os.path.join(binary_temp, '*.stats.bin'))
+        for key in ['episode_lengths', 'episode_rewards', 'episode_types', 'data_sources']:
+            assert json_results[key] == binary_results[key], key
+        assert binary_results['episode_types'] == ['t'] * 4 + ['e']
+        assert len(binary_results['timestamps']) == 5
+        assert binary_results['initial_reset_timestamp'] <= binary_results['timestamps'][0]
+
+def test_binary_stats_ignore_torn_record():
+    with helpers.tempdir() as temp:
+        _run_cartpole(temp, 'binary', 3)
+        path, = glob.glob(os.path.join(temp, '*.stats.bin'))
+        with open(path, 'ab') as f:
+            f.write(b'\0' * 7) # a record that was only partially written
+        results = monitoring.load_results(temp)
+        assert len(results['episode_lengths']) == 3
+
+def test_invalid_stats_format():
+    with helpers.tempdir() as temp:
+        env = gym.make('CartPole-v0')
+        try:
+            Monitor(env, temp, stats_format='xml')
+        except error.Error:
+            pass
+        else:
+            assert False
@@ -2,10 +2,13 @@ import json
 import os
 import shutil
 import tempfile
+import threading
 import numpy as np
+import pytest
 
 import gym
 from gym.monitoring import VideoRecorder
+from gym.monitoring.video_recorder import FrameQueue
 
 class BrokenRecordableEnv(object):
     metadata = {'render.modes': [None, 'rgb_array']}
@@ -63,3 +66,42 @@ def test_text_envs():
         video.close()
     finally:
         os.remove(video.path)
+
+def test_frame_queue_writes_in_order():
+    written = []
+    queue = FrameQueue(lambda data: written.append(bytes(data)), (2, 2, 3), size=4)
+    frames = [np.full((2, 2, 3), i, dtype=np.uint8) for i in range(20)]
+    for frame in frames:
+        assert queue.put(frame)
+    queue.close()
+    assert written == [frame.tobytes() for frame in frames]
+    metrics = queue.metrics
+    assert metrics['frames_queued'] == metrics['frames_written'] == 20
+    assert metrics['frames_dropped'] == metrics['frames_pending'] == 0
+
+def test_frame_queue_drops_when_full():
+    release = threading.Event()
+    written = []
+    def slow_write(data):
+        release.wait()
+        written.append(bytes(data))
+
+    queue = FrameQueue(slow_write, (1, 1, 3), size=2, block=False)
+    results = [queue.put(np.full((1, 1, 3), i, dtype=np.uint8)) for i in range(10)]
+    release.set()
+    queue.close()
+    # the writer holds at most one frame outside of the two free slots
+    assert 2 <= sum(results) <= 3
+    assert queue.metrics['frames_dropped'] == 10 - sum(results)
+    assert len(written) == sum(results)
+
+def test_frame_queue_raises_write_errors():
+    def broken_write(data):
+        raise IOError('broken pipe')
+
+    queue = FrameQueue(broken_write, (1, 1, 3), size=2)
+    queue.put(np.zeros((1, 1, 3), dtype=np.uint8))
+    with pytest.raises(IOError):
+        for _ in range(10):
+            queue.put(np.zeros((1, 1, 3), dtype=np.uint8))
+        queue.close()
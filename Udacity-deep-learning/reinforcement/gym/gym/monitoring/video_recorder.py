@@ -3,6 +3,8 @@ import json
 import os
 import subprocess
 import tempfile
+import threading
+import time
 import os.path
 import distutils.spawn, distutils.version
 import numpy as np
@@ -32,9 +34,11 @@ class VideoRecorder(object):
         base_path (Optional[str]): Alternatively, path to the video file without extension, which will be added.
         metadata (Optional[dict]): Contents to save to the metadata file.
         enabled (bool): Whether to actually record video, or just no-op (for convenience)
+        queue_size (int): If nonzero, frames are copied into a ring buffer of this many frames and fed to the encoder by a background thread, so a slow encoder doesn't stall the rollout.
+        drop_frames (bool): With a queue, drop new frames while the buffer is full instead of waiting for the encoder to catch up.
     """
 
-    def __init__(self, env, path=None, metadata=None, enabled=True, base_path=None):
+    def __init__(self, env, path=None, metadata=None, enabled=True, base_path=None, queue_size=0, drop_frames=False):
         modes = env.metadata.get('render.modes', [])
         self._async = env.metadata.get('semantics.async')
         self.enabled = enabled
@@ -81,6 +85,8 @@ class VideoRecorder(object):
         touch(path)
 
         self.frames_per_sec = env.metadata.get('video.frames_per_second', 30)
+        self.queue_size = queue_size
+        self.drop_frames = drop_frames
         self.encoder = None # lazily start the process
         self.broken = False
 
@@ -128,6 +134,8 @@ class VideoRecorder(object):
         if self.encoder:
             logger.debug('Closing video encoder: path=%s', self.path)
             self.encoder.close()
+            if getattr(self.encoder, 'metrics', None):
+                self.metadata['encoder_metrics'] = self.encoder.metrics
             self.encoder = None
         else:
             # No frames captured. Set metadata, and remove the empty output file.
@@ -164,7 +172,8 @@ class VideoRecorder(object):
 
     def _encode_image_frame(self, frame):
         if not self.encoder:
-            self.encoder = ImageEncoder(self.path, frame.shape, self.frames_per_sec)
+            self.encoder = ImageEncoder(self.path, frame.shape, self.frames_per_sec,
+                                        queue_size=self.queue_size, drop_frames=self.drop_frames)
             self.metadata['encoder_version'] = self.encoder.version_info
 
         try:
@@ -238,9 +247,122 @@ class TextEncoder(object):
     def version_info(self):
         return {'backend':'TextEncoder','version':1}
 
+class FrameQueue(object):
+    """Bounded ring buffer of preallocated uint8 frames, drained by a
+    background thread that passes each frame to `write`.
+
+    `put` copies the frame into a free slot and returns without waiting for
+    `write`. When all slots are taken it either waits for one to free up
+    (block=True) or drops the frame. An exception raised by `write` stops
+    the thread and is raised again from the next `put` or from `close`.
+
+    Args:
+        write (function): Called from the writer thread with each frame, in order.
+        frame_shape (tuple): Shape of every frame.
+        size (int): Number of frames in the buffer.
+        block (bool): Whether `put` waits for a free slot, or drops the frame.
+    """
+
+    def __init__(self, write, frame_shape, size=64, block=True):
+        self.write = write
+        self.size = size
+        self.block = block
+        self.buffer = np.empty((size,) + tuple(frame_shape), dtype=np.uint8)
+        self._queued_at = np.zeros(size)
+
+        self.frames_queued = 0
+        self.frames_dropped = 0
+        self.frames_written = 0
+        self.encode_latency_total = 0.
+        self.encode_latency_max = 0.
+        self.error = None
+
+        # frames in the buffer are slots head, head+1, ..., head+count-1 (mod size)
+        self._head = 0
+        self._count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='FrameQueue writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, frame):
+        """Queue a copy of frame. Returns False if it was dropped."""
+        with self._cond:
+            while self.error is None and self._count == self.size:
+                if not self.block:
+                    self.frames_dropped += 1
+                    return False
+                self._cond.wait()
+            if self.error is not None:
+                raise self.error
+
+            slot = (self._head + self._count) % self.size
+            # the writer thread never touches a free slot, so this is safe
+            # to fill while holding the lock
+            np.copyto(self.buffer[slot], frame)
+            self._queued_at[slot] = time.time()
+            self._count += 1
+            self.frames_queued += 1
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._count == 0 and not self._closed:
+                    self._cond.wait()
+                if self._count == 0:
+                    return
+                slot = self._head
+
+            try:
+                self.write(self.buffer[slot].data)
+            except Exception as e:
+                with self._cond:
+                    self.error = e
+                    self._cond.notify_all()
+                return
+
+            latency = time.time() - self._queued_at[slot]
+            with self._cond:
+                self._head = (self._head + 1) % self.size
+                self._count -= 1
+                self.frames_written += 1
+                self.encode_latency_total += latency
+                self.encode_latency_max = max(self.encode_latency_max, latency)
+                self._cond.notify_all()
+
+    def close(self):
+        """Wait for the queued frames to be written and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def metrics(self):
+        with self._cond:
+            return {
+                'queue_size': self.size,
+                'frames_queued': self.frames_queued,
+                'frames_pending': self._count,
+                'frames_dropped': self.frames_dropped,
+                'frames_written': self.frames_written,
+                'encode_latency_mean': self.encode_latency_total / self.frames_written if self.frames_written else 0.,
+                'encode_latency_max': self.encode_latency_max,
+            }
+
 class ImageEncoder(object):
-    def __init__(self, output_path, frame_shape, frames_per_sec):
+    """Pipes rgb frames to an ffmpeg or avconv process. With queue_size > 0
+    the frames go through a FrameQueue, and capture_frame only copies the
+    frame (or drops it if drop_frames is set and the queue is full)."""
+
+    def __init__(self, output_path, frame_shape, frames_per_sec, queue_size=0, drop_frames=False):
         self.proc = None
+        self.queue = None
         self.output_path = output_path
         # Frame shape should be lines-first, so w and h are swapped
         h, w, pixfmt = frame_shape
@@ -259,6 +381,8 @@ class ImageEncoder(object):
             raise error.DependencyNotInstalled("""Found neither the ffmpeg nor avconv executables. On OS X, you can install ffmpeg via `brew install ffmpeg`. On most Ubuntu variants, `sudo apt-get install ffmpeg` should do it. On Ubuntu 14.04, however, you'll need to install avconv with `sudo apt-get install libav-tools`.""")
 
         self.start()
+        if queue_size > 0:
+            self.queue = FrameQueue(self.proc.stdin.write, frame_shape, size=queue_size, block=not drop_frames)
 
     @property
     def version_info(self):
@@ -302,13 +426,24 @@ class ImageEncoder(object):
         if frame.dtype != np.uint8:
             raise error.InvalidFrame("Your frame has data type {}, but we require uint8 (i.e. RGB values from 0-255).".format(frame.dtype))
 
-        if distutils.version.LooseVersion(np.__version__) >= distutils.version.LooseVersion('1.9.0'):
+        if self.queue is not None:
+            self.queue.put(frame)
+        elif distutils.version.LooseVersion(np.__version__) >= distutils.version.LooseVersion('1.9.0'):
             self.proc.stdin.write(frame.tobytes())
         else:
             self.proc.stdin.write(frame.tostring())
 
+    @property
+    def metrics(self):
+        """Frame and latency counters of the queue, None without one"""
+        return self.queue.metrics if self.queue is not None else None
+
     def close(self):
-        self.proc.stdin.close()
+        try:
+            if self.queue is not None:
+                self.queue.close()
+        finally:
+            self.proc.stdin.close()
         ret = self.proc.wait()
         if ret != 0:
             logger.error("VideoRecorder encoder exited with status {}".format(ret))
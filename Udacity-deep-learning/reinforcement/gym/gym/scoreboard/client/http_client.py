@@ -1,3 +1,4 @@
+import distutils.version
 import logging
 import requests
 import textwrap
@@ -9,6 +10,9 @@ from gym.scoreboard.client import util
 logger = logging.getLogger(__name__)
 warned = False
 
+if distutils.version.LooseVersion(requests.__version__) < distutils.version.LooseVersion('2.0'):
+    logger.warn("You have 'requests' version %s installed, but 'gym' requires at least 2.0. HINT: upgrade via 'pip install -U requests'.", requests.__version__)
+
 def render_post_data(post_data):
     if hasattr(post_data, 'fileno'): # todo: is this the right way of checking if it's a file?
         return '%r (%d bytes)' % (post_data, util.file_size(post_data))
@@ -7,7 +7,6 @@ We correspondly do not currently import this module.
 """
 
 import os
-from collections import defaultdict
 
 import json
 import numpy as np
@@ -121,7 +120,9 @@ def score_from_merged(episode_lengths, episode_rewards, episode_types, timestamp
         'seconds_in_total': seconds_in_total,
     }
 
-def benchmark_score_from_local(benchmark_id, training_dir):
+def benchmark_score_from_local(benchmark_id, training_dir, processes=None):
+    """Calculate the benchmark score of every training directory under
+    training_dir, scoring them in parallel worker processes"""
     spec = gym.benchmark_spec(benchmark_id)
 
     directories = []
@@ -130,16 +131,7 @@ def benchmark_score_from_local(benchmark_id, training_dir):
         if manifests:
             directories.append(name)
 
-    benchmark_results = defaultdict(list)
-    for training_dir in directories:
-        results = gym.monitoring.load_results(training_dir)
-
-        env_id = results['env_info']['env_id']
-        benchmark_result = spec.score_evaluation(env_id, results['data_sources'], results['initial_reset_timestamps'], results['episode_lengths'], results['episode_rewards'], results['episode_types'], results['timestamps'])
-        # from pprint import pprint
-        # pprint(benchmark_result)
-        benchmark_results[env_id].append(benchmark_result)
-
+    benchmark_results = gym.benchmarks.scoring.score_training_dirs(spec, directories, processes=processes)
     return gym.benchmarks.scoring.benchmark_aggregate_score(spec, benchmark_results)
 
 def benchmark_score_from_merged(benchmark, env_id, episode_lengths, episode_rewards, episode_types):
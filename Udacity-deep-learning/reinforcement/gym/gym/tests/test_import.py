@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import gym
+
+GYM_ROOT = os.path.join(os.path.dirname(os.path.abspath(gym.__file__)), os.pardir)
+
+def _modules_after(code):
+    env = dict(os.environ, PYTHONPATH=GYM_ROOT)
+    output = subprocess.check_output([sys.executable, '-c', code + '; import sys; print(" ".join(sys.modules))'], env=env)
+    return set(output.decode().split())
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="lazy imports need module __getattr__")
+def test_import_is_light():
+    modules = _modules_after('import gym')
+    for heavy in ['gym.scoreboard', 'gym.benchmarks', 'gym.monitoring', 'gym.wrappers.monitoring',
+                  'requests', 'pkg_resources']:
+        assert heavy not in modules, '{} is imported by `import gym`'.format(heavy)
+
+def test_make_does_not_import_scoreboard():
+    modules = _modules_after('import gym; gym.make("CartPole-v0")')
+    assert 'gym.envs.classic_control.cartpole' in modules
+    assert 'gym.scoreboard' not in modules
+
+def test_monitor_imported_first():
+    modules = _modules_after('from gym import wrappers; wrappers.Monitor')
+    assert 'gym.wrappers.monitoring' in modules
+
+def test_lazy_attributes():
+    from gym.benchmarks import benchmark_spec
+    from gym.scoreboard.api import upload
+    from gym.wrappers.monitoring import Monitor
+    assert gym.benchmark_spec == benchmark_spec
+    assert gym.upload is upload
+    assert gym.wrappers.Monitor is Monitor
+    assert 'upload' in dir(gym)
+    with pytest.raises(AttributeError):
+        gym.not_an_attribute
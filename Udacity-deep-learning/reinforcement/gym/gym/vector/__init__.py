@@ -0,0 +1,34 @@
+from functools import partial
+
+from gym import envs
+from gym.vector.core import VectorEnv, SyncVectorEnv
+from gym.vector.async_vector_env import AsyncVectorEnv
+from gym.vector.classic_control import CartPoleVectorEnv, MountainCarVectorEnv, PendulumVectorEnv, AcrobotVectorEnv
+
+# Environments with a batched implementation, keyed by the entry point they
+# are registered with in gym.envs
+batched_entry_points = {
+    'gym.envs.classic_control:CartPoleEnv': CartPoleVectorEnv,
+    'gym.envs.classic_control:MountainCarEnv': MountainCarVectorEnv,
+    'gym.envs.classic_control:PendulumEnv': PendulumVectorEnv,
+    'gym.envs.classic_control:AcrobotEnv': AcrobotVectorEnv,
+}
+
+def make(id, num_envs, asynchronous=False):
+    """Creates a vector environment of num_envs copies of a registered
+    environment. Environments with a batched implementation are stepped
+    in a single vectorized update. Every other one falls back to an
+    AsyncVectorEnv with one worker process per copy if asynchronous is
+    set, and to a SyncVectorEnv otherwise. The registered
+    max_episode_steps is applied in all cases.
+    """
+    spec = envs.spec(id)
+    cls = batched_entry_points.get(spec._entry_point)
+    if cls is not None:
+        return cls(num_envs, max_episode_steps=spec.max_episode_steps, **spec._kwargs)
+    env_fns = [partial(envs.make, id)] * num_envs
+    if asynchronous:
+        return AsyncVectorEnv(env_fns)
+    return SyncVectorEnv(env_fns)
+
+__all__ = ["VectorEnv", "SyncVectorEnv", "AsyncVectorEnv", "make"]
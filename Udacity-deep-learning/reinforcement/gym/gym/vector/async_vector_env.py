@@ -0,0 +1,182 @@
+import multiprocessing
+import time
+import traceback
+
+import numpy as np
+
+from gym import error
+from gym.vector.core import VectorEnv
+
+class AsyncVectorEnv(VectorEnv):
+    """Runs every sub-environment in its own worker process, for
+    environments that are too expensive to batch in numpy (Box2D,
+    MuJoCo, Atari).
+
+    Workers write their observations straight into an array in shared
+    memory, so only rewards, dones and infos go through the pipes.
+    step_async sends the actions and returns immediately, step_wait
+    collects the results; the caller can compute its next actions in
+    between. Sub-environments are reset in their worker when they are
+    done, and info['infos'] holds the info dicts of the sub-environments.
+
+    Time limits are left to the sub-environments (envs from gym.make are
+    already wrapped in TimeLimit).
+    """
+    def __init__(self, env_fns):
+        """
+        Args:
+            env_fns (list): picklable functions that each create one
+                sub-environment, e.g. functools.partial(gym.make, id)
+        """
+        super(AsyncVectorEnv, self).__init__(len(env_fns))
+
+        # the spaces and observation layout come from a throwaway instance
+        dummy_env = env_fns[0]()
+        self.observation_space = dummy_env.observation_space
+        self.action_space = dummy_env.action_space
+        self.reward_range = dummy_env.reward_range
+        observation = np.asarray(dummy_env.reset())
+        dummy_env.close()
+        del dummy_env
+
+        self._obs_shape, self._obs_dtype = observation.shape, observation.dtype
+        self._shared_obs = multiprocessing.RawArray('B', self.num_envs * observation.nbytes)
+        self._observations = _shared_array(self._shared_obs, self._obs_shape, self._obs_dtype)
+
+        self.remotes, self.processes = [], []
+        for index, env_fn in enumerate(env_fns):
+            remote, work_remote = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker,
+                args=(index, env_fn, work_remote, remote, self._shared_obs, self._obs_shape, self._obs_dtype))
+            process.daemon = True # don't leave workers behind if the main process crashes
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+        self._waiting = False
+        self._closed = False
+
+    def step_async(self, actions):
+        """Sends one action to every sub-environment without waiting for
+        the results.
+        """
+        if self._waiting:
+            raise error.AlreadyPendingCallError('Calling step_async while waiting for a pending call to step_wait to complete.')
+        for remote, action in zip(self.remotes, actions):
+            remote.send(('step', action))
+        self._waiting = True
+
+    def step_wait(self, timeout=None):
+        """Waits for the sub-environments to finish the steps started by
+        step_async.
+
+        Args:
+            timeout (Optional[float]): seconds to wait for all the
+                sub-environments before raising multiprocessing.TimeoutError
+
+        Returns:
+            the same (observations, rewards, dones, info) as step
+        """
+        if not self._waiting:
+            raise error.NoAsyncCallError('Calling step_wait without any prior call to step_async.')
+        if timeout is not None:
+            deadline = time.time() + timeout
+            for remote in self.remotes:
+                if not remote.poll(max(deadline - time.time(), 0)):
+                    raise multiprocessing.TimeoutError('step_wait timed out after {} seconds.'.format(timeout))
+        results = self._recv_all(range(self.num_envs))
+        self._waiting = False
+
+        rewards, dones, infos, terminals = zip(*results)
+        observations = self._observations.copy()
+        info = {'infos': infos}
+        dones = np.array(dones, dtype=bool)
+        if dones.any():
+            terminal_observations = observations.copy()
+            for i in np.flatnonzero(dones):
+                terminal_observations[i] = terminals[i]
+            info['terminal_observation'] = terminal_observations
+        return observations, np.array(rewards, dtype=np.float64), dones, info
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def _reset(self, idxs):
+        for i in idxs:
+            self.remotes[i].send(('reset', None))
+        self._recv_all(idxs)
+        return self._observations[idxs].copy()
+
+    def _seed(self, seed=None):
+        # sub-environment i is seeded with seed + i
+        for i, remote in enumerate(self.remotes):
+            remote.send(('seed', None if seed is None else seed + i))
+        return self._recv_all(range(self.num_envs))
+
+    def _close(self):
+        if self._closed:
+            return
+        if self._waiting:
+            self.step_wait()
+        for remote in self.remotes:
+            try:
+                remote.send(('close', None))
+            except (IOError, OSError):
+                pass # the worker already exited after an error
+        for process in self.processes:
+            process.join()
+        for remote in self.remotes:
+            remote.close()
+        self._closed = True
+
+    def _recv_all(self, idxs):
+        # read every reply before raising, so that no stale result is left
+        # in the pipes of the workers that didn't fail
+        results, errors = [], []
+        for i in idxs:
+            success, data = self.remotes[i].recv()
+            if success:
+                results.append(data)
+            else:
+                errors.append((i, data))
+        if errors:
+            self._waiting = False
+            raise error.VectorEnvWorkerError('Worker {} failed:\n{}'.format(*errors[0]))
+        return results
+
+def _shared_array(shared_obs, shape, dtype):
+    return np.frombuffer(shared_obs, dtype=dtype).reshape((-1,) + shape)
+
+def _worker(index, env_fn, remote, parent_remote, shared_obs, obs_shape, obs_dtype):
+    parent_remote.close()
+    observations = _shared_array(shared_obs, obs_shape, obs_dtype)
+    env = None
+    try:
+        env = env_fn()
+        while True:
+            cmd, data = remote.recv()
+            if cmd == 'step':
+                observation, reward, done, info = env.step(data)
+                terminal = None
+                if done:
+                    terminal = observation
+                    observation = env.reset()
+                observations[index] = observation
+                remote.send((True, (reward, done, info, terminal)))
+            elif cmd == 'reset':
+                observations[index] = env.reset()
+                remote.send((True, None))
+            elif cmd == 'seed':
+                remote.send((True, env.seed(data)))
+            elif cmd == 'close':
+                break
+            else:
+                raise RuntimeError('Unknown command {}'.format(cmd))
+    except (KeyboardInterrupt, Exception):
+        remote.send((False, traceback.format_exc()))
+    finally:
+        if env is not None:
+            env.close()
+        remote.close()
@@ -0,0 +1,292 @@
+"""
+Batched versions of the classic control environments. Each one holds
+the states of all its sub-environments in a single (num_envs, state_dim)
+array and advances them with one vectorized update per step, with the
+same dynamics as the environments in gym.envs.classic_control.
+"""
+
+import numpy as np
+
+from gym import spaces
+from gym.envs.classic_control.acrobot import rk4
+from gym.envs.classic_control.pendulum import angle_normalize
+from gym.utils import seeding
+from gym.vector.core import VectorEnv
+
+class CartPoleVectorEnv(VectorEnv):
+    metadata = {
+        'render.modes': [],
+        'video.frames_per_second' : 50
+    }
+
+    def __init__(self, num_envs, max_episode_steps=None):
+        super(CartPoleVectorEnv, self).__init__(num_envs, max_episode_steps=max_episode_steps)
+        self.gravity = 9.8
+        self.masscart = 1.0
+        self.masspole = 0.1
+        self.total_mass = (self.masspole + self.masscart)
+        self.length = 0.5 # actually half the pole's length
+        self.polemass_length = (self.masspole * self.length)
+        self.force_mag = 10.0
+        self.tau = 0.02  # seconds between state updates
+
+        # Angle at which to fail the episode
+        self.theta_threshold_radians = 12 * 2 * np.pi / 360
+        self.x_threshold = 2.4
+
+        high = np.array([
+            self.x_threshold * 2,
+            np.finfo(np.float32).max,
+            self.theta_threshold_radians * 2,
+            np.finfo(np.float32).max])
+
+        self.action_space = spaces.Discrete(2)
+        self.observation_space = spaces.Box(-high, high)
+
+        self._seed()
+        self.state = np.zeros((num_envs, 4))
+
+    def _seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def _step(self, actions):
+        actions = np.asarray(actions)
+        assert actions.shape == (self.num_envs,) and np.all((actions == 0) | (actions == 1)), "%r invalid" % (actions,)
+        x, x_dot, theta, theta_dot = self.state.T
+        force = np.where(actions == 1, self.force_mag, -self.force_mag)
+        costheta = np.cos(theta)
+        sintheta = np.sin(theta)
+        temp = (force + self.polemass_length * theta_dot * theta_dot * sintheta) / self.total_mass
+        thetaacc = (self.gravity * sintheta - costheta* temp) / (self.length * (4.0/3.0 - self.masspole * costheta * costheta / self.total_mass))
+        xacc  = temp - self.polemass_length * thetaacc * costheta / self.total_mass
+        x  = x + self.tau * x_dot
+        x_dot = x_dot + self.tau * xacc
+        theta = theta + self.tau * theta_dot
+        theta_dot = theta_dot + self.tau * thetaacc
+        self.state = np.stack([x, x_dot, theta, theta_dot], axis=1)
+        dones = (np.abs(x) > self.x_threshold) | (np.abs(theta) > self.theta_threshold_radians)
+        # the step on which the pole falls is still rewarded; after that
+        # the sub-environment is reset, so every step is worth 1
+        rewards = np.ones(self.num_envs)
+        return self.state.copy(), rewards, dones, {}
+
+    def _reset(self, idxs):
+        self.state[idxs] = self.np_random.uniform(low=-0.05, high=0.05, size=(len(idxs), 4))
+        return self.state[idxs]
+
+class MountainCarVectorEnv(VectorEnv):
+    metadata = {
+        'render.modes': [],
+        'video.frames_per_second': 30
+    }
+
+    def __init__(self, num_envs, max_episode_steps=None):
+        super(MountainCarVectorEnv, self).__init__(num_envs, max_episode_steps=max_episode_steps)
+        self.min_position = -1.2
+        self.max_position = 0.6
+        self.max_speed = 0.07
+        self.goal_position = 0.5
+
+        self.low = np.array([self.min_position, -self.max_speed])
+        self.high = np.array([self.max_position, self.max_speed])
+
+        self.action_space = spaces.Discrete(3)
+        self.observation_space = spaces.Box(self.low, self.high)
+
+        self._seed()
+        self.state = np.zeros((num_envs, 2))
+
+    def _seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def _step(self, actions):
+        actions = np.asarray(actions)
+        assert actions.shape == (self.num_envs,) and np.all((actions >= 0) & (actions < 3)), "%r invalid" % (actions,)
+
+        position, velocity = self.state.T
+        velocity = velocity + (actions-1)*0.001 + np.cos(3*position)*(-0.0025)
+        velocity = np.clip(velocity, -self.max_speed, self.max_speed)
+        position = position + velocity
+        position = np.clip(position, self.min_position, self.max_position)
+        velocity[(position == self.min_position) & (velocity < 0)] = 0
+
+        dones = position >= self.goal_position
+        rewards = -np.ones(self.num_envs)
+
+        self.state = np.stack([position, velocity], axis=1)
+        return self.state.copy(), rewards, dones, {}
+
+    def _reset(self, idxs):
+        self.state[idxs, 0] = self.np_random.uniform(low=-0.6, high=-0.4, size=len(idxs))
+        self.state[idxs, 1] = 0
+        return self.state[idxs]
+
+class PendulumVectorEnv(VectorEnv):
+    metadata = {
+        'render.modes': [],
+        'video.frames_per_second' : 30
+    }
+
+    def __init__(self, num_envs, max_episode_steps=None):
+        super(PendulumVectorEnv, self).__init__(num_envs, max_episode_steps=max_episode_steps)
+        self.max_speed=8
+        self.max_torque=2.
+        self.dt=.05
+
+        high = np.array([1., 1., self.max_speed])
+        self.action_space = spaces.Box(low=-self.max_torque, high=self.max_torque, shape=(1,))
+        self.observation_space = spaces.Box(low=-high, high=high)
+
+        self._seed()
+        self.state = np.zeros((num_envs, 2))
+
+    def _seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def _step(self, actions):
+        th, thdot = self.state.T # th := theta
+
+        g = 10.
+        m = 1.
+        l = 1.
+        dt = self.dt
+
+        u = np.clip(np.reshape(actions, (self.num_envs,)), -self.max_torque, self.max_torque)
+        costs = angle_normalize(th)**2 + .1*thdot**2 + .001*(u**2)
+
+        newthdot = thdot + (-3*g/(2*l) * np.sin(th + np.pi) + 3./(m*l**2)*u) * dt
+        newth = th + newthdot*dt
+        newthdot = np.clip(newthdot, -self.max_speed, self.max_speed)
+
+        self.state = np.stack([newth, newthdot], axis=1)
+        return self._get_obs(), -costs, np.zeros(self.num_envs, dtype=bool), {}
+
+    def _reset(self, idxs):
+        high = np.array([np.pi, 1])
+        self.state[idxs] = self.np_random.uniform(low=-high, high=high, size=(len(idxs), 2))
+        return self._get_obs(idxs)
+
+    def _get_obs(self, idxs=slice(None)):
+        theta, thetadot = self.state[idxs].T
+        return np.stack([np.cos(theta), np.sin(theta), thetadot], axis=1)
+
+class AcrobotVectorEnv(VectorEnv):
+    """Batched AcrobotEnv, see gym.envs.classic_control.acrobot for the
+    description of the system. All sub-environments are integrated
+    together by a single rk4 call on the (num_envs, 5) augmented state.
+    """
+    metadata = {
+        'render.modes': [],
+        'video.frames_per_second' : 15
+    }
+
+    dt = .2
+
+    LINK_LENGTH_1 = 1.  # [m]
+    LINK_LENGTH_2 = 1.  # [m]
+    LINK_MASS_1 = 1.  #: [kg] mass of link 1
+    LINK_MASS_2 = 1.  #: [kg] mass of link 2
+    LINK_COM_POS_1 = 0.5  #: [m] position of the center of mass of link 1
+    LINK_COM_POS_2 = 0.5  #: [m] position of the center of mass of link 2
+    LINK_MOI = 1.  #: moments of inertia for both links
+
+    MAX_VEL_1 = 4 * np.pi
+    MAX_VEL_2 = 9 * np.pi
+
+    AVAIL_TORQUE = np.array([-1., 0., +1])
+
+    torque_noise_max = 0.
+
+    #: use dynamics equations from the nips paper or the book
+    book_or_nips = "book"
+
+    def __init__(self, num_envs, max_episode_steps=None):
+        super(AcrobotVectorEnv, self).__init__(num_envs, max_episode_steps=max_episode_steps)
+        high = np.array([1.0, 1.0, 1.0, 1.0, self.MAX_VEL_1, self.MAX_VEL_2])
+        low = -high
+        self.observation_space = spaces.Box(low, high)
+        self.action_space = spaces.Discrete(3)
+        self._seed()
+        self.state = np.zeros((num_envs, 4))
+
+    def _seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def _reset(self, idxs):
+        self.state[idxs] = self.np_random.uniform(low=-0.1, high=0.1, size=(len(idxs), 4))
+        return self._get_ob(idxs)
+
+    def _step(self, actions):
+        actions = np.asarray(actions)
+        assert actions.shape == (self.num_envs,) and np.all((actions >= 0) & (actions < 3)), "%r invalid" % (actions,)
+        torque = self.AVAIL_TORQUE[actions]
+
+        # Add noise to the force action
+        if self.torque_noise_max > 0:
+            torque = torque + self.np_random.uniform(-self.torque_noise_max, self.torque_noise_max, size=self.num_envs)
+
+        s_augmented = np.concatenate([self.state, torque[:, None]], axis=1)
+        ns = rk4(self._dsdt, s_augmented, [0, self.dt])
+        # only care about final timestep of integration returned by integrator
+        ns = ns[-1, :, :4]  # omit action
+
+        ns[:, 0] = wrap(ns[:, 0], -np.pi, np.pi)
+        ns[:, 1] = wrap(ns[:, 1], -np.pi, np.pi)
+        ns[:, 2] = np.clip(ns[:, 2], -self.MAX_VEL_1, self.MAX_VEL_1)
+        ns[:, 3] = np.clip(ns[:, 3], -self.MAX_VEL_2, self.MAX_VEL_2)
+        self.state = ns
+        terminal = self._terminal()
+        rewards = np.where(terminal, 0., -1.)
+        return self._get_ob(), rewards, terminal, {}
+
+    def _get_ob(self, idxs=slice(None)):
+        s = self.state[idxs]
+        return np.stack([np.cos(s[:, 0]), np.sin(s[:, 0]), np.cos(s[:, 1]), np.sin(s[:, 1]), s[:, 2], s[:, 3]], axis=1)
+
+    def _terminal(self):
+        s = self.state
+        return -np.cos(s[:, 0]) - np.cos(s[:, 1] + s[:, 0]) > 1.
+
+    def _dsdt(self, s_augmented, t):
+        m1 = self.LINK_MASS_1
+        m2 = self.LINK_MASS_2
+        l1 = self.LINK_LENGTH_1
+        lc1 = self.LINK_COM_POS_1
+        lc2 = self.LINK_COM_POS_2
+        I1 = self.LINK_MOI
+        I2 = self.LINK_MOI
+        g = 9.8
+        theta1, theta2, dtheta1, dtheta2, a = s_augmented.T
+        d1 = m1 * lc1 ** 2 + m2 * \
+            (l1 ** 2 + lc2 ** 2 + 2 * l1 * lc2 * np.cos(theta2)) + I1 + I2
+        d2 = m2 * (lc2 ** 2 + l1 * lc2 * np.cos(theta2)) + I2
+        phi2 = m2 * lc2 * g * np.cos(theta1 + theta2 - np.pi / 2.)
+        phi1 = - m2 * l1 * lc2 * dtheta2 ** 2 * np.sin(theta2) \
+               - 2 * m2 * l1 * lc2 * dtheta2 * dtheta1 * np.sin(theta2)  \
+            + (m1 * lc1 + m2 * l1) * g * np.cos(theta1 - np.pi / 2) + phi2
+        if self.book_or_nips == "nips":
+            # the following line is consistent with the description in the
+            # paper
+            ddtheta2 = (a + d2 / d1 * phi1 - phi2) / \
+                (m2 * lc2 ** 2 + I2 - d2 ** 2 / d1)
+        else:
+            # the following line is consistent with the java implementation and the
+            # book
+            ddtheta2 = (a + d2 / d1 * phi1 - m2 * l1 * lc2 * dtheta1 ** 2 * np.sin(theta2) - phi2) \
+                / (m2 * lc2 ** 2 + I2 - d2 ** 2 / d1)
+        ddtheta1 = -(d2 * ddtheta2 + phi1) / d1
+        return np.stack([dtheta1, dtheta2, ddtheta1, ddtheta2, np.zeros_like(a)], axis=1)
+
+def wrap(x, m, M):
+    """
+    Elementwise version of gym.envs.classic_control.acrobot.wrap: wraps
+    every entry of ``x`` around the coordinate system defined by m, M.
+    """
+    diff = M - m
+    x = x - diff * np.ceil(np.maximum(x - M, 0) / diff)
+    x = x + diff * np.ceil(np.maximum(m - x, 0) / diff)
+    return x
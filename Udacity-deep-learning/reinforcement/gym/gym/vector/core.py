@@ -0,0 +1,150 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+class VectorEnv(object):
+    """A batch of num_envs copies of the same environment, stepped
+    together.
+
+    The main API methods that users of this class need to know are:
+
+        step
+        reset
+        seed
+        close
+
+    step takes one action per sub-environment and returns batched
+    (observations, rewards, dones, info): observations has shape
+    (num_envs,) + observation_space.shape, rewards and dones have shape
+    (num_envs,). Sub-environments that are done are reset automatically,
+    so the observations returned for them are the first observations of
+    their next episode. info is a dict; when any sub-environment was
+    reset, info['terminal_observation'] holds the observations every
+    sub-environment reached before the reset.
+
+    When implementing a vector environment, override the following
+    methods in your subclass:
+
+        _step
+        _reset
+        _close
+        _seed
+
+    _reset(idxs) resets only the sub-environments in idxs and returns
+    their observations, which is what automatic resets use.
+
+    observation_space and action_space are the spaces of a single
+    sub-environment.
+    """
+
+    metadata = {'render.modes': []}
+    reward_range = (-np.inf, np.inf)
+
+    observation_space = None
+    action_space = None
+
+    def __init__(self, num_envs, max_episode_steps=None):
+        """
+        Args:
+            num_envs (int): number of sub-environments
+            max_episode_steps (Optional[int]): episodes are cut off (done
+                is set) after this many steps, like the TimeLimit wrapper
+        """
+        self.num_envs = num_envs
+        self.max_episode_steps = max_episode_steps
+        self._elapsed_steps = np.zeros(num_envs, dtype=np.int64)
+
+    # Override in ALL subclasses
+    def _step(self, actions): raise NotImplementedError
+    def _reset(self, idxs): raise NotImplementedError
+    def _seed(self, seed=None): return []
+
+    # Override in SOME subclasses
+    def _close(self):
+        pass
+
+    def step(self, actions):
+        """Run one timestep of every sub-environment's dynamics.
+
+        Args:
+            actions (object): a batch of num_envs actions
+
+        Returns:
+            observations (np.ndarray): (num_envs,) + observation shape
+            rewards (np.ndarray): (num_envs,)
+            dones (np.ndarray): (num_envs,) bool
+            info (dict): contains auxiliary diagnostic information
+        """
+        observations, rewards, dones, info = self._step(actions)
+        self._elapsed_steps += 1
+        if self.max_episode_steps is not None:
+            dones = dones | (self._elapsed_steps >= self.max_episode_steps)
+
+        if dones.any():
+            idxs = np.flatnonzero(dones)
+            info['terminal_observation'] = observations.copy()
+            observations[idxs] = self._reset(idxs)
+            self._elapsed_steps[idxs] = 0
+
+        return observations, rewards, dones, info
+
+    def reset(self):
+        """Resets every sub-environment.
+
+        Returns:
+            observations (np.ndarray): (num_envs,) + observation shape
+        """
+        self._elapsed_steps[:] = 0
+        return self._reset(np.arange(self.num_envs))
+
+    def seed(self, seed=None):
+        """Sets the seed of the random number generator(s) of the
+        sub-environments.
+
+        Returns:
+            list<bigint>: the seeds used
+        """
+        return self._seed(seed)
+
+    def close(self):
+        self._close()
+
+    def __str__(self):
+        return '<{}({})>'.format(type(self).__name__, self.num_envs)
+
+class SyncVectorEnv(VectorEnv):
+    """Steps num_envs ordinary gym.Env instances one after the other, in
+    the current process. This is the fallback for environments that have
+    no batched implementation.
+
+    info['infos'] holds the info dicts of the sub-environments.
+    """
+    def __init__(self, env_fns, max_episode_steps=None):
+        """
+        Args:
+            env_fns (list): functions that each create one sub-environment
+        """
+        super(SyncVectorEnv, self).__init__(len(env_fns), max_episode_steps=max_episode_steps)
+        self.envs = [env_fn() for env_fn in env_fns]
+        self.observation_space = self.envs[0].observation_space
+        self.action_space = self.envs[0].action_space
+        self.reward_range = self.envs[0].reward_range
+
+    def _step(self, actions):
+        results = [env.step(action) for env, action in zip(self.envs, actions)]
+        observations, rewards, dones, infos = zip(*results)
+        return np.stack(observations), np.array(rewards, dtype=np.float64), np.array(dones, dtype=bool), {'infos': infos}
+
+    def _reset(self, idxs):
+        return np.stack([self.envs[i].reset() for i in idxs])
+
+    def _seed(self, seed=None):
+        # sub-environment i is seeded with seed + i
+        if seed is None:
+            return [env.seed() for env in self.envs]
+        return [env.seed(seed + i) for i, env in enumerate(self.envs)]
+
+    def _close(self):
+        for env in self.envs:
+            env.close()
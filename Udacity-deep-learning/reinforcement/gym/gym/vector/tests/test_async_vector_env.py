@@ -0,0 +1,88 @@
+import multiprocessing
+import time
+from functools import partial
+
+import numpy as np
+import pytest
+
+from gym import Wrapper, envs, error, vector
+from gym.vector import AsyncVectorEnv, SyncVectorEnv
+
+class _SlowStep(Wrapper):
+    def __init__(self, env, delay):
+        super(_SlowStep, self).__init__(env)
+        self.delay = delay
+
+    def step(self, action):
+        time.sleep(self.delay)
+        return self.env.step(action)
+
+def _make_slow_env(env_id, delay):
+    return _SlowStep(envs.make(env_id), delay)
+
+def _make_envs(env_id, num_envs):
+    env_fns = [partial(envs.make, env_id)] * num_envs
+    return AsyncVectorEnv(env_fns), SyncVectorEnv(env_fns)
+
+@pytest.mark.parametrize("env_id", ['CartPole-v0', 'FrozenLake-v0'])
+def test_async_matches_sync(env_id):
+    async_env, sync_env = _make_envs(env_id, 3)
+    try:
+        async_env.seed(0)
+        sync_env.seed(0)
+        assert np.array_equal(async_env.reset(), sync_env.reset())
+        for t in range(100):
+            actions = [t % async_env.action_space.n] * 3
+            async_results, sync_results = async_env.step(actions), sync_env.step(actions)
+            for async_value, sync_value in zip(async_results[:3], sync_results[:3]):
+                assert np.array_equal(async_value, sync_value)
+            assert ('terminal_observation' in async_results[3]) == ('terminal_observation' in sync_results[3])
+    finally:
+        async_env.close()
+        sync_env.close()
+
+def test_step_async_wait():
+    venv = vector.make('FrozenLake-v0', 2, asynchronous=True)
+    try:
+        venv.reset()
+        with pytest.raises(error.NoAsyncCallError):
+            venv.step_wait()
+        venv.step_async([0, 1])
+        with pytest.raises(error.AlreadyPendingCallError):
+            venv.step_async([0, 1])
+        observations, rewards, dones, info = venv.step_wait(timeout=10)
+        assert observations.shape == rewards.shape == dones.shape == (2,)
+        assert len(info['infos']) == 2
+    finally:
+        venv.close()
+
+def test_worker_error():
+    async_env = AsyncVectorEnv([partial(envs.make, 'CartPole-v0')])
+    try:
+        async_env.reset()
+        with pytest.raises(error.VectorEnvWorkerError):
+            async_env.step(['not an action'])
+    finally:
+        async_env.close()
+
+def test_worker_error_drains_other_workers():
+    async_env = AsyncVectorEnv([partial(envs.make, 'CartPole-v0')] * 3)
+    try:
+        async_env.reset()
+        with pytest.raises(error.VectorEnvWorkerError):
+            async_env.step([0, 'not an action', 0])
+        assert not any(remote.poll(1) for i, remote in enumerate(async_env.remotes) if i != 1)
+    finally:
+        async_env.close()
+
+def test_step_wait_timeout_covers_all_workers():
+    # each worker answers within the timeout of the previous one, but not
+    # all of them within the timeout of the call
+    async_env = AsyncVectorEnv([partial(_make_slow_env, 'CartPole-v0', 0.3 * (i + 1)) for i in range(3)])
+    try:
+        async_env.reset()
+        async_env.step_async([0] * 3)
+        with pytest.raises(multiprocessing.TimeoutError):
+            async_env.step_wait(timeout=0.5)
+    finally:
+        async_env.close()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import gym
+from gym import envs, vector
+
+batched_ids = ['CartPole-v0', 'MountainCar-v0', 'Pendulum-v0', 'Acrobot-v1']
+
+def _sample_actions(action_space, num_envs, rng):
+    if isinstance(action_space, gym.spaces.Discrete):
+        return rng.randint(action_space.n, size=num_envs)
+    return rng.uniform(action_space.low, action_space.high, size=(num_envs,) + action_space.shape)
+
+@pytest.mark.parametrize("env_id", batched_ids)
+def test_batched_dynamics_match_single_env(env_id):
+    num_envs = 4
+    venv = vector.make(env_id, num_envs)
+    venv.seed(0)
+    venv.reset()
+    singles = [envs.spec(env_id).make() for _ in range(num_envs)]
+    for env, state in zip(singles, venv.state):
+        env.reset()
+        env.state = state.copy()
+
+    rng = np.random.RandomState(0)
+    for _ in range(100):
+        actions = _sample_actions(venv.action_space, num_envs, rng)
+        observations, rewards, dones, info = venv.step(actions)
+        terminal = info.get('terminal_observation', observations)
+        for i, env in enumerate(singles):
+            ob, reward, done, _ = env.step(actions[i])
+            assert np.allclose(ob, terminal[i])
+            assert np.isclose(reward, rewards[i])
+            if done or dones[i]:
+                # the vector env has auto-reset, continue from its new state
+                env.reset()
+                env.state = venv.state[i].copy()
+            else:
+                assert not dones[i]
+
+def test_autoreset():
+    venv = vector.make('CartPole-v0', 3)
+    venv.seed(0)
+    venv.reset()
+    for _ in range(200):
+        observations, rewards, dones, info = venv.step(np.ones(3, dtype=int))
+        if dones.any():
+            break
+    assert dones.any()
+    # the pole fell over past the threshold and the new episode starts upright
+    assert np.all(np.abs(info['terminal_observation'][dones, 2]) > venv.theta_threshold_radians)
+    assert np.all(np.abs(observations[dones]) <= 0.05)
+
+def test_time_limit():
+    venv = vector.make('Pendulum-v0', 3)
+    assert venv.max_episode_steps == 200
+    venv.seed(0)
+    venv.reset()
+    for t in range(200):
+        observations, rewards, dones, info = venv.step(np.zeros((3, 1)))
+        assert dones.all() == (t == 199)
+    assert 'terminal_observation' in info
+    observations, rewards, dones, info = venv.step(np.zeros((3, 1)))
+    assert not dones.any()
+
+def test_seeding():
+    first, second = vector.make('Acrobot-v1', 5), vector.make('Acrobot-v1', 5)
+    first.seed(1)
+    second.seed(1)
+    assert np.array_equal(first.reset(), second.reset())
+    actions = np.arange(5) % 3
+    assert np.array_equal(first.step(actions)[0], second.step(actions)[0])
+
+def test_sync_vector_env():
+    venv = vector.make('FrozenLake-v0', 3)
+    assert isinstance(venv, vector.SyncVectorEnv)
+    venv.seed(0)
+    observations = venv.reset()
+    assert observations.shape == (3,)
+    observations, rewards, dones, info = venv.step(np.zeros(3, dtype=int))
+    assert observations.shape == rewards.shape == dones.shape == (3,)
+    assert len(info['infos']) == 3
+    venv.close()
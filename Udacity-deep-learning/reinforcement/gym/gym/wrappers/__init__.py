@@ -1,4 +1,20 @@
+import sys
+
 from gym import error
 from gym.wrappers.frame_skipping import SkipWrapper
-from gym.wrappers.monitoring import Monitor
 from gym.wrappers.time_limit import TimeLimit
+
+# Monitor brings in the stats and video recorders, so it is imported on
+# first use. gym.monitoring and gym.wrappers.monitoring import each other,
+# and only importing gym.monitoring first resolves the cycle.
+def __getattr__(name):
+    if name == 'Monitor':
+        import gym.monitoring
+        from gym.wrappers.monitoring import Monitor
+        return Monitor
+    raise AttributeError("module 'gym.wrappers' has no attribute '{}'".format(name))
+
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is not supported, import it now
+    import gym.monitoring
+    from gym.wrappers.monitoring import Monitor
@@ -13,7 +13,8 @@ MANIFEST_PREFIX = FILE_PREFIX + '.manifest'
 
 class Monitor(Wrapper):
     def __init__(self, env, directory, video_callable=None, force=False, resume=False,
-                 write_upon_reset=False, uid=None, mode=None):
+                 write_upon_reset=False, uid=None, mode=None, stats_format='json',
+                 video_queue_size=0, video_backpressure='block'):
         super(Monitor, self).__init__(env)
 
         self.videos = []
@@ -26,7 +27,8 @@ class Monitor(Wrapper):
         self.env_semantics_autoreset = env.metadata.get('semantics.autoreset')
 
         self._start(directory, video_callable, force, resume,
-                            write_upon_reset, uid, mode)
+                            write_upon_reset, uid, mode, stats_format,
+                            video_queue_size, video_backpressure)
 
     def _step(self, action):
         self._before_step(action)
@@ -42,6 +44,22 @@ class Monitor(Wrapper):
 
         return observation
 
+    # Restoring a snapshot rewinds the counters of the current episode.
+    # Episodes that ended since are still recorded, and videos can't be
+    # rewound.
+    def _clone_state(self):
+        state = super(Monitor, self)._clone_state()
+        if self.enabled:
+            recorder = self.stats_recorder
+            state['episode'] = (recorder.steps, recorder.rewards, recorder.done)
+        return state
+
+    def _restore_state(self, state):
+        super(Monitor, self)._restore_state(state)
+        if self.enabled and 'episode' in state:
+            recorder = self.stats_recorder
+            recorder.steps, recorder.rewards, recorder.done = state['episode']
+
     def _close(self):
         super(Monitor, self)._close()
 
@@ -55,7 +73,8 @@ class Monitor(Wrapper):
 
 
     def _start(self, directory, video_callable=None, force=False, resume=False,
-              write_upon_reset=False, uid=None, mode=None):
+              write_upon_reset=False, uid=None, mode=None, stats_format='json',
+              video_queue_size=0, video_backpressure='block'):
         """Start monitoring.
 
         Args:
@@ -66,6 +85,9 @@ class Monitor(Wrapper):
             write_upon_reset (bool): Write the manifest file on each reset. (This is currently a JSON file, so writing it is somewhat expensive.)
             uid (Optional[str]): A unique id used as part of the suffix for the file. By default, uses os.getpid().
             mode (['evaluation', 'training']): Whether this is an evaluation or training episode.
+            stats_format (['json', 'binary']): 'json' rewrites all episode stats as one JSON file on every flush. 'binary' appends fixed-width episode records to a binary file, which keeps flushes cheap on runs with millions of episodes.
+            video_queue_size (int): If nonzero, video frames are buffered in a ring of this many frames and encoded by a background thread instead of inside step.
+            video_backpressure (['block', 'drop']): What to do with a new frame while the video queue is full: wait for the encoder, or drop the frame.
         """
         if self.env.spec is None:
             logger.warning("Trying to monitor an environment which has no 'spec' set. This usually means you did not create it via 'gym.make', and is recommended only for advanced users.")
@@ -88,6 +110,18 @@ class Monitor(Wrapper):
             raise error.Error('You must provide a function, None, or False for video_callable, not {}: {}'.format(type(video_callable), video_callable))
         self.video_callable = video_callable
 
+        if stats_format == 'json':
+            recorder_cls = stats_recorder.StatsRecorder
+        elif stats_format == 'binary':
+            recorder_cls = stats_recorder.StreamingStatsRecorder
+        else:
+            raise error.Error('Invalid stats_format {}: must be "json" or "binary"'.format(stats_format))
+
+        if video_backpressure not in ('block', 'drop'):
+            raise error.Error('Invalid video_backpressure {}: must be "block" or "drop"'.format(video_backpressure))
+        self.video_queue_size = video_queue_size
+        self.video_drop_frames = video_backpressure == 'drop'
+
         # Check on whether we need to clear anything
         if force:
             clear_monitor_files(directory)
@@ -107,7 +141,7 @@ class Monitor(Wrapper):
         self.file_prefix = FILE_PREFIX
         self.file_infix = '{}.{}'.format(self._monitor_id, uid if uid else os.getpid())
 
-        self.stats_recorder = stats_recorder.StatsRecorder(directory, '{}.episode_batch.{}'.format(self.file_prefix, self.file_infix), autoreset=self.env_semantics_autoreset, env_id=env_id)
+        self.stats_recorder = recorder_cls(directory, '{}.episode_batch.{}'.format(self.file_prefix, self.file_infix), autoreset=self.env_semantics_autoreset, env_id=env_id)
 
         if not os.path.exists(directory): os.mkdir(directory)
         self.write_upon_reset = write_upon_reset
@@ -215,6 +249,8 @@ class Monitor(Wrapper):
             base_path=os.path.join(self.directory, '{}.video.{}.video{:06}'.format(self.file_prefix, self.file_infix, self.episode_id)),
             metadata={'episode_id': self.episode_id},
             enabled=self._video_enabled(),
+            queue_size=self.video_queue_size,
+            drop_frames=self.video_drop_frames,
         )
         self.video_recorder.capture_frame()
 
@@ -341,23 +377,27 @@ def merge_stats_files(stats_files):
     data_sources = []
 
     for i, path in enumerate(stats_files):
-        with open(path) as f:
-            content = json.load(f)
-            if len(content['timestamps'])==0: continue # so empty file doesn't mess up results, due to null initial_reset_timestamp
-            data_sources += [i] * len(content['timestamps'])
-            timestamps += content['timestamps']
-            episode_lengths += content['episode_lengths']
-            episode_rewards += content['episode_rewards']
-            # Recent addition
-            episode_types += content.get('episode_types', [])
-            # Keep track of where each episode came from.
-            initial_reset_timestamps.append(content['initial_reset_timestamp'])
-
-    idxs = np.argsort(timestamps)
-    timestamps = np.array(timestamps)[idxs].tolist()
-    episode_lengths = np.array(episode_lengths)[idxs].tolist()
-    episode_rewards = np.array(episode_rewards)[idxs].tolist()
-    data_sources = np.array(data_sources)[idxs].tolist()
+        content = stats_recorder.load_stats(path)
+        if len(content['timestamps'])==0: continue # so empty file doesn't mess up results, due to null initial_reset_timestamp
+        data_sources.append(np.full(len(content['timestamps']), i, dtype=np.int64))
+        timestamps.append(np.asarray(content['timestamps'], dtype=np.float64))
+        episode_lengths.append(np.asarray(content['episode_lengths']))
+        episode_rewards.append(np.asarray(content['episode_rewards'], dtype=np.float64))
+        # Recent addition
+        episode_types += list(content.get('episode_types', []))
+        # Keep track of where each episode came from.
+        initial_reset_timestamps.append(content['initial_reset_timestamp'])
+
+    timestamps = np.concatenate(timestamps) if timestamps else np.zeros(0)
+    episode_lengths = np.concatenate(episode_lengths) if episode_lengths else np.zeros(0, dtype=np.int64)
+    episode_rewards = np.concatenate(episode_rewards) if episode_rewards else np.zeros(0)
+    data_sources = np.concatenate(data_sources) if data_sources else np.zeros(0, dtype=np.int64)
+
+    idxs = np.argsort(timestamps, kind='mergesort')
+    timestamps = timestamps[idxs].tolist()
+    episode_lengths = episode_lengths[idxs].tolist()
+    episode_rewards = episode_rewards[idxs].tolist()
+    data_sources = data_sources[idxs].tolist()
 
     if episode_types:
         episode_types = np.array(episode_types)[idxs].tolist()
@@ -7,6 +7,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 class TimeLimit(Wrapper):
+    _state_attributes = ('_elapsed_steps', '_episode_started_at')
+
     def __init__(self, env, max_episode_seconds=None, max_episode_steps=None):
         super(TimeLimit, self).__init__(env)
         self._max_episode_seconds = max_episode_seconds
@@ -0,0 +1,84 @@
+"""
+Measures the latency of `python -c "import gym"` in fresh interpreters.
+
+    python scripts/benchmark_import.py -n 20
+    python scripts/benchmark_import.py -n 20 --output import_times.jsonl --max-ms 400
+
+Every run starts a new interpreter, so the numbers include interpreter
+startup. That is printed separately (`python -c "pass"`) to show how much
+gym itself adds. With --output, one JSON line per invocation is appended
+to the given file so the latency can be tracked across commits, and with
+--max-ms the script exits with status 1 when the median is above the
+budget. --profile prints the slowest imports reported by -X importtime.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+GYM_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+def time_command(code, n):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([GYM_ROOT, os.environ.get('PYTHONPATH', '')]))
+    times = []
+    for _ in range(n):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', code], env=env)
+        times.append(1000. * (time.time() - start))
+    return sorted(times)
+
+def slowest_imports(top):
+    env = dict(os.environ, PYTHONPATH=GYM_ROOT)
+    output = subprocess.check_output([sys.executable, '-X', 'importtime', '-c', 'import gym'],
+                                     env=env, stderr=subprocess.STDOUT).decode()
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = [field.strip() for field in line.split(':', 1)[1].split('|')]
+        rows.append((int(cumulative_us), int(self_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    parser.add_argument('--output', help='append the result as a JSON line to this file')
+    parser.add_argument('--max-ms', type=float, help='fail if the median import time is above this')
+    parser.add_argument('--profile', type=int, default=0, metavar='TOP',
+                        help='print the TOP slowest imports (needs python 3.7+)')
+    args = parser.parse_args()
+
+    baseline = time_command('pass', args.runs)
+    times = time_command('import gym', args.runs)
+    median, baseline_median = times[len(times) // 2], baseline[len(baseline) // 2]
+    print('interpreter startup: median {:.1f} ms'.format(baseline_median))
+    print('import gym:          median {:.1f} ms, min {:.1f} ms, max {:.1f} ms ({} runs)'.format(
+        median, times[0], times[-1], args.runs))
+    print('gym adds:            {:.1f} ms'.format(median - baseline_median))
+
+    if args.profile:
+        print('\n{:>12} {:>12}  module'.format('cumul. (us)', 'self (us)'))
+        for cumulative_us, self_us, name in slowest_imports(args.profile):
+            print('{:>12} {:>12}  {}'.format(cumulative_us, self_us, name))
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps({
+                'time': time.time(),
+                'python': sys.version.split()[0],
+                'runs': args.runs,
+                'median_ms': median,
+                'min_ms': times[0],
+                'startup_median_ms': baseline_median,
+            }) + '\n')
+
+    if args.max_ms is not None and median > args.max_ms:
+        print('median import time {:.1f} ms is above the budget of {:.1f} ms'.format(median, args.max_ms))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
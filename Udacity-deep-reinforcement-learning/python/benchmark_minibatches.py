@@ -0,0 +1,109 @@
+"""Micro-benchmark for assembling PPO minibatch feeds from large visual-observation buffers.
+
+Compares the original feed construction of PPOTrainer.update_model, which shuffles lists of
+per-step arrays and calls np.array on every field of every minibatch, with MiniBatches, and checks
+that both produce the same minibatches.
+
+    python benchmark_minibatches.py --buffer_size 10240 --batch_size 1024 --num_epoch 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from unitytrainers.buffer import Buffer, MiniBatches
+
+
+def fill_buffer(buffer, buffer_size, obs_shape, action_size):
+    frame = np.zeros(obs_shape, dtype=np.float32)
+    for t in range(buffer_size):
+        frame.fill(t % 256 / 255.)
+        buffer['visual_obs0'].append(frame)
+        buffer['masks'].append(1.0)
+        buffer['discounted_returns'].append(float(t))
+        buffer['value_estimates'].append(float(t))
+        buffer['advantages'].append(float(t))
+        buffer['action_probs'].append(np.full(action_size, t, dtype=np.float32))
+        buffer['actions'].append(t % action_size)
+
+
+def list_feeds(fields, batch_size, num_epoch):
+    """The original path: a list shuffle per epoch, then np.array and reshape per field and minibatch."""
+    for _ in range(num_epoch):
+        s = np.arange(len(fields['masks']))
+        np.random.shuffle(s)
+        for key in fields:
+            fields[key][:] = [fields[key][i] for i in s]
+        for l in range(len(fields['masks']) // batch_size):
+            start, end = l * batch_size, (l + 1) * batch_size
+            yield {'masks': np.array(fields['masks'][start:end]).flatten(),
+                   'discounted_returns': np.array(fields['discounted_returns'][start:end]).flatten(),
+                   'value_estimates': np.array(fields['value_estimates'][start:end]).flatten(),
+                   'advantages': np.array(fields['advantages'][start:end]).reshape([-1, 1]),
+                   'action_probs': np.array(fields['action_probs'][start:end]),
+                   'actions': np.array(fields['actions'][start:end]).flatten(),
+                   'visual_obs0': np.array(fields['visual_obs0'][start:end])}
+
+
+def mini_batch_feeds(buffer, batch_size, num_epoch):
+    mini_batches = MiniBatches(buffer, list(buffer.keys()), batch_size)
+    for _ in range(num_epoch):
+        mini_batches.shuffle()
+        for l in range(len(mini_batches)):
+            mini_batch = mini_batches[l]
+            yield {'masks': mini_batch['masks'].reshape([-1]),
+                   'discounted_returns': mini_batch['discounted_returns'].reshape([-1]),
+                   'value_estimates': mini_batch['value_estimates'].reshape([-1]),
+                   'advantages': mini_batch['advantages'].reshape([-1, 1]),
+                   'action_probs': mini_batch['action_probs'],
+                   'actions': mini_batch['actions'].reshape([-1]),
+                   'visual_obs0': mini_batch['visual_obs0']}
+
+
+def check_equivalence(buffer, batch_size, num_epoch):
+    fields = dict((key, list(np.array(buffer[key]))) for key in buffer.keys())
+    np.random.seed(0)
+    expected = [dict((k, v.copy()) for k, v in feed.items()) for feed in list_feeds(fields, batch_size, num_epoch)]
+    np.random.seed(0)
+    for feed, expected_feed in zip(mini_batch_feeds(buffer, batch_size, num_epoch), expected):
+        for key in expected_feed:
+            assert feed[key].shape == expected_feed[key].shape
+            assert np.array_equal(feed[key], expected_feed[key])
+
+
+def time_feeds(feeds):
+    start = time.time()
+    n = 0
+    for _ in feeds:
+        n += 1
+    return time.time() - start, n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buffer_size', type=int, default=10240)
+    parser.add_argument('--batch_size', type=int, default=1024)
+    parser.add_argument('--num_epoch', type=int, default=3)
+    parser.add_argument('--resolution', type=int, default=84)
+    parser.add_argument('--channels', type=int, default=3)
+    parser.add_argument('--action_size', type=int, default=4)
+    args = parser.parse_args()
+
+    obs_shape = (args.resolution, args.resolution, args.channels)
+    buffer = Buffer().update_buffer
+    print('filling buffer with %d %s observations...' % (args.buffer_size, obs_shape))
+    fill_buffer(buffer, args.buffer_size, obs_shape, args.action_size)
+
+    check_equivalence(buffer, args.batch_size, 1)
+    print('MiniBatches matches the list path')
+
+    fields = dict((key, list(np.array(buffer[key]))) for key in buffer.keys())
+    list_time, n = time_feeds(list_feeds(fields, args.batch_size, args.num_epoch))
+    mini_batch_time, _ = time_feeds(mini_batch_feeds(buffer, args.batch_size, args.num_epoch))
+    print('list feeds:        %.3f s per update (%.1f ms/minibatch)' % (list_time, list_time / n * 1e3))
+    print('MiniBatches feeds: %.3f s per update (%.1f ms/minibatch)' % (mini_batch_time, mini_batch_time / n * 1e3))
+    print('speedup:           %.1fx' % (list_time / mini_batch_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -47,6 +47,7 @@ if __name__ == '__main__':
       --worker-id=<n>            Number to add to communication port (5005). Used for multi-environment [default: 0].
       --docker-target-name=<dt>  Docker Volume to store curriculum, executable and model files [default: Empty].
       --no-graphics              Whether to run the Unity simulator in no-graphics mode [default: False].
+      --num-envs=<n>             Number of environments to run in parallel, with worker ids starting at --worker-id [default: 1].
     '''
 
     options = docopt(_USAGE)
@@ -72,6 +73,7 @@ if __name__ == '__main__':
     lesson = int(options['--lesson'])
     fast_simulation = not bool(options['--slow'])
     no_graphics = options['--no-graphics']
+    num_envs = int(options['--num-envs'])
 
     # Constants
     # Assumption that this yaml is present in same dir as this file
@@ -80,5 +82,5 @@ if __name__ == '__main__':
 
     tc = TrainerController(env_path, run_id, save_freq, curriculum_file, fast_simulation, load_model, train_model,
                            worker_id, keep_checkpoints, lesson, seed, docker_target_name, TRAINER_CONFIG_PATH,
-                           no_graphics)
+                           no_graphics, num_envs)
     tc.start_learning()
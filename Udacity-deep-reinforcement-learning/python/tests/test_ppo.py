@@ -5,7 +5,7 @@ import numpy as np
 import tensorflow as tf
 
 from unitytrainers.ppo.models import PPOModel
-from unitytrainers.ppo.trainer import discount_rewards
+from unitytrainers.ppo.trainer import discount_rewards, get_gae
 from unityagents import UnityEnvironment
 from .mock_communicator import MockCommunicator
 
@@ -281,5 +281,18 @@ def test_rl_functions():
     np.testing.assert_array_almost_equal(returns, np.array([0.729, 0.81, 0.9, 1.0]))
 
 
+def test_rl_functions_batched():
+    rewards = np.array([0.0, 1.0, 1.0, 0.0, 0.0, 1.0])
+    value_estimates = np.array([0.5, 0.2, 0.1, 0.3, 0.4, 0.6])
+    lengths = [2, 0, 4]
+    value_next = np.array([1.0, 5.0, 0.0])
+    returns = discount_rewards(rewards, 0.9, value_next, lengths=lengths)
+    np.testing.assert_array_almost_equal(returns[:2], discount_rewards(rewards[:2], 0.9, 1.0))
+    np.testing.assert_array_almost_equal(returns[2:], discount_rewards(rewards[2:], 0.9, 0.0))
+    advantages = get_gae(rewards, value_estimates, value_next, 0.9, 0.95, lengths=lengths)
+    np.testing.assert_array_almost_equal(advantages[:2], get_gae(rewards[:2], value_estimates[:2], 1.0, 0.9, 0.95))
+    np.testing.assert_array_almost_equal(advantages[2:], get_gae(rewards[2:], value_estimates[2:], 0.0, 0.9, 0.95))
+
+
 if __name__ == '__main__':
     pytest.main()
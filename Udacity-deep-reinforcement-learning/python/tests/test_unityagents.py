@@ -6,7 +6,7 @@ import struct
 import numpy as np
 
 from unityagents import UnityEnvironment, UnityEnvironmentException, UnityActionException, \
-    BrainInfo, Curriculum
+    BrainInfo, Curriculum, SubprocessUnityEnvironment
 from .mock_communicator import MockCommunicator
 
 
@@ -118,6 +118,32 @@ def test_close(mock_communicator, mock_launcher):
     assert comm.has_been_closed
 
 
+@mock.patch('unityagents.UnityEnvironment.executable_launcher')
+@mock.patch('unityagents.UnityEnvironment.get_communicator')
+def test_subprocess_step(mock_communicator, mock_launcher):
+    mock_communicator.return_value = MockCommunicator(
+        discrete_action=False, visual_inputs=0)
+    env = SubprocessUnityEnvironment(' ', 2)
+    brain = env.brains['RealFakeBrain']
+    brain_info = env.reset()
+    assert brain_info['RealFakeBrain'].agents == ['0-0', '0-1', '0-2', '1-0', '1-1', '1-2']
+    n_agents = len(brain_info['RealFakeBrain'].agents)
+    brain_info = env.step({'RealFakeBrain': [0] * brain.vector_action_space_size * n_agents})
+    assert not env.global_done
+    assert brain_info['RealFakeBrain'].vector_observations.shape == \
+           (n_agents, brain.vector_observation_space_size * brain.num_stacked_vector_observations)
+    assert brain_info['RealFakeBrain'].local_done == [False, False, True] * 2
+    # The first action of the second environment ends its episode
+    actions = np.zeros((n_agents, brain.vector_action_space_size))
+    actions[3] = -1
+    env.step_async({'RealFakeBrain': actions})
+    env.step_wait()
+    assert env.global_done
+    with pytest.raises(UnityActionException):
+        env.step({'RealFakeBrain': actions})
+    env.close()
+
+
 def test_curriculum():
     open_name = '%s.open' % __name__
     with mock.patch('json.load') as mock_load:
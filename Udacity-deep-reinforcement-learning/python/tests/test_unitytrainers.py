@@ -3,7 +3,7 @@ import unittest.mock as mock
 import pytest
 
 from unitytrainers.trainer_controller import TrainerController
-from unitytrainers.buffer import Buffer
+from unitytrainers.buffer import Buffer, MiniBatches
 from unitytrainers.models import *
 from unitytrainers.ppo.trainer import PPOTrainer
 from unitytrainers.bc.trainer import BehavioralCloningTrainer
@@ -212,5 +212,63 @@ def test_buffer():
     assert np.array(b.update_buffer['action']).shape == (10, 2, 2)
 
 
+def test_buffer_field_storage():
+    b = Buffer()
+    for step in range(40):
+        b[0]['count'].append(step)
+        b[0]['double'].append([2 * step, 2 * step + 1])
+    # a float value promotes the integer field instead of being truncated
+    b[0]['count'].append(40.5)
+    b[0]['double'].append([81, 82])
+    assert len(b[0]['count']) == 41
+    assert b[0]['count'][-1] == 40.5
+    assert np.array(b[0]['double']).shape == (41, 2)
+    a = b[0]['count'].get_batch(batch_size=2, training_length=3, sequential=True)
+    assert_array(a, np.array([[35, 36, 37], [38, 39, 40.5]]))
+    a = b[0]['count'].get_batch(training_length=4, sequential=True)
+    assert a.shape == (11, 4)
+    assert_array(a[0], np.array([0, 0, 0, 0]))
+    b[0].shuffle()
+    assert_array(np.array(b[0]['double'])[:, 0], 2 * np.array(b[0]['count']))
+    b[0].reset_agent()
+    b[0]['count'].append(1)
+    assert_array(np.array(b[0]['count']), np.array([1]))
+
+
+def test_mini_batches():
+    b = Buffer()
+    for step in range(10):
+        b.update_buffer['value'].append(float(step))
+        b.update_buffer['obs'].append([[step, -step]] * 2)
+    mini_batches = MiniBatches(b.update_buffer, ['value', 'obs'], 4)
+    assert len(mini_batches) == 2
+    assert_array(mini_batches[1]['value'], np.array([4., 5., 6., 7.]))
+    np.random.seed(0)
+    mini_batches.shuffle()
+    seen = []
+    for l in range(len(mini_batches)):
+        mini_batch = mini_batches[l]
+        assert mini_batch['obs'].shape == (4, 2, 2)
+        assert_array(mini_batch['obs'][:, 0, 0], mini_batch['value'])
+        seen.extend(mini_batch['value'])
+    assert len(set(seen)) == 8
+    with pytest.raises(IndexError):
+        mini_batches[2]
+
+
+def test_buffer_append_columns():
+    b = Buffer()
+    b['a']['obs'].append([0, 0])
+    obs = np.array([[1, 2], [3, 4]])
+    b.append_columns(['a', 'b'], {'obs': obs, 'reward': [0.5, 1.5]})
+    obs[:] = 0
+    b.append_columns(['b'], {'obs': [[5, 6]], 'reward': [2.5]})
+    assert len(b['a']['obs']) == 2 and len(b['b']['obs']) == 2
+    assert_array(np.array(b['a']['obs']), np.array([[0, 0], [1, 2]]))
+    assert_array(np.array(b['b']['obs']), np.array([[3, 4], [5, 6]]))
+    b['b']['reward'].append(3.5)
+    assert_array(b['b']['reward'].get_batch(), np.array([1.5, 2.5, 3.5]))
+
+
 if __name__ == '__main__':
     pytest.main()
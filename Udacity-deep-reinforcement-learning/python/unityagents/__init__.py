@@ -1,4 +1,5 @@
 from .environment import *
+from .subprocess_environment import *
 from .brain import *
 from .exception import *
 from .curriculum import *
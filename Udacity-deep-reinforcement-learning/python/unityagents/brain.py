@@ -18,6 +18,16 @@ class BrainInfo:
         self.agents = agents
         self.previous_vector_actions = vector_action
         self.previous_text_actions = text_action
+        self._agent_rows = None
+
+    @property
+    def agent_rows(self):
+        """
+        Dictionary from agent id to the index of the agent in the fields of this BrainInfo.
+        """
+        if self._agent_rows is None or len(self._agent_rows) != len(self.agents):
+            self._agent_rows = dict((agent_id, row) for row, agent_id in enumerate(self.agents))
+        return self._agent_rows
 
 
 AllBrainInfo = Dict[str, BrainInfo]
@@ -0,0 +1,301 @@
+import logging
+import multiprocessing
+import traceback
+
+import numpy as np
+
+from .brain import BrainInfo, AllBrainInfo
+from .curriculum import Curriculum
+from .environment import UnityEnvironment
+from .exception import UnityEnvironmentException, UnityActionException
+
+logger = logging.getLogger("unityagents")
+
+
+def _worker(connection, file_name, worker_id, base_port, seed, docker_training, no_graphics):
+    """
+    Runs a UnityEnvironment in a subprocess, and executes the commands received on connection.
+    Every command is answered with ('ok', result) or ('error', traceback).
+    """
+    env = None
+    try:
+        env = UnityEnvironment(file_name=file_name, worker_id=worker_id, base_port=base_port, seed=seed,
+                               docker_training=docker_training, no_graphics=no_graphics)
+        connection.send(('ok', (env.brains, env.brain_names, env.external_brain_names, env.academy_name,
+                                env.logfile_path, env._resetParameters)))
+        while True:
+            command, data = connection.recv()
+            if command == 'reset':
+                train_mode, config = data
+                connection.send(('ok', (env.reset(train_mode=train_mode, config=config), env.global_done)))
+            elif command == 'step':
+                vector_action, memory, text_action = data
+                connection.send(('ok', (env.step(vector_action=vector_action, memory=memory,
+                                                 text_action=text_action), env.global_done)))
+            elif command == 'close':
+                break
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        connection.send(('error', traceback.format_exc()))
+    finally:
+        if env is not None:
+            try:
+                env.close()
+            except UnityEnvironmentException:
+                pass
+        connection.close()
+
+
+class SubprocessUnityEnvironment(object):
+    def __init__(self, file_name, num_envs, worker_id=0,
+                 base_port=5005, curriculum=None,
+                 seed=0, docker_training=False, no_graphics=False):
+        """
+        Starts num_envs copies of a unity environment, each in its own subprocess, and presents them as a
+        single environment. The BrainInfo of the environments are merged into one BrainInfo per brain, and the
+        agents are renamed '<index of the environment>-<agent id>', so that the agents of different environments
+        have different ids. The actions are split back between the environments, which simulate their step in
+        parallel. When one of the environments is done, all of them must be reset.
+
+        :string file_name: Name of Unity environment binary.
+        :int num_envs: Number of environments to start.
+        :int worker_id: Number to add to communication port (5005) [0] of the first environment. Environment i
+        uses worker_id + i.
+        :int base_port: Baseline port number to connect to Unity environment over. worker_id increments over this.
+        :param curriculum: Curriculum json file, shared by all the environments.
+        :int seed: Random seed of the first environment. Environment i uses seed + i.
+        :param docker_training: Informs this class whether the process is being run within a container.
+        :param no_graphics: Whether to run the Unity simulator in no-graphics mode
+        """
+        if file_name is None:
+            raise UnityEnvironmentException("Several environments can not be trained in the Unity Editor. "
+                                            "Please provide the path to an environment executable.")
+        self._connections = []
+        self._processes = []
+        self._waiting = False
+        for i in range(num_envs):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker,
+                                              args=(worker_connection, file_name, worker_id + i, base_port,
+                                                    seed + i, docker_training, no_graphics))
+            process.daemon = True
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        try:
+            parameters = self._receive_all()
+        except Exception:
+            self.close()
+            raise
+        (self._brains, self._brain_names, self._external_brain_names, self._academy_name,
+         self._log_path, reset_parameters) = parameters[0]
+        self._num_envs = num_envs
+        self._curriculum = Curriculum(curriculum, reset_parameters)
+        self._infos = None
+        self._global_done = None
+        logger.info("\n{0} environments of '{1}' started successfully!".format(num_envs, self._academy_name))
+
+    @property
+    def curriculum(self):
+        return self._curriculum
+
+    @property
+    def logfile_path(self):
+        return self._log_path
+
+    @property
+    def brains(self):
+        return self._brains
+
+    @property
+    def global_done(self):
+        return self._global_done
+
+    @property
+    def academy_name(self):
+        return self._academy_name
+
+    @property
+    def number_envs(self):
+        return self._num_envs
+
+    @property
+    def number_brains(self):
+        return len(self._brain_names)
+
+    @property
+    def number_external_brains(self):
+        return len(self._external_brain_names)
+
+    @property
+    def brain_names(self):
+        return self._brain_names
+
+    @property
+    def external_brain_names(self):
+        return self._external_brain_names
+
+    def _receive_all(self):
+        """
+        Waits for the answer of every environment to the last command.
+        :return: The list of the results of the environments.
+        """
+        results, errors = [], []
+        for i, connection in enumerate(self._connections):
+            try:
+                status, result = connection.recv()
+            except EOFError:
+                status, result = 'error', 'The process of the environment stopped.'
+            if status == 'error':
+                errors.append('Environment {0}:\n{1}'.format(i, result))
+            results.append(result)
+        if errors:
+            raise UnityEnvironmentException('\n'.join(errors))
+        return results
+
+    def _merge(self, results):
+        """
+        Merges the AllBrainInfo of the environments, and keeps them to split the next actions.
+        :param results: The list of (AllBrainInfo, global_done) of the environments.
+        :return: AllBrainInfo : The merged AllBrainInfo.
+        """
+        self._infos = [all_brain_info for all_brain_info, _ in results]
+        self._global_done = any(global_done for _, global_done in results)
+        return dict((brain_name, merge_brain_infos([all_brain_info[brain_name] for all_brain_info in self._infos]))
+                    for brain_name in self._infos[0])
+
+    def reset(self, train_mode=True, config=None, lesson=None) -> AllBrainInfo:
+        """
+        Sends a signal to reset all the unity environments.
+        :return: AllBrainInfo  : A Data structure corresponding to the initial reset state of the environments.
+        """
+        if self._waiting:
+            self.step_wait()
+        if config is None:
+            config = self._curriculum.get_config(lesson)
+        for connection in self._connections:
+            connection.send(('reset', (train_mode, config)))
+        return self._merge(self._receive_all())
+
+    def step_async(self, vector_action=None, memory=None, text_action=None):
+        """
+        Sends the actions to the environments, which start simulating the step. The result is collected with
+        step_wait, so that other work can be done in the meantime.
+        :param vector_action: Dictionary of brain names and vector actions of all the agents of the brain.
+        :param memory: Dictionary of brain names and memories of all the agents of the brain.
+        :param text_action: Dictionary of brain names and text actions of all the agents of the brain.
+        """
+        if self._global_done is None:
+            raise UnityActionException(
+                "You cannot conduct step without first calling reset. Reset the environment with 'reset()'")
+        if self._global_done:
+            raise UnityActionException("The episode is completed. Reset the environment with 'reset()'")
+        if self._waiting:
+            raise UnityActionException("step_async was called while the previous step is still being simulated")
+        actions = [({}, {}, {}) for _ in self._connections]
+        for i, inputs in enumerate([vector_action, memory, text_action]):
+            for brain_name, value in (inputs or {}).items():
+                if brain_name not in self._external_brain_names:
+                    raise UnityActionException(
+                        "The name {0} does not correspond to an external brain "
+                        "in the environment".format(brain_name))
+                for action, env_value in zip(actions, self._split(brain_name, value)):
+                    action[i][brain_name] = env_value
+        for connection, (env_vector_action, env_memory, env_text_action) in zip(self._connections, actions):
+            connection.send(('step', (env_vector_action, env_memory, env_text_action)))
+        self._waiting = True
+
+    def step_wait(self) -> AllBrainInfo:
+        """
+        Waits for the environments to finish the step started by step_async.
+        :return: AllBrainInfo  : A Data structure corresponding to the new state of the environments.
+        """
+        self._waiting = False
+        return self._merge(self._receive_all())
+
+    def step(self, vector_action=None, memory=None, text_action=None) -> AllBrainInfo:
+        """
+        Provides the environments with an action, moves the environment dynamics forward accordingly, and returns
+        observation, state, and reward information to the agent.
+        :param vector_action: Dictionary of brain names and vector actions of all the agents of the brain.
+        :param memory: Dictionary of brain names and memories of all the agents of the brain.
+        :param text_action: Dictionary of brain names and text actions of all the agents of the brain.
+        :return: AllBrainInfo  : A Data structure corresponding to the new state of the environments.
+        """
+        self.step_async(vector_action, memory, text_action)
+        return self.step_wait()
+
+    def _split(self, brain_name, value):
+        """
+        Splits the actions, memories or text actions of the merged agents of a brain between the environments.
+        :param brain_name: The name of the brain.
+        :param value: One row per agent of the brain, None, or a text action shared by all the agents.
+        :return: The list of the values to send to each environment.
+        """
+        n_agents = [len(all_brain_info[brain_name].agents) for all_brain_info in self._infos]
+        if value is None or isinstance(value, str):
+            return [value] * len(n_agents)
+        if len(value) == 0:
+            return [[] for _ in n_agents]
+        if isinstance(value, list) and isinstance(value[0], str):
+            bounds = np.cumsum([0] + n_agents)
+            return [value[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+        value = np.asarray(value)
+        return np.split(value.reshape(sum(n_agents), -1), np.cumsum(n_agents)[:-1])
+
+    def close(self):
+        """
+        Sends a shutdown signal to the unity environments, and waits for their processes to stop.
+        """
+        for connection in self._connections:
+            try:
+                connection.send(('close', None))
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+        for process, connection in zip(self._processes, self._connections):
+            process.join()
+            connection.close()
+        self._connections = []
+        self._processes = []
+
+
+def merge_brain_infos(brain_infos):
+    """
+    Merges the BrainInfo of a brain in several environments into one BrainInfo, in which the agent of id agent_id
+    of environment i is renamed '<i>-<agent_id>'.
+    :param brain_infos: The list of the BrainInfo of the brain, one per environment.
+    :return: The merged BrainInfo.
+    """
+    def concatenate(arrays):
+        # The fields of the environments without agents can have the wrong number of dimensions
+        arrays = [np.asarray(array) for array in arrays]
+        non_empty = [array for array in arrays if len(array) > 0]
+        return np.concatenate(non_empty) if non_empty else arrays[0]
+
+    def concatenate_lists(lists):
+        return [element for values in lists for element in values]
+
+    memory_size = max(brain_info.memories.shape[1] if brain_info.memories.ndim == 2 else 0
+                      for brain_info in brain_infos)
+    memories = []
+    for brain_info in brain_infos:
+        if len(brain_info.agents) > 0:
+            memory = np.zeros((len(brain_info.agents), memory_size))
+            if memory_size > 0 and brain_info.memories.shape[1] > 0:
+                memory[:, :brain_info.memories.shape[1]] = brain_info.memories
+            memories.append(memory)
+    return BrainInfo(
+        visual_observation=[concatenate(observations) for observations in
+                            zip(*[brain_info.visual_observations for brain_info in brain_infos])],
+        vector_observation=concatenate([brain_info.vector_observations for brain_info in brain_infos]),
+        text_observations=concatenate_lists([brain_info.text_observations for brain_info in brain_infos]),
+        memory=np.concatenate(memories) if memories else np.zeros((0, 0)),
+        reward=concatenate_lists([brain_info.rewards for brain_info in brain_infos]),
+        agents=['{0}-{1}'.format(i, agent_id) for i, brain_info in enumerate(brain_infos)
+                for agent_id in brain_info.agents],
+        local_done=concatenate_lists([brain_info.local_done for brain_info in brain_infos]),
+        vector_action=concatenate([brain_info.previous_vector_actions for brain_info in brain_infos]),
+        text_action=concatenate_lists([brain_info.previous_text_actions for brain_info in brain_infos]),
+        max_reached=concatenate_lists([brain_info.max_reached for brain_info in brain_infos]))
@@ -10,6 +10,59 @@ class BufferException(UnityException):
     pass
 
 
+class MiniBatches(object):
+    """
+    MiniBatches assembles the minibatches of a model update from the fields of an AgentBuffer. Each field
+    is taken once as a contiguous array, each epoch draws one permutation of the elements, and each
+    minibatch gathers its elements with one np.take into an output array that is reused by every
+    minibatch. Without a permutation, minibatches are slices (views) of the fields.
+    The arrays of a minibatch are overwritten by the next one: they must not be kept around.
+    """
+
+    def __init__(self, agent_buffer, key_list, batch_size):
+        """
+        :param agent_buffer: The AgentBuffer that holds the fields.
+        :param key_list: The fields to assemble minibatches of.
+        :param batch_size: The number of elements in a minibatch.
+        """
+        if not agent_buffer.check_length(key_list):
+            raise BufferException("Unable to make minibatches if the fields are not of same length")
+        self.batch_size = batch_size
+        self.fields = dict((key, np.asarray(agent_buffer[key][:])) for key in key_list)
+        self.num_elements = len(agent_buffer[key_list[0]]) if key_list else 0
+        self.permutation = None
+        self._out = dict((key, np.empty((batch_size,) + field.shape[1:], dtype=field.dtype))
+                         for key, field in self.fields.items())
+
+    def __len__(self):
+        return self.num_elements // self.batch_size
+
+    def shuffle(self):
+        """
+        Draws a new order of the elements, used by the next minibatches.
+        """
+        s = np.arange(self.num_elements)
+        np.random.shuffle(s)
+        self.permutation = s
+
+    def __getitem__(self, index):
+        """
+        Returns the minibatch at index as a dictionary of arrays of batch_size elements.
+        :param index: The index of the minibatch, in range(len(self)).
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("Minibatch index {0} out of range".format(index))
+        start, end = index * self.batch_size, (index + 1) * self.batch_size
+        if self.permutation is None:
+            return dict((key, field[start:end]) for key, field in self.fields.items())
+        indices = self.permutation[start:end]
+        batch = {}
+        for key, field in self.fields.items():
+            # mode='clip' writes straight into out, 'raise' goes through a temporary copy
+            batch[key] = np.take(field, indices, axis=0, out=self._out[key], mode='clip')
+        return batch
+
+
 class Buffer(dict):
     """
     Buffer contains a dictionary of AgentBuffer. The AgentBuffers are indexed by agent_id.
@@ -22,29 +75,135 @@ class Buffer(dict):
         The keys correspond to the name of the field. Example: state, action
         """
 
-        class AgentBufferField(list):
+        class AgentBufferField(object):
             """
-            AgentBufferField is a list of numpy arrays. When an agent collects a field, you can add it to his
-            AgentBufferField with the append method.
+            AgentBufferField stores the values of a field as the rows of a preallocated numpy array, whose
+            dtype and row shape are taken from the first value. When an agent collects a field, you can add
+            it to his AgentBufferField with the append method. The array grows by doubling, and keeps its
+            memory when the field is reset, so that refilling it does not allocate. Buffer.append_columns
+            stages its rows in a list instead, which is copied into the array in one go when the field is
+            next read.
             """
 
+            def __init__(self):
+                self._data = None
+                self._spare = None
+                self._size = 0
+                self._staged = []
+
+            def __len__(self):
+                return self._size + len(self._staged)
+
+            def __getitem__(self, index):
+                if self._staged:
+                    self._flush()
+                return self._data[:self._size][index] if self._data is not None else np.array([])[index]
+
+            def __iter__(self):
+                return iter(self[:])
+
+            def __array__(self, dtype=None, copy=None):
+                data = self[:]
+                if dtype is not None and dtype != data.dtype:
+                    return data.astype(dtype)
+                return data.copy() if copy else data
+
             def __str__(self):
                 return str(np.array(self).shape)
 
+            def _reserve(self, rows, dtype, shape):
+                """
+                Makes room for rows more elements of the given dtype and shape, reallocating the array if
+                it is too small, or if it can not hold values of that dtype or shape.
+                :param rows: The number of elements that will be added.
+                :param dtype: The dtype of the elements.
+                :param shape: The shape of one element.
+                """
+                if self._data is None or (self._size == 0 and (self._data.shape[1:] != shape
+                                                               or self._data.dtype != dtype)):
+                    self._data = np.zeros((max(rows, 16),) + shape, dtype=dtype)
+                    return
+                if self._data.shape[1:] != shape:
+                    raise BufferException("Can not add elements of shape {0} to a field of elements of shape {1}"
+                                          .format(shape, self._data.shape[1:]))
+                if not np.can_cast(dtype, self._data.dtype):
+                    dtype = np.result_type(self._data.dtype, dtype)
+                else:
+                    dtype = self._data.dtype
+                if self._size + rows > len(self._data) or dtype != self._data.dtype:
+                    data = np.zeros((max(self._size + rows, 2 * len(self._data)),) + shape, dtype=dtype)
+                    data[:self._size] = self._data[:self._size]
+                    self._data = data
+
+            def _stage(self, element):
+                """
+                Adds an element to the end of the field without copying it: the element must not be
+                modified afterwards.
+                :param element: The np.array to append.
+                """
+                self._staged.append(element)
+
+            def _flush(self):
+                """
+                Copies the staged elements into the array.
+                """
+                staged, self._staged = self._staged, []
+                self.extend(staged)
+
+            def append(self, element):
+                """
+                Adds an element to the end of the field.
+                :param element: The np.array (or value that converts to one) to append.
+                """
+                if self._staged:
+                    self._flush()
+                element = np.asarray(element)
+                data = self._data
+                if (data is None or self._size == len(data) or element.dtype != data.dtype
+                        or element.shape != data.shape[1:]):
+                    self._reserve(1, element.dtype, element.shape)
+                    data = self._data
+                data[self._size] = element
+                self._size += 1
+
             def extend(self, data):
                 """
                 Ads a list of np.arrays to the end of the list of np.arrays.
                 :param data: The np.array list to append.
                 """
-                self += list(np.array(data))
+                if self._staged:
+                    self._flush()
+                data = np.asarray(data)
+                if len(data) == 0:
+                    return
+                self._reserve(len(data), data.dtype, data.shape[1:])
+                self._data[self._size:self._size + len(data)] = data
+                self._size += len(data)
 
             def set(self, data):
                 """
                 Sets the list of np.array to the input data
                 :param data: The np.array list to be set.
                 """
-                self[:] = []
-                self[:] = list(np.array(data))
+                self._size = 0
+                self._staged = []
+                self.extend(data)
+
+            def permute(self, permutation):
+                """
+                Reorders the elements of the field: element i becomes the element permutation[i].
+                The elements are gathered into a second array of the same capacity, which is kept for the
+                next permutation, so that shuffling copies the elements once without allocating.
+                :param permutation: A permutation of range(len(self)).
+                """
+                if self._staged:
+                    self._flush()
+                if (self._spare is None or self._spare.shape != self._data.shape
+                        or self._spare.dtype != self._data.dtype):
+                    self._spare = np.empty_like(self._data)
+                # mode='clip' writes straight into out, 'raise' goes through a temporary copy
+                np.take(self._data[:self._size], permutation, axis=0, out=self._spare[:self._size], mode='clip')
+                self._data, self._spare = self._spare, self._data
 
             def get_batch(self, batch_size=None, training_length=1, sequential=True):
                 """
@@ -59,33 +218,37 @@ class Buffer(dict):
                 sequential=True gives [[0,a],[b,c],[d,e]]. If sequential=False gives
                 [[a,b],[b,c],[c,d],[d,e]]
                 """
-                if training_length == 1:
+                data = self[:]
+                if training_length is None or training_length == 1:
                     # When the training length is 1, the method returns a list of elements,
                     # not a list of sequences of elements.
                     if batch_size is None:
                         # If batch_size is None : All the elements of the AgentBufferField are returned.
-                        return np.array(self)
+                        return data.copy()
                     else:
                         # return the batch_size last elements
                         if batch_size > len(self):
                             raise BufferException("Batch size requested is too large")
-                        return np.array(self[-batch_size:])
+                        return data[len(data) - batch_size:].copy()
                 else:
                     # The training_length is not None, the method returns a list of SEQUENCES of elements
                     if not sequential:
                         # The sequences will have overlapping elements
                         if batch_size is None:
                             # retrieve the maximum number of elements
-                            batch_size = len(self) - training_length + 1
+                            batch_size = max(len(self) - training_length + 1, 0)
+                        if batch_size == 0:
+                            return np.zeros((0, training_length) + data.shape[1:], dtype=data.dtype)
                         # The number of sequences of length training_length taken from a list of len(self) elements
                         # with overlapping is equal to batch_size
                         if (len(self) - training_length + 1) < batch_size:
                             raise BufferException("The batch size and training length requested for get_batch where"
                                                   " too large given the current number of data points.")
-                        tmp_list = []
-                        for end in range(len(self) - batch_size + 1, len(self) + 1):
-                            tmp_list += [np.array(self[end - training_length:end])]
-                        return np.array(tmp_list)
+                        # Sequence i is a window of the array starting one element after sequence i - 1
+                        data = data[len(data) - batch_size - training_length + 1:]
+                        return np.lib.stride_tricks.as_strided(
+                            data, shape=(batch_size, training_length) + data.shape[1:],
+                            strides=(data.strides[0],) + data.strides, writeable=False).copy()
                     if sequential:
                         # The sequences will not have overlapping elements (this involves padding)
                         leftover = len(self) % training_length
@@ -98,21 +261,20 @@ class Buffer(dict):
                         if batch_size > (len(self) // training_length + 1 * (leftover != 0)):
                             raise BufferException("The batch size and training length requested for get_batch where"
                                                   " too large given the current number of data points.")
-                        tmp_list = []
-                        padding = np.array(self[-1]) * 0
-                        # The padding is made with zeros and its shape is given by the shape of the last element
-                        for end in range(len(self), len(self) % training_length, -training_length)[:batch_size]:
-                            tmp_list += [np.array(self[end - training_length:end])]
-                        if (leftover != 0) and (len(tmp_list) < batch_size):
-                            tmp_list += [np.array([padding] * (training_length - leftover) + self[:leftover])]
-                        tmp_list.reverse()
-                        return np.array(tmp_list)
+                        # The last batch_size * training_length elements, left padded with zeros if there are
+                        # fewer, cut into consecutive sequences
+                        n_elements = batch_size * training_length
+                        batch = np.zeros((n_elements,) + data.shape[1:], dtype=data.dtype)
+                        n_copied = min(n_elements, len(data))
+                        batch[n_elements - n_copied:] = data[len(data) - n_copied:]
+                        return batch.reshape((batch_size, training_length) + data.shape[1:])
 
             def reset_field(self):
                 """
                 Resets the AgentBufferField
                 """
-                self[:] = []
+                self._size = 0
+                self._staged = []
 
         def __init__(self):
             self.last_brain_info = None
@@ -131,9 +293,9 @@ class Buffer(dict):
             self.last_brain_info = None
             self.last_take_action_outputs = None
 
-        def __getitem__(self, key):
-            if key not in self.keys():
-                self[key] = self.AgentBufferField()
+        def __missing__(self, key):
+            # Called by dict.__getitem__ for fields that are not in the AgentBuffer yet
+            self[key] = self.AgentBufferField()
             return super(Buffer.AgentBuffer, self).__getitem__(key)
 
         def check_length(self, key_list):
@@ -167,7 +329,7 @@ class Buffer(dict):
             s = np.arange(len(self[key_list[0]]))
             np.random.shuffle(s)
             for key in key_list:
-                self[key][:] = [self[key][i] for i in s]
+                self[key].permute(s)
 
     def __init__(self):
         self.update_buffer = self.AgentBuffer()
@@ -179,9 +341,9 @@ class Buffer(dict):
                                                                          ['\tagent {0} :{1}'.format(k, str(self[k])) for
                                                                           k in self.keys()]))
 
-    def __getitem__(self, key):
-        if key not in self.keys():
-            self[key] = self.AgentBuffer()
+    def __missing__(self, key):
+        # Called by dict.__getitem__ for agents that are not in the Buffer yet
+        self[key] = self.AgentBuffer()
         return super(Buffer, self).__getitem__(key)
 
     def reset_update_buffer(self):
@@ -198,6 +360,19 @@ class Buffer(dict):
         for k in agent_ids:
             self[k].reset_agent()
 
+    def append_columns(self, agent_ids, columns):
+        """
+        Appends one element to the fields of each agent in agent_ids.
+        :param agent_ids: The ids of the agents, one per row of the columns.
+        :param columns: Dictionary from field name to an array of the elements of all the agents, with one
+        row per agent (in the order of agent_ids).
+        """
+        agent_buffers = [self[agent_id] for agent_id in agent_ids]
+        for key, column in columns.items():
+            # The rows are staged as views of a copy of the column that nothing else can modify
+            for agent_buffer, element in zip(agent_buffers, np.array(column)):
+                agent_buffer[key]._stage(element)
+
     def append_update_buffer(self, agent_id, key_list=None, batch_size=None, training_length=None):
         """
         Appends the buffer of an agent to the update buffer.
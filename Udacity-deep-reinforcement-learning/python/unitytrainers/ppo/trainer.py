@@ -7,9 +7,10 @@ import os
 
 import numpy as np
 import tensorflow as tf
+from scipy.signal import lfilter
 
 from unityagents import AllBrainInfo, BrainInfo
-from unitytrainers.buffer import Buffer
+from unitytrainers.buffer import Buffer, MiniBatches
 from unitytrainers.ppo.models import PPOModel
 from unitytrainers.trainer import UnityTrainerException, Trainer
 
@@ -215,7 +216,7 @@ class PPOTrainer(Trainer):
         prev_text_actions = []
         for agent_id in next_info.agents:
             agent_brain_info = self.training_buffer[agent_id].last_brain_info
-            agent_index = agent_brain_info.agents.index(agent_id)
+            agent_index = agent_brain_info.agent_rows[agent_id]
             if agent_brain_info is None:
                 agent_brain_info = next_info
             for i in range(len(next_info.visual_observations)):
@@ -275,21 +276,35 @@ class PPOTrainer(Trainer):
         :param idx: Index in BrainInfo of agent.
         :return: Value estimate.
         """
-        feed_dict = {self.model.batch_size: 1, self.model.sequence_length: 1}
+        return self.generate_value_estimates([brain_info], [idx])[0]
+
+    def generate_value_estimates(self, brain_infos, idxs):
+        """
+        Generates value estimates for bootstrapping several agents with a single run of the model.
+        :param brain_infos: BrainInfo to be used for bootstrapping each agent.
+        :param idxs: Index of each agent in its BrainInfo.
+        :return: Value estimates, one per agent.
+        """
+        rows = list(zip(brain_infos, idxs))
+        feed_dict = {self.model.batch_size: len(rows), self.model.sequence_length: 1}
         if self.use_visual_obs:
-            for i in range(len(brain_info.visual_observations)):
-                feed_dict[self.model.visual_in[i]] = [brain_info.visual_observations[i][idx]]
+            for i in range(len(brain_infos[0].visual_observations)):
+                feed_dict[self.model.visual_in[i]] = np.stack(
+                    [brain_info.visual_observations[i][idx] for brain_info, idx in rows])
         if self.use_vector_obs:
-            feed_dict[self.model.vector_in] = [brain_info.vector_observations[idx]]
+            feed_dict[self.model.vector_in] = np.stack(
+                [brain_info.vector_observations[idx] for brain_info, idx in rows])
         if self.use_recurrent:
-            if brain_info.memories.shape[1] == 0:
-                brain_info.memories = np.zeros(
-                    (len(brain_info.vector_observations), self.m_size))
-            feed_dict[self.model.memory_in] = [brain_info.memories[idx]]
+            for brain_info in brain_infos:
+                if brain_info.memories.shape[1] == 0:
+                    brain_info.memories = np.zeros(
+                        (len(brain_info.vector_observations), self.m_size))
+            feed_dict[self.model.memory_in] = np.stack([brain_info.memories[idx] for brain_info, idx in rows])
         if not self.is_continuous_action and self.use_recurrent:
-            feed_dict[self.model.prev_action] = brain_info.previous_vector_actions[idx].flatten()
-        value_estimate = self.sess.run(self.model.value, feed_dict)
-        return value_estimate
+            feed_dict[self.model.prev_action] = np.stack(
+                [brain_info.previous_vector_actions[idx] for brain_info, idx in rows]).flatten()
+        value_estimates = self.sess.run(self.model.value, feed_dict)
+        return value_estimates[:, 0]
 
     def add_experiences(self, curr_all_info: AllBrainInfo, next_all_info: AllBrainInfo, take_action_outputs):
         """
@@ -307,55 +322,67 @@ class PPOTrainer(Trainer):
 
         intrinsic_rewards = self.generate_intrinsic_rewards(curr_info, next_info)
 
-        for agent_id in next_info.agents:
-            stored_info = self.training_buffer[agent_id].last_brain_info
-            stored_take_action_outputs = self.training_buffer[agent_id].last_take_action_outputs
-            if stored_info is not None:
-                idx = stored_info.agents.index(agent_id)
-                next_idx = next_info.agents.index(agent_id)
-                if not stored_info.local_done[idx]:
-                    if self.use_visual_obs:
-                        for i, _ in enumerate(stored_info.visual_observations):
-                            self.training_buffer[agent_id]['visual_obs%d' % i].append(
-                                stored_info.visual_observations[i][idx])
-                            self.training_buffer[agent_id]['next_visual_obs%d' % i].append(
-                                next_info.visual_observations[i][idx])
-                    if self.use_vector_obs:
-                        self.training_buffer[agent_id]['vector_obs'].append(stored_info.vector_observations[idx])
-                        self.training_buffer[agent_id]['next_vector_in'].append(
-                            next_info.vector_observations[next_idx])
-                    if self.use_recurrent:
-                        if stored_info.memories.shape[1] == 0:
-                            stored_info.memories = np.zeros((len(stored_info.agents), self.m_size))
-                        self.training_buffer[agent_id]['memory'].append(stored_info.memories[idx])
-                    actions = stored_take_action_outputs[self.model.output]
-                    if self.is_continuous_action:
-                        actions_pre = stored_take_action_outputs[self.model.output_pre]
-                        self.training_buffer[agent_id]['actions_pre'].append(actions_pre[idx])
-                    a_dist = stored_take_action_outputs[self.model.all_probs]
-                    value = stored_take_action_outputs[self.model.value]
-                    self.training_buffer[agent_id]['actions'].append(actions[idx])
-                    self.training_buffer[agent_id]['prev_action'].append(stored_info.previous_vector_actions[idx])
-                    self.training_buffer[agent_id]['masks'].append(1.0)
-                    if self.use_curiosity:
-                        self.training_buffer[agent_id]['rewards'].append(next_info.rewards[next_idx] +
-                                                                         intrinsic_rewards[next_idx])
-                    else:
-                        self.training_buffer[agent_id]['rewards'].append(next_info.rewards[next_idx])
-                    self.training_buffer[agent_id]['action_probs'].append(a_dist[idx])
-                    self.training_buffer[agent_id]['value_estimates'].append(value[idx][0])
-
-                    if agent_id not in self.cumulative_rewards:
-                        self.cumulative_rewards[agent_id] = 0
-                    self.cumulative_rewards[agent_id] += next_info.rewards[next_idx]
-                    if self.use_curiosity:
-                        if agent_id not in self.intrinsic_rewards:
-                            self.intrinsic_rewards[agent_id] = 0
-                        self.intrinsic_rewards[agent_id] += intrinsic_rewards[next_idx]
-                if not next_info.local_done[next_idx]:
-                    if agent_id not in self.episode_steps:
-                        self.episode_steps[agent_id] = 0
-                    self.episode_steps[agent_id] += 1
+        # The agents are grouped by the BrainInfo their last action was taken on (usually curr_info), so
+        # that the fields of each group are gathered with one fancy index per field
+        groups = {}
+        for next_idx, agent_id in enumerate(next_info.agents):
+            agent_buffer = self.training_buffer[agent_id]
+            stored_info = agent_buffer.last_brain_info
+            if stored_info is None:
+                continue
+            if id(stored_info) not in groups:
+                groups[id(stored_info)] = (stored_info, agent_buffer.last_take_action_outputs, [], [], [])
+            _, _, agent_ids, idxs, next_idxs = groups[id(stored_info)]
+            agent_ids.append(agent_id)
+            idxs.append(stored_info.agent_rows[agent_id])
+            next_idxs.append(next_idx)
+
+        next_rewards = np.asarray(next_info.rewards, dtype=np.float64)
+        next_done = np.asarray(next_info.local_done, dtype=bool)
+        for stored_info, stored_take_action_outputs, agent_ids, idxs, next_idxs in groups.values():
+            idxs, next_idxs = np.array(idxs, dtype=np.int64), np.array(next_idxs, dtype=np.int64)
+            for agent_id, done in zip(agent_ids, next_done[next_idxs].tolist()):
+                if not done:
+                    self.episode_steps[agent_id] = self.episode_steps.get(agent_id, 0) + 1
+
+            # Agents that were done on stored_info started a new episode, there is no experience to add
+            alive = ~np.asarray(stored_info.local_done, dtype=bool)[idxs]
+            agent_ids = [agent_id for agent_id, keep in zip(agent_ids, alive.tolist()) if keep]
+            idxs, next_idxs = idxs[alive], next_idxs[alive]
+            if len(agent_ids) == 0:
+                continue
+            columns = {}
+            if self.use_visual_obs:
+                for i, _ in enumerate(stored_info.visual_observations):
+                    columns['visual_obs%d' % i] = np.asarray(stored_info.visual_observations[i])[idxs]
+                    columns['next_visual_obs%d' % i] = np.asarray(next_info.visual_observations[i])[next_idxs]
+            if self.use_vector_obs:
+                columns['vector_obs'] = np.asarray(stored_info.vector_observations)[idxs]
+                columns['next_vector_in'] = np.asarray(next_info.vector_observations)[next_idxs]
+            if self.use_recurrent:
+                if stored_info.memories.shape[1] == 0:
+                    stored_info.memories = np.zeros((len(stored_info.agents), self.m_size))
+                columns['memory'] = stored_info.memories[idxs]
+            if self.is_continuous_action:
+                columns['actions_pre'] = stored_take_action_outputs[self.model.output_pre][idxs]
+            columns['actions'] = stored_take_action_outputs[self.model.output][idxs]
+            columns['prev_action'] = np.asarray(stored_info.previous_vector_actions)[idxs]
+            columns['masks'] = np.ones(len(agent_ids))
+            rewards = next_rewards[next_idxs]
+            if self.use_curiosity:
+                agent_intrinsic_rewards = np.asarray(intrinsic_rewards)[next_idxs]
+                columns['rewards'] = rewards + agent_intrinsic_rewards
+            else:
+                columns['rewards'] = rewards
+            columns['action_probs'] = stored_take_action_outputs[self.model.all_probs][idxs]
+            columns['value_estimates'] = stored_take_action_outputs[self.model.value][idxs, 0]
+            self.training_buffer.append_columns(agent_ids, columns)
+
+            for agent_id, reward in zip(agent_ids, rewards.tolist()):
+                self.cumulative_rewards[agent_id] = self.cumulative_rewards.get(agent_id, 0) + reward
+            if self.use_curiosity:
+                for agent_id, reward in zip(agent_ids, agent_intrinsic_rewards.tolist()):
+                    self.intrinsic_rewards[agent_id] = self.intrinsic_rewards.get(agent_id, 0) + reward
 
     def process_experiences(self, current_info: AllBrainInfo, new_info: AllBrainInfo):
         """
@@ -366,48 +393,69 @@ class PPOTrainer(Trainer):
         """
 
         info = new_info[self.brain_name]
+        ready = []
         for l in range(len(info.agents)):
             agent_actions = self.training_buffer[info.agents[l]]['actions']
             if ((info.local_done[l] or len(agent_actions) > self.trainer_parameters['time_horizon'])
                     and len(agent_actions) > 0):
-                agent_id = info.agents[l]
-                if info.local_done[l] and not info.max_reached[l]:
-                    value_next = 0.0
-                else:
-                    if info.max_reached[l]:
-                        bootstrapping_info = self.training_buffer[agent_id].last_brain_info
-                        idx = bootstrapping_info.agents.index(agent_id)
-                    else:
-                        bootstrapping_info = info
-                        idx = l
-                    value_next = self.generate_value_estimate(bootstrapping_info, idx)
-
-                self.training_buffer[agent_id]['advantages'].set(
-                    get_gae(
-                        rewards=self.training_buffer[agent_id]['rewards'].get_batch(),
-                        value_estimates=self.training_buffer[agent_id]['value_estimates'].get_batch(),
-                        value_next=value_next,
-                        gamma=self.trainer_parameters['gamma'],
-                        lambd=self.trainer_parameters['lambd']))
-                self.training_buffer[agent_id]['discounted_returns'].set(
-                    self.training_buffer[agent_id]['advantages'].get_batch()
-                    + self.training_buffer[agent_id]['value_estimates'].get_batch())
-
-                self.training_buffer.append_update_buffer(agent_id, batch_size=None,
-                                                          training_length=self.sequence_length)
-
-                self.training_buffer[agent_id].reset_agent()
-                if info.local_done[l]:
-                    self.stats['cumulative_reward'].append(
-                        self.cumulative_rewards.get(agent_id, 0))
-                    self.stats['episode_length'].append(
-                        self.episode_steps.get(agent_id, 0))
-                    self.cumulative_rewards[agent_id] = 0
-                    self.episode_steps[agent_id] = 0
-                    if self.use_curiosity:
-                        self.stats['intrinsic_reward'].append(
-                            self.intrinsic_rewards.get(agent_id, 0))
-                        self.intrinsic_rewards[agent_id] = 0
+                ready.append(l)
+        if len(ready) == 0:
+            return
+
+        # The value estimates of all the agents that need bootstrapping come from one run of the model
+        value_next = np.zeros(len(ready))
+        bootstrapped, bootstrapping_infos, bootstrapping_idxs = [], [], []
+        for k, l in enumerate(ready):
+            agent_id = info.agents[l]
+            if info.local_done[l] and not info.max_reached[l]:
+                continue
+            if info.max_reached[l]:
+                bootstrapping_info = self.training_buffer[agent_id].last_brain_info
+                bootstrapping_idxs.append(bootstrapping_info.agent_rows[agent_id])
+            else:
+                bootstrapping_info = info
+                bootstrapping_idxs.append(l)
+            bootstrapped.append(k)
+            bootstrapping_infos.append(bootstrapping_info)
+        if bootstrapped:
+            value_next[bootstrapped] = self.generate_value_estimates(bootstrapping_infos, bootstrapping_idxs)
+
+        # The trajectories of all the agents are processed one after the other in flat arrays
+        agent_ids = [info.agents[l] for l in ready]
+        rewards = [self.training_buffer[agent_id]['rewards'].get_batch() for agent_id in agent_ids]
+        value_estimates = np.concatenate(
+            [self.training_buffer[agent_id]['value_estimates'].get_batch() for agent_id in agent_ids])
+        lengths = [len(r) for r in rewards]
+        advantages = get_gae(
+            rewards=np.concatenate(rewards),
+            value_estimates=value_estimates,
+            value_next=value_next,
+            gamma=self.trainer_parameters['gamma'],
+            lambd=self.trainer_parameters['lambd'],
+            lengths=lengths)
+        discounted_returns = advantages + value_estimates
+        splits = np.cumsum(lengths)[:-1]
+
+        for l, agent_id, agent_advantages, agent_returns in zip(ready, agent_ids, np.split(advantages, splits),
+                                                                np.split(discounted_returns, splits)):
+            self.training_buffer[agent_id]['advantages'].set(agent_advantages)
+            self.training_buffer[agent_id]['discounted_returns'].set(agent_returns)
+
+            self.training_buffer.append_update_buffer(agent_id, batch_size=None,
+                                                      training_length=self.sequence_length)
+
+            self.training_buffer[agent_id].reset_agent()
+            if info.local_done[l]:
+                self.stats['cumulative_reward'].append(
+                    self.cumulative_rewards.get(agent_id, 0))
+                self.stats['episode_length'].append(
+                    self.episode_steps.get(agent_id, 0))
+                self.cumulative_rewards[agent_id] = 0
+                self.episode_steps[agent_id] = 0
+                if self.use_curiosity:
+                    self.stats['intrinsic_reward'].append(
+                        self.intrinsic_rewards.get(agent_id, 0))
+                    self.intrinsic_rewards[agent_id] = 0
 
     def end_episode(self):
         """
@@ -441,61 +489,66 @@ class PPOTrainer(Trainer):
         self.training_buffer.update_buffer['advantages'].set(
             (advantages - advantages.mean()) / (advantages.std() + 1e-10))
         num_epoch = self.trainer_parameters['num_epoch']
+        buffer = self.training_buffer.update_buffer
+        key_list = ['masks', 'discounted_returns', 'value_estimates', 'advantages', 'action_probs']
+        if self.is_continuous_action:
+            key_list.append('actions_pre')
+        else:
+            key_list.append('actions')
+            if self.use_recurrent:
+                key_list.append('prev_action')
+        if self.use_vector_obs:
+            key_list.append('vector_obs')
+            if self.use_curiosity:
+                key_list.append('next_vector_in')
+        if self.use_visual_obs:
+            for i, _ in enumerate(self.model.visual_in):
+                key_list.append('visual_obs%d' % i)
+                if self.use_curiosity:
+                    key_list.append('next_visual_obs%d' % i)
+        if self.use_recurrent:
+            key_list.append('memory')
+        mini_batches = MiniBatches(buffer, key_list, n_sequences)
+        if self.is_continuous_observation:
+            total_observation_length = self.brain.vector_observation_space_size * \
+                                       self.brain.num_stacked_vector_observations
+        else:
+            total_observation_length = self.brain.num_stacked_vector_observations
         for k in range(num_epoch):
-            self.training_buffer.update_buffer.shuffle()
-            buffer = self.training_buffer.update_buffer
-            for l in range(len(self.training_buffer.update_buffer['actions']) // n_sequences):
-                start = l * n_sequences
-                end = (l + 1) * n_sequences
+            mini_batches.shuffle()
+            for l in range(len(mini_batches)):
+                # The arrays of mini_batch are reused by the next minibatch, the reshapes below are views
+                mini_batch = mini_batches[l]
                 feed_dict = {self.model.batch_size: n_sequences,
                              self.model.sequence_length: self.sequence_length,
-                             self.model.mask_input: np.array(buffer['masks'][start:end]).flatten(),
-                             self.model.returns_holder: np.array(buffer['discounted_returns'][start:end]).flatten(),
-                             self.model.old_value: np.array(buffer['value_estimates'][start:end]).flatten(),
-                             self.model.advantage: np.array(buffer['advantages'][start:end]).reshape([-1, 1]),
-                             self.model.all_old_probs: np.array(buffer['action_probs'][start:end]).reshape(
+                             self.model.mask_input: mini_batch['masks'].reshape([-1]),
+                             self.model.returns_holder: mini_batch['discounted_returns'].reshape([-1]),
+                             self.model.old_value: mini_batch['value_estimates'].reshape([-1]),
+                             self.model.advantage: mini_batch['advantages'].reshape([-1, 1]),
+                             self.model.all_old_probs: mini_batch['action_probs'].reshape(
                                  [-1, self.brain.vector_action_space_size])}
                 if self.is_continuous_action:
-                    feed_dict[self.model.output_pre] = np.array(buffer['actions_pre'][start:end]).reshape(
+                    feed_dict[self.model.output_pre] = mini_batch['actions_pre'].reshape(
                         [-1, self.brain.vector_action_space_size])
                 else:
-                    feed_dict[self.model.action_holder] = np.array(buffer['actions'][start:end]).flatten()
+                    feed_dict[self.model.action_holder] = mini_batch['actions'].reshape([-1])
                     if self.use_recurrent:
-                        feed_dict[self.model.prev_action] = np.array(buffer['prev_action'][start:end]).flatten()
+                        feed_dict[self.model.prev_action] = mini_batch['prev_action'].reshape([-1])
                 if self.use_vector_obs:
-                    if self.is_continuous_observation:
-                        total_observation_length = self.brain.vector_observation_space_size * \
-                                                   self.brain.num_stacked_vector_observations
-                        feed_dict[self.model.vector_in] = np.array(buffer['vector_obs'][start:end]).reshape(
-                            [-1, total_observation_length])
-                        if self.use_curiosity:
-                            feed_dict[self.model.next_vector_in] = np.array(buffer['next_vector_in'][start:end]) \
-                                .reshape([-1, total_observation_length])
-                    else:
-                        feed_dict[self.model.vector_in] = np.array(buffer['vector_obs'][start:end]).reshape(
-                            [-1, self.brain.num_stacked_vector_observations])
-                        if self.use_curiosity:
-                            feed_dict[self.model.next_vector_in] = np.array(buffer['next_vector_in'][start:end]) \
-                                .reshape([-1, self.brain.num_stacked_vector_observations])
+                    feed_dict[self.model.vector_in] = mini_batch['vector_obs'].reshape([-1, total_observation_length])
+                    if self.use_curiosity:
+                        feed_dict[self.model.next_vector_in] = mini_batch['next_vector_in'] \
+                            .reshape([-1, total_observation_length])
                 if self.use_visual_obs:
                     for i, _ in enumerate(self.model.visual_in):
-                        _obs = np.array(buffer['visual_obs%d' % i][start:end])
-                        if self.sequence_length > 1 and self.use_recurrent:
-                            (_batch, _seq, _w, _h, _c) = _obs.shape
-                            feed_dict[self.model.visual_in[i]] = _obs.reshape([-1, _w, _h, _c])
-                        else:
-                            feed_dict[self.model.visual_in[i]] = _obs
+                        feed_dict[self.model.visual_in[i]] = _visual_batch(
+                            mini_batch['visual_obs%d' % i], self.sequence_length > 1 and self.use_recurrent)
                     if self.use_curiosity:
                         for i, _ in enumerate(self.model.visual_in):
-                            _obs = np.array(buffer['next_visual_obs%d' % i][start:end])
-                            if self.sequence_length > 1 and self.use_recurrent:
-                                (_batch, _seq, _w, _h, _c) = _obs.shape
-                                feed_dict[self.model.next_visual_in[i]] = _obs.reshape([-1, _w, _h, _c])
-                            else:
-                                feed_dict[self.model.next_visual_in[i]] = _obs
+                            feed_dict[self.model.next_visual_in[i]] = _visual_batch(
+                                mini_batch['next_visual_obs%d' % i], self.sequence_length > 1 and self.use_recurrent)
                 if self.use_recurrent:
-                    mem_in = np.array(buffer['memory'][start:end])[:, 0, :]
-                    feed_dict[self.model.memory_in] = mem_in
+                    feed_dict[self.model.memory_in] = mini_batch['memory'][:, 0, :]
 
                 run_list = [self.model.value_loss, self.model.policy_loss, self.model.update_batch]
                 if self.use_curiosity:
@@ -516,23 +569,51 @@ class PPOTrainer(Trainer):
         self.training_buffer.reset_update_buffer()
 
 
-def discount_rewards(r, gamma=0.99, value_next=0.0):
+def _visual_batch(obs, merge_sequences):
+    """
+    Shapes a minibatch of visual observations for the visual input of the model.
+    :param obs: Visual observations of shape [batch, width, height, channels], or [batch, sequence, width,
+    height, channels] when the elements are sequences.
+    :param merge_sequences: Whether the sequences are merged into the batch dimension.
+    :return: The observations, as a view when they are reshaped.
+    """
+    if merge_sequences:
+        (_batch, _seq, _w, _h, _c) = obs.shape
+        return obs.reshape([-1, _w, _h, _c])
+    return obs
+
+
+def discount_rewards(r, gamma=0.99, value_next=0.0, lengths=None):
     """
     Computes discounted sum of future rewards for use in updating value estimate.
     :param r: List of rewards.
     :param gamma: Discount factor.
     :param value_next: T+1 value estimate for returns calculation.
+    :param lengths: If not None, r holds several trajectories one after the other, with these lengths, and
+    value_next is the T+1 value estimate of each trajectory (or one value for all of them).
     :return: discounted sum of future rewards as list.
     """
+    r = np.asarray(r, dtype=np.float64)
+    if lengths is None:
+        lengths = [len(r)]
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if len(r) == 0:
+        return np.zeros(0)
+    value_next = np.broadcast_to(np.asarray(value_next, dtype=np.float64).reshape(-1), lengths.shape)
+    # Row i of the padded array holds trajectory i backwards in time, followed by zeros, so that a
+    # single linear filter along the rows computes running_add = running_add * gamma + r[t]
+    steps = np.arange(lengths.max())
+    in_trajectory = steps < lengths[:, None]
+    reversed_indices = (np.cumsum(lengths)[:, None] - 1 - steps)[in_trajectory]
+    padded = np.zeros(in_trajectory.shape)
+    padded[in_trajectory] = r[reversed_indices]
+    discounted, _ = lfilter([1.], [1., -gamma], padded, axis=1, zi=gamma * value_next[:, None])
     discounted_r = np.zeros_like(r)
-    running_add = value_next
-    for t in reversed(range(0, r.size)):
-        running_add = running_add * gamma + r[t]
-        discounted_r[t] = running_add
+    discounted_r[reversed_indices] = discounted[in_trajectory]
     return discounted_r
 
 
-def get_gae(rewards, value_estimates, value_next=0.0, gamma=0.99, lambd=0.95):
+def get_gae(rewards, value_estimates, value_next=0.0, gamma=0.99, lambd=0.95, lengths=None):
     """
     Computes generalized advantage estimate for use in updating policy.
     :param rewards: list of rewards for time-steps t to T.
@@ -540,9 +621,19 @@ def get_gae(rewards, value_estimates, value_next=0.0, gamma=0.99, lambd=0.95):
     :param value_estimates: list of value estimates for time-steps t to T.
     :param gamma: Discount factor.
     :param lambd: GAE weighing factor.
+    :param lengths: If not None, rewards and value_estimates hold several trajectories one after the other,
+    with these lengths, and value_next is the T+1 value estimate of each trajectory.
     :return: list of advantage estimates for time-steps t to T.
     """
-    value_estimates = np.asarray(value_estimates.tolist() + [value_next])
-    delta_t = rewards + gamma * value_estimates[1:] - value_estimates[:-1]
-    advantage = discount_rewards(r=delta_t, gamma=gamma * lambd)
+    value_estimates = np.asarray(value_estimates, dtype=np.float64)
+    if lengths is None:
+        lengths = [len(value_estimates)]
+    lengths = np.asarray(lengths, dtype=np.int64)
+    # The value estimate of the next time-step, which is value_next at the end of each trajectory
+    next_value_estimates = np.zeros_like(value_estimates)
+    next_value_estimates[:-1] = value_estimates[1:]
+    value_next = np.broadcast_to(np.asarray(value_next, dtype=np.float64).reshape(-1), lengths.shape)
+    next_value_estimates[np.cumsum(lengths)[lengths > 0] - 1] = value_next[lengths > 0]
+    delta_t = rewards + gamma * next_value_estimates - value_estimates
+    advantage = discount_rewards(r=delta_t, gamma=gamma * lambd, lengths=lengths)
     return advantage
@@ -12,13 +12,13 @@ import yaml
 from tensorflow.python.tools import freeze_graph
 from unitytrainers.ppo.trainer import PPOTrainer
 from unitytrainers.bc.trainer import BehavioralCloningTrainer
-from unityagents import UnityEnvironment, UnityEnvironmentException
+from unityagents import UnityEnvironment, SubprocessUnityEnvironment, UnityEnvironmentException
 
 
 class TrainerController(object):
     def __init__(self, env_path, run_id, save_freq, curriculum_file, fast_simulation, load, train,
                  worker_id, keep_checkpoints, lesson, seed, docker_target_name, trainer_config_path,
-                 no_graphics):
+                 no_graphics, num_envs=1):
         """
         :param env_path: Location to the environment executable to be loaded.
         :param run_id: The sub-directory name for model and summary statistics
@@ -34,6 +34,8 @@ class TrainerController(object):
         :param docker_target_name: Name of docker volume that will contain all data.
         :param trainer_config_path: Fully qualified path to location of trainer configuration file
         :param no_graphics: Whether to run the Unity simulator in no-graphics mode
+        :param num_envs: Number of environments to run in parallel, in subprocesses, with worker ids worker_id to
+        worker_id + num_envs - 1. Their agents are trained together.
         """
         self.trainer_config_path = trainer_config_path
         if env_path is not None:
@@ -71,6 +73,7 @@ class TrainerController(object):
         self.load_model = load
         self.train_model = train
         self.worker_id = worker_id
+        self.num_envs = num_envs
         self.keep_checkpoints = keep_checkpoints
         self.trainers = {}
         if seed == -1:
@@ -78,10 +81,17 @@ class TrainerController(object):
         self.seed = seed
         np.random.seed(self.seed)
         tf.set_random_seed(self.seed)
-        self.env = UnityEnvironment(file_name=env_path, worker_id=self.worker_id,
-                                    curriculum=self.curriculum_file, seed=self.seed,
-                                    docker_training=self.docker_training,
-                                    no_graphics=no_graphics)
+        if self.num_envs > 1:
+            self.env = SubprocessUnityEnvironment(file_name=env_path, num_envs=self.num_envs,
+                                                  worker_id=self.worker_id,
+                                                  curriculum=self.curriculum_file, seed=self.seed,
+                                                  docker_training=self.docker_training,
+                                                  no_graphics=no_graphics)
+        else:
+            self.env = UnityEnvironment(file_name=env_path, worker_id=self.worker_id,
+                                        curriculum=self.curriculum_file, seed=self.seed,
+                                        docker_training=self.docker_training,
+                                        no_graphics=no_graphics)
         if env_path is None:
             self.env_name = 'editor_'+self.env.academy_name
         else:
@@ -211,6 +221,39 @@ class TrainerController(object):
                                             " Please make sure the permissions are set correctly."
                                             .format(model_path))
 
+    def _take_action(self, curr_info):
+        """
+        Decides the actions of the agents of every brain.
+        :param curr_info: Dictionary of all current brains and corresponding BrainInfo.
+        :return: Dictionaries of brain names to vector actions, memories, text actions, and the outputs to pass to
+        add_experiences.
+        """
+        take_action_vector, take_action_memories, take_action_text, take_action_outputs = {}, {}, {}, {}
+        for brain_name, trainer in self.trainers.items():
+            (take_action_vector[brain_name],
+             take_action_memories[brain_name],
+             take_action_text[brain_name],
+             take_action_outputs[brain_name]) = trainer.take_action(curr_info)
+        return take_action_vector, take_action_memories, take_action_text, take_action_outputs
+
+    def _process_step(self, curr_info, new_info, take_action_outputs):
+        """
+        Adds the experiences of a step to the trainers, and updates their models when they are ready.
+        :param curr_info: Dictionary of all brains and corresponding BrainInfo before the step.
+        :param new_info: Dictionary of all brains and corresponding BrainInfo after the step.
+        :param take_action_outputs: Dictionary of brain names and outputs of take_action for the step.
+        """
+        for brain_name, trainer in self.trainers.items():
+            trainer.add_experiences(curr_info, new_info, take_action_outputs[brain_name])
+            trainer.process_experiences(curr_info, new_info)
+            if trainer.is_ready_update() and self.train_model and trainer.get_step <= trainer.get_max_steps:
+                # Perform gradient descent with experience buffer
+                trainer.update_model()
+            # Write training statistics to Tensorboard.
+            trainer.write_summary(self.env.curriculum.lesson_number)
+            if self.train_model and trainer.get_step <= trainer.get_max_steps:
+                trainer.increment_step_and_update_last_reward()
+
     def start_learning(self):
         self.env.curriculum.set_lesson_number(self.lesson)
         trainer_config = self._load_config()
@@ -240,38 +283,41 @@ class TrainerController(object):
             if self.train_model:
                 for brain_name, trainer in self.trainers.items():
                     trainer.write_tensorboard_text('Hyperparameters', trainer.parameters)
+            # The step whose experiences have not been added yet, when the environments run in subprocesses
+            pending_step = None
             try:
                 while any([t.get_step <= t.get_max_steps for k, t in self.trainers.items()]) or not self.train_model:
                     if self.env.global_done:
+                        if pending_step is not None:
+                            self._process_step(*pending_step)
+                            pending_step = None
                         self.env.curriculum.increment_lesson(self._get_progress())
                         curr_info = self.env.reset(train_mode=self.fast_simulation)
                         for brain_name, trainer in self.trainers.items():
                             trainer.end_episode()
                     # Decide and take an action
-                    take_action_vector, take_action_memories, take_action_text, take_action_outputs = {}, {}, {}, {}
-                    for brain_name, trainer in self.trainers.items():
-                        (take_action_vector[brain_name],
-                         take_action_memories[brain_name],
-                         take_action_text[brain_name],
-                         take_action_outputs[brain_name]) = trainer.take_action(curr_info)
-                    new_info = self.env.step(vector_action=take_action_vector, memory=take_action_memories,
-                                             text_action=take_action_text)
-                    for brain_name, trainer in self.trainers.items():
-                        trainer.add_experiences(curr_info, new_info, take_action_outputs[brain_name])
-                        trainer.process_experiences(curr_info, new_info)
-                        if trainer.is_ready_update() and self.train_model and trainer.get_step <= trainer.get_max_steps:
-                            # Perform gradient descent with experience buffer
-                            trainer.update_model()
-                        # Write training statistics to Tensorboard.
-                        trainer.write_summary(self.env.curriculum.lesson_number)
-                        if self.train_model and trainer.get_step <= trainer.get_max_steps:
-                            trainer.increment_step_and_update_last_reward()
+                    take_action_vector, take_action_memories, take_action_text, take_action_outputs = \
+                        self._take_action(curr_info)
+                    if self.num_envs > 1:
+                        # The environments simulate this step while the trainers process the previous one
+                        self.env.step_async(vector_action=take_action_vector, memory=take_action_memories,
+                                            text_action=take_action_text)
+                        if pending_step is not None:
+                            self._process_step(*pending_step)
+                        new_info = self.env.step_wait()
+                        pending_step = (curr_info, new_info, take_action_outputs)
+                    else:
+                        new_info = self.env.step(vector_action=take_action_vector, memory=take_action_memories,
+                                                 text_action=take_action_text)
+                        self._process_step(curr_info, new_info, take_action_outputs)
                     if self.train_model:
                         global_step += 1
                     if global_step % self.save_freq == 0 and global_step != 0 and self.train_model:
                         # Save Tensorflow model
                         self._save_model(sess, steps=global_step, saver=saver)
                     curr_info = new_info
+                if pending_step is not None:
+                    self._process_step(*pending_step)
                 # Final save Tensorflow model
                 if global_step != 0 and self.train_model:
                     self._save_model(sess, steps=global_step, saver=saver)